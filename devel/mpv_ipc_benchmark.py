@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+''' mpv IPC reader micro-benchmark
+
+    Replays recorded mpv IPC streams (newline delimited JSON,
+    as written by mpv on its --input-ipc-server socket) through
+    the ways of reading them:
+
+        per-read    every read parsed on its own; what
+                    updateMPVStatus used to do
+        split       each read appended to the partial message
+                    left from the previous one, then split
+        reader      pyradio.mpv_ipc.MessageReader
+
+    The stream is cut into reads of --read-size bytes (the way
+    a busy socket would return it), and for every reader the
+    number of messages recovered intact and the time spent are
+    reported.
+
+    Run it from the repository directory:
+
+        python devel/mpv_ipc_benchmark.py
+        python devel/mpv_ipc_benchmark.py --read-size 1024 -n 200
+        python devel/mpv_ipc_benchmark.py -f my-session.ndjson
+
+    A stream can be recorded from a running PyRadio session with:
+
+        socat - UNIX-CONNECT:/tmp/mpvsocket.<pyradio pid> > my-session.ndjson
+
+    (then type { "command": ["observe_property", 1, "metadata"] }).
+'''
+import argparse
+import glob
+import json
+import os
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyradio.mpv_ipc import MessageReader
+
+EVENTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mpv_events')
+
+
+def read_per_read(chunks):
+    out = []
+    for data in chunks:
+        for n in data.split(b'\n'):
+            if n:
+                out.append(n)
+    return out
+
+
+def read_split(chunks):
+    out = []
+    buf = b''
+    for data in chunks:
+        lines = (buf + data).split(b'\n')
+        buf = lines.pop()
+        out.extend(n for n in lines if n)
+    return out
+
+
+def read_reader(chunks):
+    out = []
+    reader = MessageReader()
+    for data in chunks:
+        data = memoryview(data)
+        while data:
+            ''' what sock.recv_into() does '''
+            n = reader.read_from(lambda view: _copy_into(view, data))
+            data = data[n:]
+            out.extend(reader.messages())
+    return out
+
+
+def _copy_into(view, data):
+    n = min(len(view), len(data))
+    view[:n] = data[:n]
+    return n
+
+
+READERS = (
+    ('per-read', read_per_read),
+    ('split', read_split),
+    ('reader', read_reader),
+)
+
+
+def intact(messages):
+    count = 0
+    for n in messages:
+        try:
+            json.loads(n)
+            count += 1
+        except ValueError:
+            pass
+    return count
+
+
+def run(stream, read_size, rounds):
+    chunks = [stream[i:i + read_size] for i in range(0, len(stream), read_size)]
+    expected = stream.count(b'\n')
+    print('{} bytes, {} messages, {} reads of {} bytes'.format(
+        len(stream), expected, len(chunks), read_size))
+    print('{:<10} {:>10} {:>10} {:>12} {:>12}'.format(
+        'reader', 'intact', 'lost', 'MB/s', 'msg/s'))
+    for name, func in READERS:
+        best = None
+        for _ in range(rounds):
+            t = perf_counter()
+            messages = func(chunks)
+            t = perf_counter() - t
+            if best is None or t < best:
+                best = t
+        ok = intact(messages)
+        print('{:<10} {:>10} {:>10} {:>12.1f} {:>12.0f}'.format(
+            name, ok, expected - ok,
+            len(stream) / best / 1e6, ok / best))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='mpv IPC reader micro-benchmark')
+    parser.add_argument('-f', '--file', action='append', default=None,
+                        help='recorded mpv IPC stream (default: devel/mpv_events/*.ndjson); can be repeated')
+    parser.add_argument('-s', '--read-size', type=int, default=4096,
+                        help='bytes returned by each read (default: 4096)')
+    parser.add_argument('-n', '--repeat', type=int, default=50,
+                        help='times to repeat the recorded streams (default: 50)')
+    parser.add_argument('-r', '--rounds', type=int, default=5,
+                        help='runs per reader; the best one is reported (default: 5)')
+    args = parser.parse_args()
+
+    files = args.file or sorted(glob.glob(os.path.join(EVENTS_DIR, '*.ndjson')))
+    if not files:
+        print('No recorded streams found')
+        return 1
+    stream = b''
+    for a_file in files:
+        with open(a_file, 'rb') as f:
+            data = f.read()
+        if not data.endswith(b'\n'):
+            data += b'\n'
+        stream += data
+    run(stream * args.repeat, args.read_size, args.rounds)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,420 @@
+# -*- coding: utf-8 -*-
+''' Remote Control Server load test and latency benchmark
+
+    Starts a PyRadioServer against a stub player and a stub
+    config (no audio, no network access), drives it with a
+    mix of requests from many simulated clients, and reports
+    throughput, latency percentiles and error rates per path.
+
+    Run it from the repository directory:
+
+        python devel/server_benchmark.py -c 32 -t 10
+        python devel/server_benchmark.py --mix /title=4,/st=1,/vu=2,/pl=1
+        python devel/server_benchmark.py --save before.json
+        python devel/server_benchmark.py --compare before.json
+
+    With --compare, the exit status is 1 if the throughput or
+    the p99 latency of any path is more than --threshold percent
+    worse than in the saved run.
+'''
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+from time import monotonic, sleep
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyradio.server import PyRadioServer
+
+DEFAULT_MIX = '/title=4,/st=2,/vu=1,/pl=1'
+
+''' commands that change the player state; --player-delay
+    is spent in each of them, to simulate a slow player '''
+PLAYER_COMMANDS = (
+    '/volumeup', '/volumedown', '/volumesave', '/mute', '/next',
+    '/previous', '/histnext', '/histprev', '/stop', '/start', '/jump',
+    '/html_volumeup', '/html_volumedown', '/html_volumesave',
+    '/html_mute', '/html_next', '/html_previous', '/html_stop',
+    '/html_start', '/set_volume', '/toggle_rec', '/html_toggle_rec'
+)
+
+''' all the commands radio.py gives the server '''
+COMMANDS = PLAYER_COMMANDS + (
+    '/html_histprev', '/html_histnext', 'open_history', '/log',
+    '/html_log', '/like', '/html_like', '/title', '/html_info',
+    '/text_info', '/text_reconfig', '/html_is_stopped',
+    '/html_is_radio_browser', '/html_init', '/volume',
+    '/html_open_radio_browser', '/open_radio_browser',
+    '/html_close_radio_browser', '/close_radio_browser',
+    '/list_radio_browser', '/search_radio_browser',
+    '/html_search_radio_browser', '/radio_browser_page',
+    '/radio_browser_first_page', '/radio_browser_next_page',
+    '/radio_browser_previous_page'
+)
+
+
+class StubTitlesLog(object):
+    titles_handler = None
+
+
+class StubHistory(object):
+    items = []
+    item = -1
+
+
+class StubConfig(object):
+    ''' The parts of PyRadioConfig the server uses '''
+
+    headless = True
+    _online_browser = None
+    browsing_station_service = False
+    dirty_playlist = False
+    edit_generation = 0
+
+    def __init__(self, state_dir, stations):
+        self.state_dir = state_dir
+        self.remote_control_server_report_file = os.path.join(state_dir, 'server.txt')
+        self.remote_control_server_socket_file = os.path.join(state_dir, 'server.sock')
+        self.titles_log = StubTitlesLog()
+        self.stations_history = StubHistory()
+        self._stations = stations
+
+    def read_playlist_for_server(self, name, full=False):
+        a_file = os.path.join(self.state_dir, name + '.csv')
+        if full:
+            return a_file, self._stations
+        return a_file, [n[0] for n in self._stations]
+
+
+class StubPlayer(object):
+    ''' A player that is always playing '''
+
+    PLAYER_NAME = 'mpv'
+    playback_is_on = True
+    recording = 0
+    currently_recording = False
+    muted = False
+    paused = False
+    buffering = False
+    connecting = False
+    volume = 50
+
+    def isPlaying(self):
+        return True
+
+
+def make_stations(count):
+    ''' count stations, in groups of 50 '''
+    out = []
+    for i in range(count):
+        if i % 50 == 0:
+            out.append(['Group {}'.format(i // 50 + 1), '-', '', ''])
+        else:
+            out.append(['Station {}'.format(i), 'http://radio.example/{}'.format(i), '', ''])
+    return out
+
+
+def make_commands(delay):
+    def command(name):
+        def run(*args):
+            if delay and name in PLAYER_COMMANDS:
+                sleep(delay)
+            return '<div class="alert alert-success">{}</div>'.format(name)
+        return run
+    return {k: command(k) for k in COMMANDS}
+
+
+def free_port():
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    s.bind(('127.0.0.1', 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+def start_server(state_dir, port, stations, player_delay):
+    ''' start a PyRadioServer on localhost:port;
+        returns the server and its thread
+    '''
+    config = StubConfig(state_dir, stations)
+    player = StubPlayer()
+    playlists = [['stations', '', ''], ['benchmark', '', '']]
+    lists = [[0, 0, -1, stations], [0, 0, -1, playlists], [0, 0, -1, playlists]]
+    server = PyRadioServer(
+        'localhost', port, config, lambda: player,
+        make_commands(player_delay),
+        rate_limit=1e9, rate_burst=1e9
+    )
+    if not server.has_netifaces:
+        sys.exit('Error: netifaces is not installed')
+    thread = threading.Thread(
+        target=server.start_remote_control_server,
+        args=(
+            lambda: config,
+            lambda: lists,
+            lambda: (len(stations) // 2, len(stations) // 2),
+            lambda: os.path.join(state_dir, 'stations.csv'),
+            lambda: False,
+            lambda: True,
+            lambda: (0, []),
+            lambda e: sys.exit('Error starting the server: {}'.format(e)),
+            lambda e: sys.exit('Error: the server died: {}'.format(e)),
+            lambda: 'Benchmark Artist - Benchmark Song',
+            threading.Lock()
+        )
+    )
+    thread.daemon = True
+    thread.start()
+    for _ in range(100):
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return server, thread
+        except OSError:
+            sleep(.05)
+    sys.exit('Error: the server did not start')
+
+
+def parse_mix(mix):
+    ''' "/title=4,/st=1" -> [('/title', 4), ('/st', 1)] '''
+    out = []
+    for n in mix.split(','):
+        path, _, weight = n.strip().partition('=')
+        if not path.startswith('/'):
+            path = '/' + path
+        try:
+            out.append((path, float(weight or 1)))
+        except ValueError:
+            sys.exit('Error: invalid weight in mix: "{}"'.format(n))
+    return out
+
+
+class Client(threading.Thread):
+    ''' A simulated client: sends requests one after the
+        other, recording (path, status, latency) for each;
+        status is 0 for connection errors
+    '''
+
+    def __init__(self, host, port, mix, deadline, requests, keep_alive, seed):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.host = host
+        self.port = port
+        self.paths = [n[0] for n in mix]
+        self.weights = [n[1] for n in mix]
+        self.deadline = deadline
+        self.requests = requests
+        self.keep_alive = keep_alive
+        self.random = random.Random(seed)
+        self.results = []
+
+    def run(self):
+        conn = None
+        count = 0
+        headers = {} if self.keep_alive else {'Connection': 'close'}
+        while monotonic() < self.deadline and \
+                (not self.requests or count < self.requests):
+            path = self.random.choices(self.paths, self.weights)[0]
+            start = monotonic()
+            try:
+                if conn is None:
+                    conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+                conn.request('GET', path, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+                if response.will_close:
+                    conn.close()
+                    conn = None
+            except (OSError, http.client.HTTPException):
+                status = 0
+                if conn is not None:
+                    conn.close()
+                conn = None
+            self.results.append((path, status, monotonic() - start))
+            count += 1
+        if conn is not None:
+            conn.close()
+
+
+def percentile(values, p):
+    ''' values must be sorted '''
+    if not values:
+        return 0
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def summarize(results, elapsed):
+    ''' {path: {requests, errors, rps, p50, p90, p99, max}},
+        latencies in milliseconds; "total" for all paths
+    '''
+    by_path = {}
+    for path, status, latency in results:
+        by_path.setdefault(path, []).append((status, latency))
+    by_path['total'] = [(status, latency) for _, status, latency in results]
+    out = {}
+    for path, items in by_path.items():
+        latencies = sorted(n[1] * 1000 for n in items)
+        errors = sum(1 for n in items if n[0] == 0 or n[0] >= 400)
+        out[path] = {
+            'requests': len(items),
+            'errors': errors,
+            'error_rate': errors / len(items) if items else 0,
+            'rps': len(items) / elapsed if elapsed else 0,
+            'p50': percentile(latencies, 50),
+            'p90': percentile(latencies, 90),
+            'p99': percentile(latencies, 99),
+            'max': latencies[-1] if latencies else 0,
+        }
+    return out
+
+
+def print_report(summary, baseline=None):
+    head = '{:<16} {:>9} {:>8} {:>10} {:>9} {:>9} {:>9} {:>9}'
+    row = '{:<16} {:>9} {:>7.2f}% {:>10.1f} {:>9.2f} {:>9.2f} {:>9.2f} {:>9.2f}'
+    print(head.format('path', 'requests', 'errors', 'req/s', 'p50 ms', 'p90 ms', 'p99 ms', 'max ms'))
+    paths = sorted(n for n in summary if n != 'total') + ['total']
+    for path in paths:
+        n = summary[path]
+        print(row.format(
+            path, n['requests'], n['error_rate'] * 100,
+            n['rps'], n['p50'], n['p90'], n['p99'], n['max']
+        ))
+        if baseline and path in baseline:
+            b = baseline[path]
+            print('{:<16} {:>9} {:>8} {:>10} {:>9} {:>9} {:>9}'.format(
+                '  vs saved', '', '',
+                change(n['rps'], b['rps']),
+                change(n['p50'], b['p50']),
+                change(n['p90'], b['p90']),
+                change(n['p99'], b['p99'])
+            ))
+
+
+def change(new, old):
+    if not old:
+        return '-'
+    return '{:+.1f}%'.format((new - old) / old * 100)
+
+
+def regressions(summary, baseline, threshold):
+    ''' paths whose throughput or p99 latency is more
+        than threshold percent worse than in baseline
+    '''
+    out = []
+    for path, n in summary.items():
+        b = baseline.get(path)
+        if b is None:
+            continue
+        if b['rps'] and n['rps'] < b['rps'] * (1 - threshold / 100):
+            out.append('{}: throughput {}'.format(path, change(n['rps'], b['rps'])))
+        if b['p99'] and n['p99'] > b['p99'] * (1 + threshold / 100):
+            out.append('{}: p99 latency {}'.format(path, change(n['p99'], b['p99'])))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Load test and latency benchmark for the PyRadio Remote Control Server'
+    )
+    parser.add_argument('-c', '--clients', type=int, default=16,
+                        help='number of simulated clients (default: 16)')
+    parser.add_argument('-t', '--time', type=float, default=10,
+                        help='duration of the test in seconds (default: 10)')
+    parser.add_argument('-n', '--requests', type=int, default=0,
+                        help='requests per client (default: no limit; run for --time seconds)')
+    parser.add_argument('-m', '--mix', default=DEFAULT_MIX,
+                        help='paths and their weights (default: "{}")'.format(DEFAULT_MIX.replace('%', '%%')))
+    parser.add_argument('--stations', type=int, default=1000,
+                        help='number of stations in the stub playlist (default: 1000)')
+    parser.add_argument('--player-delay', type=float, default=0,
+                        help='milliseconds the stub player takes to execute a command (default: 0)')
+    parser.add_argument('--no-keep-alive', action='store_true',
+                        help='make a new connection for every request')
+    parser.add_argument('--server', metavar='IP:PORT',
+                        help='benchmark a running server instead of starting one')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='random seed of the request mix (default: 0)')
+    parser.add_argument('--save', metavar='FILE',
+                        help='save the results to FILE (JSON)')
+    parser.add_argument('--compare', metavar='FILE',
+                        help='compare the results with the ones saved in FILE')
+    parser.add_argument('--threshold', type=float, default=20,
+                        help='percent of throughput / p99 change reported as a regression (default: 20)')
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['summary']
+
+    with tempfile.TemporaryDirectory(prefix='pyradio-benchmark-') as state_dir:
+        server = None
+        if args.server:
+            host, _, port = args.server.rpartition(':')
+            port = int(port)
+        else:
+            host, port = '127.0.0.1', free_port()
+            stations = make_stations(args.stations)
+            server, thread = start_server(state_dir, port, stations, args.player_delay / 1000)
+        print('PyRadio Remote Control Server benchmark')
+        print('  server: {0}:{1}{2}'.format(host, port, '' if server else ' (running)'))
+        print('  clients: {0}, {1}, keep-alive: {2}'.format(
+            args.clients,
+            '{} requests each'.format(args.requests) if args.requests else '{} seconds'.format(args.time),
+            'no' if args.no_keep_alive else 'yes'
+        ))
+        if server:
+            print('  stations: {0}, player delay: {1} ms'.format(args.stations, args.player_delay))
+        print('  mix: ' + ', '.join('{0}={1:g}'.format(*n) for n in mix))
+        print()
+
+        start = monotonic()
+        deadline = start + (args.time if not args.requests else 24 * 3600)
+        clients = [
+            Client(host, port, mix, deadline, args.requests,
+                   not args.no_keep_alive, args.seed + i)
+            for i in range(args.clients)
+        ]
+        for n in clients:
+            n.start()
+        for n in clients:
+            n.join()
+        elapsed = monotonic() - start
+
+        if server:
+            server.close_server()
+            thread.join(5)
+
+    results = [x for n in clients for x in n.results]
+    summary = summarize(results, elapsed)
+    print_report(summary, baseline)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({
+                'clients': args.clients,
+                'mix': args.mix,
+                'stations': args.stations,
+                'player_delay': args.player_delay,
+                'keep_alive': not args.no_keep_alive,
+                'elapsed': elapsed,
+                'summary': summary
+            }, f, indent=2)
+    if baseline:
+        found = regressions(summary, baseline, args.threshold)
+        if found:
+            print('\nRegressions (more than {:g}% worse):'.format(args.threshold))
+            for n in found:
+                print('  ' + n)
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -17,17 +17,24 @@ except:
     pass
 import threading
 import logging
+from time import monotonic
 from .player import info_dict_to_list
 from .cjkwrap import cjklen
 from .countries import countries
 from .simple_curses_widgets import SimpleCursesLineEdit, SimpleCursesHorizontalPushButtons, SimpleCursesWidgetColumns, SimpleCursesCheckBox, SimpleCursesCounter, SimpleCursesBoolean, DisabledWidget, SimpleCursesString, SimpleCursesWidget
 from .ping import ping
+from .metrics import histogram
 
 import locale
 locale.setlocale(locale.LC_ALL, '')    # set your locale
 
 logger = logging.getLogger(__name__)
 
+_QUERY_DURATION = histogram(
+    'pyradio_radiobrowser_query_duration_seconds',
+    'RadioBrowser search latency', ('result', )
+)
+
 RADIO_BROWSER_DISPLAY_TERMS = {
     'topvote': 0,
     'topclick': 1,
@@ -699,6 +706,7 @@ class RadioBrowser(PyRadioStationsBrowser):
         ''' keep server results here '''
         new_raw_stations = []
 
+        start = monotonic()
         try:
             r = self._session.get(url=url, headers=self._headers, params=post_data, timeout=(self._search_timeout, 2 * self._search_timeout))
             self._log_response(r)
@@ -707,11 +715,13 @@ class RadioBrowser(PyRadioStationsBrowser):
             new_raw_stations = self._extract_data(json.loads(r.text))
             # logger.error('DE \n\n{}'.format(new_raw_stations))
             ret = True, len(new_raw_stations), go_back_in_history
+            _QUERY_DURATION.observe(monotonic() - start, 'ok')
         except requests.exceptions.RequestException as e:
             if logger.isEnabledFor(logging.INFO):
                 logger.info(e)
             # self._raw_stations = []
             ret = False, 0, go_back_in_history
+            _QUERY_DURATION.observe(monotonic() - start, 'error')
 
         ''' use server result '''
         if len(new_raw_stations) > 0:
@@ -1,12 +1,24 @@
 # -*- coding: utf-8 -*-
+''' PyRadio Remote Control Client
+
+    Only the standard library is imported at startup, so that
+    sending a command takes as little time as possible; rich
+    is only imported when formatted output is displayed.
+'''
 import argparse
 from argparse import ArgumentParser, SUPPRESS as SUPPRESS
-import requests
+import http.client
+import socket
+from urllib.parse import quote
 from os import path, getenv
 import sys
 import re
 from sys import platform
-from rich import print
+
+def print(*args, **kwargs):
+    ''' rich's print, imported on first use '''
+    from rich import print as rich_print
+    rich_print(*args, **kwargs)
 
 def format_list(a_string):
     print(a_string.replace(
@@ -26,8 +38,24 @@ def format_list(a_string):
     )
     )
 
+class UnixHTTPConnection(http.client.HTTPConnection):
+    ''' An HTTP connection over a Unix domain socket '''
+
+    def __init__(self, socket_file, timeout=1.0):
+        super(UnixHTTPConnection, self).__init__('localhost', timeout=timeout)
+        self._socket_file = socket_file
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self._socket_file)
+
+
 class PyRadioClient(object):
 
+    ''' number of commands sent at once when pipelining '''
+    PIPELINE_DEPTH = 16
+
     def __init__(
             self,
             host=None,
@@ -35,8 +63,16 @@ class PyRadioClient(object):
             server_file=None,
             alternative_server_file=None,
             timeout=1.0,
-            reverse_detection=False
+            reverse_detection=False,
+            tls=False,
+            cafile=None,
+            token=None
             ):
+        ''' tls     use TLS for TCP connections
+            cafile  certificate(s) to verify the server's
+                    certificate with (default: system CAs)
+            token   the server's access token
+        '''
         self._host = None
         self._port = None
         self._file = None
@@ -46,6 +82,13 @@ class PyRadioClient(object):
         self._timeout = timeout
         self._type = -1
         self._discovered = True
+        ''' the server's Unix domain socket, if found '''
+        self._socket_file = None
+        self._unix_conn = None
+        self._tcp_conn = None
+        self._tls = tls
+        self._cafile = cafile
+        self._headers = {'Authorization': 'Bearer ' + token} if token else {}
 
         if host and port:
             self._host = host
@@ -65,6 +108,7 @@ class PyRadioClient(object):
 
             if self._file:
                 self._get_host_and_port_from_file()
+                self._get_socket_file()
         else:
             self._get_files()
             # search for files
@@ -76,6 +120,7 @@ class PyRadioClient(object):
                     break
             if self._file:
                 self._get_host_and_port_from_file()
+                self._get_socket_file()
 
     @property
     def server_ip(self):
@@ -104,7 +149,9 @@ class PyRadioClient(object):
             elif self._last_command in ('i', 'info'):
                 if self._discovered:
                     out = self._last_reply.splitlines()
-                    out.insert(1, '  Server: ' + self._host + ':' + self._port)
+                    out.insert(1, '  Server: ' + self._host + ':' + self._port + (
+                        ' (unix socket)' if self._socket_file else ''
+                    ))
                     self._last_reply = '\n'.join(out) + '\n'
                 if 'Title: ' in self._last_reply:
                     self._last_reply = re.sub(r'Title: "([^"]*)"', r'Title: "[red3]\1[/red3]"', self._last_reply)
@@ -203,18 +250,167 @@ class PyRadioClient(object):
         self._last_command = command
         if self._last_command is None:
             self._last_command = ''
+        if self._socket_file:
+            ret = self._send_request(command, unix=True)
+            if ret is not None:
+                return ret
+        return self._send_request(command)
+
+    def send_commands(self, commands):
+        ''' Send a number of commands over a single connection
+
+            Yields (return code, reply) for each command, in order;
+            last_command and last_reply are updated before each
+            one is yielded. On the Unix domain socket, commands
+            are pipelined (sent without waiting for the replies).
+        '''
+        commands = [x if x else '' for x in commands]
+        done = 0
+        if self._socket_file:
+            try:
+                for ret in self._pipeline(commands):
+                    done += 1
+                    yield ret
+            except (OSError, ValueError):
+                ''' send the rest one by one '''
+                pass
+        for command in commands[done:]:
+            yield self.send_command(command)
+
+    def _pipeline(self, commands):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
         try:
-            response = requests.get(
-                    'http://' + self._host + ':' + self._port + '/' + command,
-                    timeout=self._timeout)
-            response.raise_for_status()  # Raise an exception for HTTP errors
-            self._last_reply = response.text
-            return 0, self._last_reply
-        except requests.exceptions.RequestException as e:
-            self._last_reply = f'{str(e)}'.split(':')[-1].strip(
-                    ).replace('"', '').replace("'", '').replace(')', '')
+            sock.settimeout(self._timeout)
+            sock.connect(self._socket_file)
+            f = sock.makefile('rb')
+            for i in range(0, len(commands), self.PIPELINE_DEPTH):
+                chunk = commands[i:i + self.PIPELINE_DEPTH]
+                sock.sendall(b''.join(
+                    ('GET /' + self._quote(n) + ' HTTP/1.1\r\nHost: localhost\r\n\r\n').encode('utf-8')
+                    for n in chunk
+                ))
+                for command in chunk:
+                    status, reason, body, will_close = self._read_response(f)
+                    self._last_command = command
+                    if status >= 400:
+                        self._last_reply = reason
+                        yield 1, self._last_reply
+                    else:
+                        self._last_reply = body
+                        yield 0, self._last_reply
+                    if will_close:
+                        return
+        finally:
+            sock.close()
+
+    def _read_response(self, f):
+        ''' read a reply from a pipelined connection
+            (the server always sends a Content-Length)
+        '''
+        line = f.readline(65537)
+        if not line:
+            raise ConnectionResetError('Connection closed by server')
+        sp = line.decode('latin-1').rstrip('\r\n').split(' ', 2)
+        status = int(sp[1])
+        reason = sp[2] if len(sp) > 2 else ''
+        length = 0
+        will_close = False
+        while True:
+            line = f.readline(65537)
+            if line in (b'\r\n', b'\n', b''):
+                break
+            key, _, value = line.decode('latin-1').partition(':')
+            key = key.strip().lower()
+            if key == 'content-length':
+                length = int(value)
+            elif key == 'connection':
+                will_close = 'close' in value.lower()
+        body = f.read(length) if length else b''
+        return status, reason, body.decode('utf-8', 'replace'), will_close
+
+    def _quote(self, command):
+        return quote(command, safe='/,?=&%')
+
+    def _connection(self, unix):
+        if unix:
+            if self._unix_conn is None:
+                self._unix_conn = UnixHTTPConnection(self._socket_file, timeout=self._timeout)
+            return self._unix_conn
+        if self._tcp_conn is None:
+            if self._tls:
+                import ssl
+                self._tcp_conn = http.client.HTTPSConnection(
+                    self._host, int(self._port), timeout=self._timeout,
+                    context=ssl.create_default_context(cafile=self._cafile)
+                )
+            else:
+                self._tcp_conn = http.client.HTTPConnection(
+                    self._host, int(self._port), timeout=self._timeout
+                )
+        return self._tcp_conn
+
+    def _close_connection(self, unix):
+        if unix:
+            if self._unix_conn is not None:
+                self._unix_conn.close()
+                self._unix_conn = None
+        elif self._tcp_conn is not None:
+            self._tcp_conn.close()
+            self._tcp_conn = None
+
+    def _send_request(self, command, unix=False):
+        ''' Send a command, reusing the (keep-alive) connection
+            to the server, if still open
+            Returns None if the Unix domain socket is not usable
+        '''
+        for retry in (True, False):
+            conn = self._connection(unix)
+            reused = conn.sock is not None
+            try:
+                conn.request('GET', '/' + self._quote(command), headers=self._headers)
+                response = conn.getresponse()
+                body = response.read().decode('utf-8', 'replace')
+            except socket.timeout:
+                self._close_connection(unix)
+                self._last_reply = 'Read timed out'
+                return 1, self._last_reply
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError) as e:
+                ''' keep-alive connection closed by the server '''
+                self._close_connection(unix)
+                if retry and reused:
+                    continue
+                error = e
+            except (OSError, http.client.HTTPException, ValueError) as e:
+                self._close_connection(unix)
+                error = e
+            else:
+                if response.will_close:
+                    self._close_connection(unix)
+                if response.status >= 400:
+                    self._last_reply = response.reason
+                    return 1, self._last_reply
+                self._last_reply = body
+                return 0, self._last_reply
+            if unix:
+                ''' stale socket file; use TCP from now on '''
+                self._socket_file = None
+                return None
+            self._last_reply = getattr(error, 'strerror', None) or str(error)
             return 1, self._last_reply
 
+    def close(self):
+        self._close_connection(unix=True)
+        self._close_connection(unix=False)
+
+    def _get_socket_file(self):
+        if platform.lower().startswith('win') or \
+                not hasattr(socket, 'AF_UNIX') or \
+                not self._file.endswith('.txt'):
+            return
+        socket_file = self._file[:-4] + '.sock'
+        if path.exists(socket_file):
+            self._socket_file = socket_file
+
     def _get_host_and_port_from_file(self):
         try:
             with open(self._file, 'r') as f:
@@ -268,6 +464,16 @@ class MyArgParser(ArgumentParser):
         #     f.write(t + '\n')
         return '[bold]' + t.replace('||', r']').replace('|', r'\[').replace('• ', '') + '[/bold]'
 
+def print_reply(a_client):
+    ''' only the info and help replies need formatting '''
+    reply = a_client.last_reply
+    if not a_client.last_command:
+        format_list(reply)
+    elif a_client.last_command in ('i', 'info') or reply is None:
+        print(reply)
+    else:
+        sys.stdout.write(reply + '\n')
+
 
 def client():
 
@@ -286,8 +492,16 @@ def client():
                              ' detect headless server last, instead of headless server first')
     server_opts.add_argument('-t', '--timeout', default='1.0',
                              help='Set the timeout (default = 1.0)')
-    server_opts.add_argument('command', nargs='?', type=str, default=None,
-                             help='The command to send to the server')
+    server_opts.add_argument('--tls', action='store_true', default=False,
+                             help='Connect to the server using TLS (https)')
+    server_opts.add_argument('--cafile', default=None,
+                             help="Verify the server's certificate with this file (for self-signed certificates)")
+    server_opts.add_argument('--token', default=getenv('PYRADIO_TOKEN'),
+                             help='The access token of the server (default = $PYRADIO_TOKEN)')
+    server_opts.add_argument('-b', '--batch', action='store_true', default=False,
+                             help='Read commands from stdin (one per line), when no commands are specified')
+    server_opts.add_argument('command', nargs='*', type=str, default=None,
+                             help='The command(s) to send to the server; all commands are sent over a single connection')
     args = parser.parse_args()
     # sys.stdout.flush()
 
@@ -306,16 +520,31 @@ def client():
         except ValueError:
             print('[red]Error[/red]: Invalid server IP and PORT specified\n')
             sys.exit()
-    x = PyRadioClient(host=host, port=port, reverse_detection=args.reverse_detection)
+    x = PyRadioClient(
+        host=host, port=port,
+        reverse_detection=args.reverse_detection,
+        timeout=timeout,
+        tls=args.tls, cafile=args.cafile, token=args.token
+    )
 
     if x.server_ip is None or x.server_port is None:
         print('No [magenta]PyRadio[/magenta] Remote Control Servers running\n')
+    elif args.batch and not args.command:
+        ''' replies are printed as soon as each command is read '''
+        for line in sys.stdin:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                x.send_command(line)
+                print_reply(x)
+        x.close()
+    elif len(args.command) > 1:
+        for _ in x.send_commands(args.command):
+            print_reply(x)
+        x.close()
     else:
-        x.send_command(args.command)
-        if x.last_command:
-            print(x.last_reply)
-        else:
-            format_list(x.last_reply)
+        x.send_command(args.command[0] if args.command else None)
+        x.close()
+        print_reply(x)
 
 if __name__ == '__main__':
     client()
@@ -7,7 +7,7 @@ import curses
 import collections
 import json
 # import socket
-from os import path, getenv, makedirs, remove, rename, readlink, SEEK_END, SEEK_CUR, environ, getpid, listdir, rmdir
+from os import path, getenv, makedirs, remove, rename, readlink, stat, SEEK_END, SEEK_CUR, environ, getpid, listdir, rmdir
 from sys import platform
 from time import ctime, sleep
 from datetime import datetime
@@ -134,7 +134,19 @@ class PyRadioStations(object):
             PLAYLIST_HAS_NAME_URL_ENCODING_ICON: 'PLAYLIST_HAS_NAME_URL_ENCODING_ICON'
         }
 
-    dirty_playlist = False
+    _dirty_playlist = False
+
+    ''' incremented whenever the stations or the playlists
+        are edited, saved or read; the remote control server
+        uses it to invalidate its cached listings
+    '''
+    _edit_generation = 0
+
+    ''' playlists read by the remote control server
+        {(path, full): (mtime, size, stations)}
+    '''
+    _server_playlists = {}
+    _server_playlists_lock = threading.Lock()
 
     playlist_recovery_result = 0
 
@@ -345,6 +357,23 @@ class PyRadioStations(object):
     def online_browser(self, value):
         self._online_browser = value
 
+    @property
+    def dirty_playlist(self):
+        return self._dirty_playlist
+
+    @dirty_playlist.setter
+    def dirty_playlist(self, value):
+        self._dirty_playlist = value
+        self._edit_generation += 1
+
+    @property
+    def edit_generation(self):
+        return self._edit_generation
+
+    @edit_generation.setter
+    def edit_generation(self, value):
+        raise ValueError('property is read only')
+
     @property
     def playlist_version(self):
         return self._playlist_version
@@ -648,18 +677,49 @@ class PyRadioStations(object):
                 if logger.isEnabledFor(logging.DEBUG):
                     logger.debug('Added: {0} - {1}'.format(self.added_stations, a_pkg_station))
 
-    def read_playlist_for_server(self, stationFile):
+    def read_playlist_for_server(self, stationFile, full=False):
+        ''' Read a playlist for the remote control server
+
+            Returns the playlist path and a list of station names
+            (group names in bold), or, if full is True, a list of
+            [name, url, encoding] items (url is "-" for groups,
+            encoding may be missing).
+
+            The result is cached until the file is modified;
+            callers get a copy of the list.
+        '''
         out = []
         in_file = self._construct_playlist_path(stationFile)
+        try:
+            st = stat(in_file)
+        except OSError:
+            return None, []
+        key = (in_file, full)
+        with self._server_playlists_lock:
+            cached = self._server_playlists.get(key)
+        if cached is not None and \
+                cached[0] == st.st_mtime_ns and \
+                cached[1] == st.st_size:
+            return in_file, list(cached[2])
         try:
             with open(in_file, 'r', encoding='utf-8') as cfgfile:
                 for row in csv.reader(filter(lambda row: row[0]!='#', cfgfile), skipinitialspace=True):
                     if not row:
                         continue
-                    out.append('<b>' + row[0] + '</b>') if row[1] == '-' else out.append(row[0])
+                    if full:
+                        out.append(row[:3])
+                    else:
+                        out.append('<b>' + row[0] + '</b>') if row[1] == '-' else out.append(row[0])
         except:
             return None, []
-        return in_file, out
+        with self._server_playlists_lock:
+            self._server_playlists[key] = (st.st_mtime_ns, st.st_size, out)
+        return in_file, list(out)
+
+    def clear_server_playlists_cache(self):
+        with self._server_playlists_lock:
+            self._server_playlists.clear()
+        self._edit_generation += 1
 
     def read_playlist_file(
         self,
@@ -867,6 +927,7 @@ class PyRadioStations(object):
                 logger.debug('Cannot rename playlist file...')
             return -2
         self.dirty_playlist = False
+        self.clear_server_playlists_cache()
         if self.renamed_stations:
             for n in self.renamed_stations:
                 chk_referer_file = path.join(self.stations_dir, n[0] + '.referer.txt')
@@ -1147,6 +1208,7 @@ class PyRadioStations(object):
         d.rotate(target)
         self.stations = list(d)
         self.number_of_stations = len(self.stations)
+        self._edit_generation += 1
         return True, self.number_of_stations
 
     def registers_exist(self):
@@ -1171,6 +1233,7 @@ class PyRadioStations(object):
                 a_file_time = ctime(path.getmtime(a_file))
                 self.playlists.append([a_file_name, a_file_time, a_file_size, a_file])
         self.playlists.sort()
+        self._edit_generation += 1
         ''' get already loaded playlist id '''
         for i, a_playlist in enumerate(self.playlists):
             if a_playlist[-1] == self.station_path:
@@ -1306,6 +1369,17 @@ class PyRadioConfig(PyRadioStations):
 
     show_recording_start_message = True
 
+    ''' Remote Control Server TLS certificate and private key
+        files (PEM; the key can be in the certificate file),
+        and the token clients have to present (config file only) '''
+    remote_control_server_certificate = ''
+    remote_control_server_key = ''
+    remote_control_server_token = ''
+
+    ''' Keep an idle mpv process ready for the next station
+        (config file only) '''
+    mpv_standby = False
+
     ''' True if lock file exists '''
     locked = False
 
@@ -1495,6 +1569,13 @@ class PyRadioConfig(PyRadioStations):
         else:
             return path.join(self.state_dir, 'server.txt')
 
+    @property
+    def remote_control_server_socket_file(self):
+        ''' the Unix domain socket the server listens on,
+            next to the report file
+        '''
+        return self.remote_control_server_report_file[:-4] + '.sock'
+
     @property
     def open_last_playlist(self):
         return self.opts['open_last_playlist'][1]
@@ -2177,6 +2258,14 @@ class PyRadioConfig(PyRadioStations):
                 st = sp[1].strip()
                 if st.lower() == 'false':
                     self.show_recording_start_message = False
+            elif sp[0] in ('remote_control_server_certificate',
+                           'remote_control_server_key'):
+                setattr(self, sp[0], path.expanduser('='.join(sp[1:])))
+            elif sp[0] == 'remote_control_server_token':
+                ''' the token may contain "=" '''
+                self.remote_control_server_token = '='.join(sp[1:])
+            elif sp[0] == 'mpv_standby':
+                self.mpv_standby = sp[1].strip().lower() == 'true'
             elif sp[0] == 'player':
                 self.opts['player'][1] = sp[1].lower().replace(' ', '')
                 # if sys.platform.startswith('win'):
@@ -2636,6 +2725,26 @@ class PyRadioConfig(PyRadioStations):
             out.append('#')
             out.append('# Default value: True')
             out.append('show_recording_message = False')
+        if self.remote_control_server_certificate:
+            out.append('#')
+            out.append('# Remote Control Server TLS certificate and key (PEM files)')
+            out.append('#')
+            out.append('# Default value: none')
+            out.append('remote_control_server_certificate = ' + self._dir_to_shorthand(self.remote_control_server_certificate))
+            if self.remote_control_server_key:
+                out.append('remote_control_server_key = ' + self._dir_to_shorthand(self.remote_control_server_key))
+        if self.remote_control_server_token:
+            out.append('#')
+            out.append('# Remote Control Server access token')
+            out.append('#')
+            out.append('# Default value: none')
+            out.append('remote_control_server_token = ' + self.remote_control_server_token)
+        if self.mpv_standby:
+            out.append('#')
+            out.append('# Keep an idle mpv process ready for the next station')
+            out.append('#')
+            out.append('# Default value: False')
+            out.append('mpv_standby = True')
 
         if out:
             out.reverse()
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+''' Incremental HTTP/1.x request parser
+
+    Used by the Remote Control Server to support keep-alive
+    and pipelined requests; data is fed as it is received and
+    complete requests are returned as soon as they are available.
+'''
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class HttpParseError(ValueError):
+    ''' Raised when a malformed request is received.
+        status is the HTTP status to reply with.
+    '''
+
+    def __init__(self, msg, status='400 Bad Request'):
+        super(HttpParseError, self).__init__(msg)
+        self.status = status
+
+
+class HttpRequest(object):
+
+    __slots__ = ('method', 'target', 'path', 'query', 'version', 'headers', 'body')
+
+    def __init__(self, method, target, version, headers, body=b''):
+        self.method = method
+        self.target = target
+        self.version = version
+        self.headers = headers
+        self.body = body
+        if '?' in target:
+            self.path, self.query = target.split('?', 1)
+        else:
+            self.path = target
+            self.query = ''
+
+    @property
+    def keep_alive(self):
+        ''' HTTP/1.1 connections are persistent by default,
+            HTTP/1.0 connections have to ask for it
+        '''
+        conn = self.headers.get('connection', '').lower()
+        if self.version == 'HTTP/1.1':
+            return 'close' not in conn
+        return 'keep-alive' in conn
+
+    def header(self, name, default=''):
+        return self.headers.get(name.lower(), default)
+
+    def __repr__(self):
+        return '<HttpRequest {0} {1} {2}>'.format(self.method, self.target, self.version)
+
+
+class HttpRequestParser(object):
+    ''' Parse HTTP requests from a byte stream
+
+        Usage:
+            parser = HttpRequestParser()
+            for request in parser.feed(data):
+                ...
+
+        Both CRLF and bare LF line endings are accepted
+        (simple clients may send the latter).
+    '''
+
+    MAX_HEADER_SIZE = 16384
+    MAX_BODY_SIZE = 1048576
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._request = None
+        self._body_left = 0
+        self._chunked = False
+
+    @property
+    def has_pending_data(self):
+        return len(self._buf) > 0 or self._request is not None
+
+    def feed(self, data):
+        ''' Add data to the internal buffer and return
+            a list of the requests completed by it
+        '''
+        self._buf.extend(data)
+        out = []
+        while True:
+            if self._request is None:
+                if not self._parse_head():
+                    break
+            if self._chunked:
+                if not self._parse_chunks():
+                    break
+            elif self._body_left > 0:
+                if len(self._buf) < self._body_left:
+                    break
+                self._request.body = bytes(self._buf[:self._body_left])
+                del self._buf[:self._body_left]
+                self._body_left = 0
+            out.append(self._request)
+            self._request = None
+        return out
+
+    def _find_head_end(self):
+        ''' return (end of head, start of body) or (-1, -1) '''
+        crlf = self._buf.find(b'\r\n\r\n')
+        lf = self._buf.find(b'\n\n')
+        if lf > -1 and (crlf == -1 or lf < crlf):
+            return lf, lf + 2
+        if crlf > -1:
+            return crlf, crlf + 4
+        return -1, -1
+
+    def _parse_head(self):
+        ''' skip empty lines between pipelined requests (RFC 7230 3.5) '''
+        while self._buf[:2] == b'\r\n' or self._buf[:1] == b'\n':
+            del self._buf[:2 if self._buf[:1] == b'\r' else 1]
+        end, body_start = self._find_head_end()
+        if end == -1:
+            if len(self._buf) > self.MAX_HEADER_SIZE:
+                raise HttpParseError('Request header too large',
+                                     '431 Request Header Fields Too Large')
+            return False
+        try:
+            head = bytes(self._buf[:end]).decode('latin-1')
+        except UnicodeDecodeError:
+            raise HttpParseError('Invalid request header')
+        del self._buf[:body_start]
+        lines = [x.rstrip('\r') for x in head.split('\n')]
+        sp = lines[0].split(' ')
+        if len(sp) == 2:
+            ''' HTTP/0.9 style request line '''
+            sp.append('HTTP/1.0')
+        if len(sp) != 3 or not sp[2].startswith('HTTP/'):
+            raise HttpParseError('Invalid request line')
+        method, target, version = sp
+        headers = {}
+        for n in lines[1:]:
+            if ':' not in n:
+                raise HttpParseError('Invalid header line')
+            key, value = n.split(':', 1)
+            key = key.strip().lower()
+            value = value.strip()
+            if key in headers:
+                headers[key] += ', ' + value
+            else:
+                headers[key] = value
+        self._request = HttpRequest(method, self._decode_target(target), version, headers)
+        self._chunked = 'chunked' in headers.get('transfer-encoding', '').lower()
+        if not self._chunked:
+            try:
+                self._body_left = int(headers.get('content-length', '0'))
+            except ValueError:
+                raise HttpParseError('Invalid Content-Length')
+            if self._body_left < 0:
+                raise HttpParseError('Invalid Content-Length')
+            if self._body_left > self.MAX_BODY_SIZE:
+                raise HttpParseError('Request body too large',
+                                     '413 Payload Too Large')
+        return True
+
+    def _decode_target(self, target):
+        ''' the request target is kept as sent (no unquoting),
+            only an absolute-form URI is reduced to its path
+        '''
+        if target.startswith('http://') or target.startswith('https://'):
+            x = target.find('/', target.find('//') + 2)
+            target = target[x:] if x > -1 else '/'
+        return target
+
+    def _parse_chunks(self):
+        body = bytearray(self._request.body)
+        while True:
+            x = self._buf.find(b'\n')
+            if x == -1:
+                return False
+            try:
+                size = int(bytes(self._buf[:x]).split(b';')[0].strip(), 16)
+            except ValueError:
+                raise HttpParseError('Invalid chunk size')
+            if size == 0:
+                ''' last chunk; wait for the (empty) trailer '''
+                end = self._buf.find(b'\n', x + 1)
+                if end == -1:
+                    return False
+                del self._buf[:end + 1]
+                self._request.body = bytes(body)
+                self._chunked = False
+                return True
+            if len(self._buf) < x + 1 + size + 1:
+                return False
+            if len(body) + size > self.MAX_BODY_SIZE:
+                raise HttpParseError('Request body too large',
+                                     '413 Payload Too Large')
+            body.extend(self._buf[x + 1:x + 1 + size])
+            ''' skip the chunk data CRLF '''
+            rest = x + 1 + size
+            if self._buf[rest:rest + 2] == b'\r\n':
+                rest += 2
+            elif self._buf[rest:rest + 1] == b'\n':
+                rest += 1
+            else:
+                return self._keep_partial_chunk_body(body, x, size)
+            del self._buf[:rest]
+            self._request.body = bytes(body)
+
+    def _keep_partial_chunk_body(self, body, x, size):
+        ''' chunk data received, line terminator not yet '''
+        if len(self._buf) < x + 1 + size + 2:
+            return False
+        raise HttpParseError('Invalid chunk terminator')
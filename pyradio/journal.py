@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+''' Journal of PyRadio events
+
+    State transitions (playback started or stopped, station,
+    title, volume and recording changes, errors, commands
+    received by the Remote Control Server) are recorded as
+    JSON objects:
+
+        {"seq": 12, "time": 1700000000.123, "type": "title",
+         "station": "Jazz FM", "title": "Artist - Song"}
+
+    emit() only puts the event in a queue; a dedicated thread
+    appends it to a rotating newline-delimited JSON file (once
+    open() has been called) and hands it to the listeners (the
+    /events streams of the Remote Control Server). The last
+    MAX_RECENT events are also kept in memory.
+
+    Usage:
+        from .journal import JOURNAL
+        JOURNAL.emit('volume', volume=50)
+'''
+import json
+import logging
+import threading
+import queue
+from collections import deque
+from logging.handlers import RotatingFileHandler
+from time import time
+
+logger = logging.getLogger(__name__)
+
+
+class EventJournal(object):
+
+    ''' journal file size and number of rotated files kept '''
+    MAX_BYTES = 1048576
+    BACKUP_COUNT = 3
+    ''' events kept in memory '''
+    MAX_RECENT = 1000
+
+    def __init__(self):
+        self._recent = deque(maxlen=self.MAX_RECENT)
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._listeners = {}
+        self._handler = None
+        self._thread = None
+
+    @property
+    def seq(self):
+        ''' sequence number of the last event '''
+        with self._lock:
+            return self._seq
+
+    def open(self, a_file):
+        ''' start writing events to a_file '''
+        try:
+            handler = RotatingFileHandler(
+                a_file,
+                maxBytes=self.MAX_BYTES,
+                backupCount=self.BACKUP_COUNT,
+                encoding='utf-8'
+            )
+        except OSError as e:
+            if logger.isEnabledFor(logging.ERROR):
+                logger.error('Cannot open events journal "{0}": {1}'.format(a_file, e))
+            return False
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        self._queue.put(('open', handler))
+        self._start()
+        return True
+
+    def close(self):
+        self._queue.put(('open', None))
+
+    def emit(self, event_type, **data):
+        with self._lock:
+            self._seq += 1
+            event = {'seq': self._seq, 'time': round(time(), 3), 'type': event_type}
+            event.update(data)
+            self._recent.append(event)
+            self._queue.put(('event', event))
+        self._start()
+
+    def since(self, seq=0, event_types=None):
+        ''' events kept in memory with a sequence number
+            greater than seq (of event_types, if given)
+        '''
+        with self._lock:
+            return [
+                n for n in self._recent
+                if n['seq'] > seq and
+                (not event_types or n['type'] in event_types)
+            ]
+
+    def add_listener(self, func, since=None):
+        ''' func(event, line) is called from the journal's
+            thread for every event (line is its JSON form),
+            starting with the events kept in memory after
+            sequence number since, if given; it is removed
+            when it returns False or raises an exception
+        '''
+        self._queue.put(('listen', (func, since)))
+        self._start()
+
+    def remove_listener(self, func):
+        self._queue.put(('unlisten', func))
+
+    def _start(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run,
+                        name='pyradio-journal'
+                    )
+                    self._thread.daemon = True
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            action, data = self._queue.get()
+            if action == 'event':
+                line = json.dumps(data, ensure_ascii=False)
+                if self._handler is not None:
+                    self._handler.handle(logging.makeLogRecord({'msg': line}))
+                for func, last in list(self._listeners.items()):
+                    if data['seq'] > last:
+                        self._call(func, data, line)
+            elif action == 'open':
+                if self._handler is not None:
+                    self._handler.close()
+                self._handler = data
+            elif action == 'listen':
+                func, since = data
+                ''' events still in the queue are delivered
+                    only if they are not in the backlog '''
+                with self._lock:
+                    last = self._seq
+                    backlog = [n for n in self._recent if n['seq'] > since] if since is not None else []
+                self._listeners[func] = last
+                for n in backlog:
+                    if not self._call(func, n, json.dumps(n, ensure_ascii=False)):
+                        break
+            elif action == 'unlisten':
+                self._listeners.pop(data, None)
+
+    def _call(self, func, event, line):
+        try:
+            ret = func(event, line)
+        except Exception as e:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug('Removing events listener: "{}"'.format(e))
+            ret = False
+        if ret is False:
+            self._listeners.pop(func, None)
+            return False
+        return True
+
+
+JOURNAL = EventJournal()
@@ -13,6 +13,7 @@ import subprocess
 from tempfile import gettempdir
 from .common import player_start_stop_token
 from .cjkwrap import cjklen
+from .journal import JOURNAL
 
 import locale
 locale.setlocale(locale.LC_ALL, "")
@@ -124,6 +125,13 @@ class Log(object):
         if self.msg:
             self.write(self.msg)
 
+    def _journal_title_and_station(self, old, new):
+        if new[1] and new[1] != old[1]:
+            JOURNAL.emit('station', station=new[1])
+        if new[0] and new[0] != old[0] and \
+                new[0] != 'Player is stopped!':
+            JOURNAL.emit('title', station=new[1], title=new[0])
+
     def _do_i_print_last_char(self, first_print):
         if first_print:
             first_print = False
@@ -180,6 +188,8 @@ class Log(object):
                 if counter is not None:
                     self.counter = counter
                 self.error_msg = True if error_msg else False
+                if error_msg and msg:
+                    JOURNAL.emit('error', error=msg.strip())
 
                 #if logger.isEnabledFor(logging.DEBUG):
                 #    logger.debug('after ----------------------------')
@@ -216,6 +226,7 @@ class Log(object):
                         if msg.startswith('[Vol:') or msg.startswith('[Muted]'):
                             msg = msg.split('] ')[-1]
                     with self._song_title_lock:
+                        old_title_and_station = (self._song_title, self._station_that_is_playing_now)
                         if msg:
                             if msg.startswith('Title: '):
                                 self._song_title = msg.replace('Title: ', '')
@@ -233,6 +244,9 @@ class Log(object):
                                     self._station_that_is_playing_now = msg[9:]
                                 elif msg.startswith('Buffering: '):
                                     self._station_that_is_playing_now = msg[11:]
+                        title_and_station = (self._song_title, self._station_that_is_playing_now)
+                    if title_and_station != old_title_and_station:
+                        self._journal_title_and_station(old_title_and_station, title_and_station)
 
                     if self._add_chapter_function is not None and msg:
                         if msg.startswith('Title: '):
@@ -243,6 +257,7 @@ class Log(object):
                     self._write_title_to_log(msg if msg else 'No')
                     self._show_notification(msg)
                     self._set_web_title(msg)
+                    self._set_web_state()
                     if self._show_status_updates:
                         if logger.isEnabledFor(logging.DEBUG):
                             try:
@@ -373,6 +388,13 @@ class Log(object):
                             self._song_title = old_song_title
 
 
+    def _set_web_state(self):
+        ''' let the remote control server push volume,
+            mute, recording and station changes '''
+        server = self._get_web_song_title()
+        if server:
+            server.publish_state()
+
     def _get_icon_path(self):
         self.icon_path = self._cnf.notification_image_file
         if self.icon_path is None:
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+''' Metrics of a PyRadio instance, in Prometheus text format
+
+    Collecting is meant to be cheap: incrementing a counter or
+    observing a value in a histogram is a dict lookup and a few
+    additions under a lock. Formatting only happens when the
+    metrics are requested (Remote Control Server /metrics).
+
+    Usage:
+        from .metrics import counter, histogram
+        REQUESTS = counter('pyradio_requests_total', 'Requests', ('path', ))
+        REQUESTS.inc('/title')
+'''
+import threading
+from bisect import bisect_left
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+DEFAULT_BUCKETS = (
+    .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10
+)
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_labels(names, values, extra=''):
+    out = ['{0}="{1}"'.format(n, _escape(v)) for n, v in zip(names, values)]
+    if extra:
+        out.append(extra)
+    if out:
+        return '{' + ','.join(out) + '}'
+    return ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric(object):
+
+    TYPE = ''
+
+    def __init__(self, name, doc, labels=()):
+        self.name = name
+        self.doc = doc
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _head(self):
+        return [
+            '# HELP {0} {1}'.format(self.name, self.doc),
+            '# TYPE {0} {1}'.format(self.name, self.TYPE)
+        ]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def collect(self):
+        with self._lock:
+            items = list(self._values.items())
+        out = self._head()
+        for label_values, value in sorted(items):
+            out.append(self.name + _format_labels(self.labels, label_values) +
+                       ' ' + _format_value(value))
+        return out
+
+
+class Counter(_Metric):
+    ''' A value that only goes up '''
+
+    TYPE = 'counter'
+
+    def inc(self, *label_values, value=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + value
+
+
+class Gauge(_Metric):
+    ''' A value that can go up and down
+
+        Either set() it, or give a function that returns
+        its value (or a dict of {label values: value}),
+        to be called when the metrics are requested.
+    '''
+
+    TYPE = 'gauge'
+
+    def __init__(self, name, doc, labels=(), function=None):
+        super(Gauge, self).__init__(name, doc, labels)
+        self.function = function
+
+    def set(self, value, *label_values):
+        with self._lock:
+            self._values[label_values] = value
+
+    def collect(self):
+        if self.function is not None:
+            try:
+                ret = self.function()
+            except Exception:
+                ret = None
+            with self._lock:
+                self._values.clear()
+                if isinstance(ret, dict):
+                    self._values.update(ret)
+                elif ret is not None:
+                    self._values[()] = ret
+        return super(Gauge, self).collect()
+
+
+class Histogram(_Metric):
+    ''' Counts of observed values, in cumulative buckets '''
+
+    TYPE = 'histogram'
+
+    def __init__(self, name, doc, labels=(), buckets=DEFAULT_BUCKETS):
+        super(Histogram, self).__init__(name, doc, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *label_values):
+        ''' values are kept as [per bucket counts, +Inf count, sum] '''
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            item = self._values.get(label_values)
+            if item is None:
+                item = self._values[label_values] = [[0] * len(self.buckets), 0, 0.0]
+            if i < len(self.buckets):
+                item[0][i] += 1
+            item[1] += 1
+            item[2] += value
+
+    def collect(self):
+        with self._lock:
+            items = [(k, (list(v[0]), v[1], v[2])) for k, v in self._values.items()]
+        out = self._head()
+        for label_values, (counts, count, total) in sorted(items):
+            acc = 0
+            for bucket, n in zip(self.buckets, counts):
+                acc += n
+                out.append(self.name + '_bucket' +
+                           _format_labels(self.labels, label_values, 'le="{}"'.format(_format_value(float(bucket)))) +
+                           ' ' + str(acc))
+            out.append(self.name + '_bucket' +
+                       _format_labels(self.labels, label_values, 'le="+Inf"') +
+                       ' ' + str(count))
+            out.append(self.name + '_sum' + _format_labels(self.labels, label_values) +
+                       ' ' + _format_value(total))
+            out.append(self.name + '_count' + _format_labels(self.labels, label_values) +
+                       ' ' + str(count))
+        return out
+
+
+class Registry(object):
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        ''' Return the metric registered with the same name,
+            if any (modules may be reloaded), or metric
+        '''
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        out = []
+        for n in sorted(metrics, key=lambda x: x.name):
+            out.extend(n.collect())
+        return '\n'.join(out) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def counter(name, doc, labels=()):
+    return REGISTRY.register(Counter(name, doc, labels))
+
+
+def gauge(name, doc, labels=(), function=None):
+    return REGISTRY.register(Gauge(name, doc, labels, function))
+
+
+def histogram(name, doc, labels=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, doc, labels, buckets))
@@ -0,0 +1,416 @@
+# -*- coding: utf-8 -*-
+''' A persistent JSON IPC connection to mpv
+
+    mpv answers a command carrying a "request_id" with a reply
+    holding the same id, and sends its events (and the replies
+    to commands nobody waits for) on the same connection.
+
+    MpvIpc keeps one connection open for the lifetime of an mpv
+    process. command() sends a command with a unique request_id
+    and waits for its reply; whatever else is received is handed
+    to the status update thread through messages().
+
+    There is no dedicated reader thread: the status update thread
+    reads the connection while iterating messages(), and a thread
+    waiting for a reply reads it itself when nobody else is doing
+    so; either way, each reply is routed to the thread waiting
+    for it.
+
+    The connection is a stream: a read may return part of a
+    message, or several messages. MessageReader reassembles
+    them into whole (newline terminated) messages.
+
+    Usage:
+        ipc = MpvIpc('/tmp/mpvsocket.1234')
+        if ipc.connect():
+            reply = ipc.command(['get_property', 'volume'])
+'''
+import json
+import logging
+import socket
+import threading
+from collections import deque
+from itertools import count
+from sys import platform
+from time import monotonic
+if platform.startswith('win'):
+    import win32pipe, win32file, pywintypes
+
+logger = logging.getLogger(__name__)
+
+
+class MessageReader(object):
+    ''' Splits a byte stream into newline terminated messages
+
+        Data is received directly into a reusable buffer
+        (read_from) or copied into it (feed); messages()
+        then yields every complete message in the buffer,
+        without the terminating newline. A partial message
+        stays in the buffer until the rest of it arrives;
+        the buffer only grows for messages larger than it.
+
+        Usage:
+            reader = MessageReader()
+            while reader.read_from(sock.recv_into):
+                for msg in reader.messages():
+                    json.loads(msg)
+    '''
+
+    SIZE = 64 * 1024
+
+    ''' free space read_from() makes sure is there '''
+    MIN_READ = 4096
+
+    ''' a message larger than this is dropped '''
+    MAX_SIZE = 16 * 1024 * 1024
+
+    def __init__(self, size=None):
+        self._buf = bytearray(size or self.SIZE)
+        ''' unconsumed data is self._buf[self._start:self._end];
+            there is no newline in self._buf[self._start:self._scan] '''
+        self._start = self._scan = self._end = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    def read_from(self, recv_into):
+        ''' Read into the buffer with recv_into (for example
+            sock.recv_into); returns the number of bytes read '''
+        self._make_room(self.MIN_READ)
+        n = recv_into(memoryview(self._buf)[self._end:])
+        self._end += n
+        return n
+
+    def feed(self, data):
+        ''' Append data (bytes) to the buffer '''
+        size = len(data)
+        self._make_room(size)
+        self._buf[self._end:self._end + size] = data
+        self._end += size
+
+    def messages(self):
+        ''' Yield the complete messages in the buffer '''
+        buf = self._buf
+        while True:
+            i = buf.find(b'\n', self._scan, self._end)
+            if i == -1:
+                self._scan = self._end
+                break
+            start = self._start
+            self._start = self._scan = i + 1
+            if i > start:
+                ''' copied once, from a view of the buffer '''
+                yield bytes(memoryview(buf)[start:i])
+        if self._start == self._end:
+            self._start = self._scan = self._end = 0
+
+    def clear(self):
+        self._start = self._scan = self._end = 0
+
+    def _make_room(self, size):
+        if len(self._buf) - self._end >= size:
+            return
+        pending = self._end - self._start
+        if self._start > 0:
+            ''' move the partial message to the front '''
+            self._buf[:pending] = self._buf[self._start:self._end]
+            self._scan -= self._start
+            self._start, self._end = 0, pending
+        if len(self._buf) - self._end >= size:
+            return
+        if pending + size > self.MAX_SIZE:
+            logger.error('mpv message larger than {} bytes; dropping it'.format(self.MAX_SIZE))
+            self.clear()
+            if size > len(self._buf):
+                self._buf.extend(bytes(size - len(self._buf)))
+            return
+        new_size = len(self._buf)
+        while new_size - pending < size:
+            new_size *= 2
+        self._buf.extend(bytes(new_size - len(self._buf)))
+
+
+class MpvIpc(object):
+    ''' A JSON IPC connection to an mpv process '''
+
+    WIN = platform.startswith('win')
+
+    READ_SIZE = 64 * 1024
+
+    ''' recv() timeout, so that readers notice stop requests '''
+    POLL = .5
+
+    ''' default time to wait for a reply '''
+    TIMEOUT = 2
+
+    ''' messages kept while no status update thread reads them '''
+    MAX_MESSAGES = 256
+
+    ''' request_ids of command(); the fixed ids used by
+        the player (100 - 1004) stay below this '''
+    FIRST_REQUEST_ID = 10000
+
+    def __init__(self, path):
+        self.path = path
+        self._sock = None
+        self._closed = False
+        self._reader = MessageReader(self.READ_SIZE)
+        self._ids = count(self.FIRST_REQUEST_ID)
+        ''' request_id -> [threading.Event, reply] '''
+        self._pending = {}
+        self._messages = deque(maxlen=self.MAX_MESSAGES)
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._read_lock = threading.Lock()
+
+    @property
+    def connected(self):
+        return self._sock is not None
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def connect(self):
+        ''' Connect to mpv, if not connected already
+
+            Returns True if connected; False if mpv is not
+            listening (yet), or the connection has been closed.
+        '''
+        with self._lock:
+            if self._sock is not None:
+                return True
+            if self._closed:
+                return False
+            self._sock = self._open()
+            if self._sock is not None and logger.isEnabledFor(logging.DEBUG):
+                logger.debug('connected to mpv socket "{}"'.format(self.path))
+            return self._sock is not None
+
+    def close(self):
+        ''' Close the connection; threads waiting for a
+            reply get None, and messages() terminates '''
+        with self._lock:
+            self._closed = True
+            sock, self._sock = self._sock, None
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for waiter in pending:
+            waiter[0].set()
+        if sock is not None:
+            self._close(sock)
+
+    def post(self, message):
+        ''' Send a command without waiting for its reply
+
+            message is either the command (a list) or an
+            encoded JSON message. The reply, if any, is
+            received through messages().
+
+            Returns True if the command was sent.
+        '''
+        if not isinstance(message, bytes):
+            message = self._encode(message)
+        if self._sock is None and not self.connect():
+            return False
+        return self._write(message)
+
+    def command(self, args, timeout=None):
+        ''' Send a command and wait for its reply
+
+            Parameters
+            ==========
+            args
+                The command, as a list (for example
+                ['get_property', 'volume'])
+            timeout
+                Seconds to wait for the reply (default TIMEOUT)
+
+            Returns
+            =======
+            The reply (a dict), or None if the command could
+            not be sent or no reply was received in time.
+        '''
+        if timeout is None:
+            timeout = self.TIMEOUT
+        if self.WIN:
+            return self._command_on_new_pipe(args, timeout)
+        if self._sock is None and not self.connect():
+            return None
+        request_id = next(self._ids)
+        waiter = [threading.Event(), None]
+        with self._lock:
+            self._pending[request_id] = waiter
+        if self._write(self._encode(args, request_id)):
+            deadline = monotonic() + timeout
+            while not waiter[0].is_set() and self._sock is not None:
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    break
+                if self._read_lock.acquire(False):
+                    ''' nobody is reading; read for ourselves '''
+                    try:
+                        if not waiter[0].is_set():
+                            self._read()
+                    finally:
+                        self._read_lock.release()
+                else:
+                    waiter[0].wait(min(remaining, .05))
+        with self._lock:
+            self._pending.pop(request_id, None)
+        if waiter[1] is None and logger.isEnabledFor(logging.DEBUG):
+            logger.debug('no reply from mpv for {}'.format(args))
+        return waiter[1]
+
+    def messages(self, stop):
+        ''' Yield the events (and unclaimed replies) received,
+            as encoded JSON messages, until stop() returns True
+            or the connection is lost '''
+        while not stop():
+            with self._lock:
+                line = self._messages.popleft() if self._messages else None
+            if line is not None:
+                yield line
+                continue
+            if self._sock is None:
+                break
+            if self._read_lock.acquire(True, self.POLL):
+                try:
+                    self._read()
+                finally:
+                    self._read_lock.release()
+
+    def _encode(self, args, request_id=None):
+        msg = {'command': args}
+        if request_id is not None:
+            msg['request_id'] = request_id
+        return json.dumps(msg).encode('utf-8') + b'\n'
+
+    def _write(self, data):
+        sock = self._sock
+        if sock is None:
+            return False
+        try:
+            with self._send_lock:
+                if self.WIN:
+                    win32file.WriteFile(sock, data)
+                else:
+                    sock.sendall(data)
+            return True
+        except Exception as e:
+            ''' including socket.timeout: part of the message
+                may have been sent, and the next one would be
+                appended to it '''
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug('mpv socket write error: {}'.format(e))
+            self.close()
+            return False
+
+    def _read(self):
+        ''' Read from the connection once (called with
+            _read_lock held) and dispatch the messages
+            received; returns False if the connection is gone '''
+        sock = self._sock
+        if sock is None:
+            return False
+        try:
+            if self.WIN:
+                data = win32file.ReadFile(sock, self.READ_SIZE)[1]
+                self._reader.feed(data)
+                n = len(data)
+            else:
+                n = self._reader.read_from(sock.recv_into)
+        except socket.timeout:
+            return True
+        except Exception:
+            n = 0
+        if n == 0:
+            self.close()
+            return False
+        for line in self._reader.messages():
+            self._dispatch(line)
+        return True
+
+    def _dispatch(self, line):
+        msg = request_id = None
+        if b'"request_id"' in line:
+            try:
+                msg = json.loads(line)
+                request_id = msg.get('request_id')
+            except (ValueError, AttributeError):
+                pass
+        with self._lock:
+            waiter = self._pending.get(request_id) if request_id else None
+            if waiter is None:
+                self._messages.append(line)
+                return
+            waiter[1] = msg
+        waiter[0].set()
+
+    def _command_on_new_pipe(self, args, timeout):
+        ''' On Windows, the pipe is opened for synchronous I/O,
+            so a write would wait for the status update thread's
+            pending read to complete; commands that need a reply
+            use a pipe of their own instead '''
+        handle = self._open()
+        if handle is None:
+            return None
+        request_id = next(self._ids)
+        deadline = monotonic() + timeout
+        try:
+            win32file.WriteFile(handle, self._encode(args, request_id))
+            reader = MessageReader(self.READ_SIZE)
+            while monotonic() < deadline:
+                reader.feed(win32file.ReadFile(handle, self.READ_SIZE)[1])
+                for line in reader.messages():
+                    if b'"request_id"' in line:
+                        try:
+                            msg = json.loads(line)
+                        except ValueError:
+                            continue
+                        if msg.get('request_id') == request_id:
+                            return msg
+        except pywintypes.error:
+            pass
+        finally:
+            self._close(handle)
+        return None
+
+    def _open(self):
+        if self.WIN:
+            try:
+                handle = win32file.CreateFile(
+                    self.path,
+                    win32file.GENERIC_READ | win32file.GENERIC_WRITE,
+                    0,
+                    None,
+                    win32file.OPEN_EXISTING,
+                    0,
+                    None
+                )
+                win32pipe.SetNamedPipeHandleState(handle, win32pipe.PIPE_READMODE_MESSAGE, None, None)
+                return handle
+            except pywintypes.error:
+                return None
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.path)
+        except (OSError, socket.error):
+            sock.close()
+            return None
+        sock.settimeout(self.POLL)
+        return sock
+
+    def _close(self, sock):
+        if self.WIN:
+            try:
+                win32file.CloseHandle(sock)
+            except pywintypes.error:
+                pass
+        else:
+            try:
+                ''' wake up a thread blocked reading it '''
+                sock.shutdown(socket.SHUT_RDWR)
+            except (OSError, socket.error):
+                pass
+            sock.close()
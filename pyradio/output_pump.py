@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+''' Player output pump
+
+    The output of the players (the player itself and, when
+    recording, the monitor player) used to be read by a thread
+    per pipe, blocked in readline(). Now a single thread waits
+    for all of them with a selector, splits what it reads into
+    lines and hands each line to the handler of its pipe.
+
+    Handlers run on the pump thread, so they should not block
+    for long; a handler returning False stops following its
+    pipe. When a pipe is closed (the player exited), or its
+    handler stops following it or raises an exception, the
+    end handler of the pipe is called.
+
+    On Windows, selectors only support sockets; there, each
+    pipe is still read by a thread of its own, calling the same
+    handlers.
+
+    Usage:
+        pipe = PumpedPipe(process.stdout, on_line, on_end, name='mplayer')
+        pipe.start()
+        ...
+        pipe.join()
+'''
+import logging
+import os
+import selectors
+import threading
+from sys import platform
+''' In case of import from win.py '''
+try:
+    from .mpv_ipc import MessageReader
+except:
+    from mpv_ipc import MessageReader
+
+logger = logging.getLogger(__name__)
+
+
+class PumpedPipe(object):
+    ''' A pipe followed by the output pump
+
+        It behaves like the thread that used to read it:
+        start() starts following it, and join() waits until
+        it has been closed and its end handler has returned
+        (or returns at once, when called by a handler).
+    '''
+
+    def __init__(self, pipe, on_line, on_end=None, name=''):
+        self.pipe = pipe
+        self.name = name
+        self._on_line = on_line
+        self._on_end = on_end
+        self._reader = MessageReader(OutputPump.READ_SIZE)
+        self._done = threading.Event()
+        self._thread = None
+
+    def fileno(self):
+        return self.pipe.fileno()
+
+    def start(self):
+        if OutputPump.WIN:
+            self._thread = threading.Thread(target=self._read_lines)
+            self._thread.start()
+        else:
+            PUMP.add(self)
+
+    def join(self, timeout=None):
+        if threading.current_thread() in (PUMP.thread, self._thread):
+            return
+        self._done.wait(timeout)
+
+    def is_alive(self):
+        return not self._done.is_set()
+
+    def _read(self):
+        ''' Read what the pipe has (called by the pump thread);
+            returns False when done with it '''
+        try:
+            n = self._reader.read_from(lambda view: os.readv(self.pipe.fileno(), [view]))
+        except (OSError, ValueError):
+            n = 0
+        if n == 0:
+            return False
+        return all(self._line(line) for line in self._reader.messages())
+
+    def _read_lines(self):
+        ''' Follow the pipe on a thread of its own '''
+        try:
+            for line in iter(self.pipe.readline, b''):
+                line = line.rstrip(b'\n')
+                if line and not self._line(line):
+                    break
+        except (OSError, ValueError):
+            pass
+        self._end()
+
+    def _line(self, line):
+        try:
+            return self._on_line(line) is not False
+        except Exception:
+            if logger.isEnabledFor(logging.ERROR):
+                logger.error('Error handling {} output.'.format(self.name), exc_info=True)
+            return False
+
+    def _end(self):
+        try:
+            if self._on_end:
+                self._on_end()
+        except Exception:
+            if logger.isEnabledFor(logging.ERROR):
+                logger.error('Error handling end of {} output.'.format(self.name), exc_info=True)
+        finally:
+            self._done.set()
+
+
+class OutputPump(object):
+    ''' Reads the pipes of the players on a single thread
+
+        The thread is started when a pipe is added, and
+        exits once it is not following any pipes.
+    '''
+
+    WIN = platform.startswith('win')
+
+    READ_SIZE = 16 * 1024
+
+    def __init__(self):
+        self.thread = None
+        self._lock = threading.Lock()
+        self._selector = None
+        self._added = []
+        self._wake_r = self._wake_w = None
+
+    def add(self, pipe):
+        ''' Start following a PumpedPipe '''
+        with self._lock:
+            if self._selector is None:
+                self._selector = selectors.DefaultSelector()
+                self._wake_r, self._wake_w = os.pipe()
+                os.set_blocking(self._wake_r, False)
+                self._selector.register(self._wake_r, selectors.EVENT_READ)
+            self._added.append(pipe)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='player-output')
+                self.thread.daemon = True
+                self.thread.start()
+            else:
+                os.write(self._wake_w, b'\0')
+
+    def _run(self):
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('output pump started')
+        selector = self._selector
+        while True:
+            with self._lock:
+                for pipe in self._added:
+                    selector.register(pipe.fileno(), selectors.EVENT_READ, pipe)
+                self._added = []
+                if len(selector.get_map()) == 1:
+                    ''' only the wake up pipe is left '''
+                    self.thread = None
+                    break
+            for key, _ in selector.select():
+                pipe = key.data
+                if pipe is None:
+                    try:
+                        os.read(self._wake_r, 512)
+                    except BlockingIOError:
+                        pass
+                elif not pipe._read():
+                    selector.unregister(key.fd)
+                    pipe._end()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('output pump stopped')
+
+
+PUMP = OutputPump()
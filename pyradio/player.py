@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import atexit
 import subprocess
 import threading
 import os
@@ -8,8 +9,9 @@ from os.path import expanduser
 from platform import uname as platform_uname
 from sys import platform, version_info, platform
 from sys import exit
-from time import sleep
+from time import sleep, monotonic
 from datetime import datetime
+from itertools import count
 import collections
 import json
 import socket
@@ -21,8 +23,6 @@ try:
     import psutil
 except:
     pass
-if platform.startswith('win'):
-    import win32pipe, win32file, pywintypes
 try:
     from urllib import unquote
 except:
@@ -38,9 +38,57 @@ try:
     from .encodings import get_encodings
 except:
     pass
+''' In case of import from win.py '''
+try:
+    from .metrics import counter, gauge, histogram
+except:
+    from metrics import counter, gauge, histogram
+''' In case of import from win.py '''
+try:
+    from .journal import JOURNAL
+except:
+    from journal import JOURNAL
+''' In case of import from win.py '''
+try:
+    from .mpv_ipc import MpvIpc
+except:
+    from mpv_ipc import MpvIpc
+''' In case of import from win.py '''
+try:
+    from .output_pump import PumpedPipe
+except:
+    from output_pump import PumpedPipe
 
 logger = logging.getLogger(__name__)
 
+_PLAYER_STARTS = counter(
+    'pyradio_player_starts_total',
+    'Player starts', ('player', )
+)
+_PLAYER_RESTARTS = counter(
+    'pyradio_player_restarts_total',
+    'Player starts replacing a running player', ('player', )
+)
+_PLAYER_STANDBY_STARTS = counter(
+    'pyradio_player_standby_starts_total',
+    'Player starts using the standby player', ('player', )
+)
+_FIRST_AUDIO = histogram(
+    'pyradio_player_time_to_first_audio_seconds',
+    'Time from player start to playback', ('player', ),
+    buckets=(.25, .5, 1, 2, 3, 5, 7.5, 10, 15, 20, 30)
+)
+_STATION_CHANGE = histogram(
+    'pyradio_player_station_change_seconds',
+    'Time from player start to playback, per kind of start (new, standby)',
+    ('player', 'start'),
+    buckets=(.1, .25, .5, 1, 2, 3, 5, 7.5, 10, 15, 20, 30)
+)
+_STATION_FIRST_AUDIO = gauge(
+    'pyradio_station_time_to_first_audio_seconds',
+    'Time from player start to playback, last value per station', ('station', )
+)
+
 available_players = []
 
 try:  # Forced testing
@@ -292,7 +340,15 @@ class Player(object):
     icy_tokens = ()
     icy_audio_tokens = {}
 
-    playback_is_on = connecting = False
+    _playback_is_on = connecting = False
+
+    _volume = -1
+
+    ''' time play() was called, until playback starts '''
+    _play_started = None
+
+    ''' True if the running player was the standby one '''
+    _play_from_standby = False
 
     _station_encoding = 'utf-8'
 
@@ -405,10 +461,13 @@ class Player(object):
 
     @recording.setter
     def recording(self, val):
+        old = self._recording
         if val in range(0, 3):
             self._recording = val
         else:
             self._recording = 0
+        if old != self._recording:
+            JOURNAL.emit('recording', recording=self._recording)
         logger.error('\n\nsetting recording to {}'.format(self._recording))
 
     def write_chapters(self):
@@ -906,17 +965,16 @@ class Player(object):
                 if os.path.getsize(self.recording_filename) == 0:
                     os.remove(self.recording_filename)
 
-    def updateStatus(self, *args):
-        stop = args[0]
-        process = args[1]
-        stop_player = args[2]
-        detect_if_player_exited = args[3]
-        enable_crash_detection_function = args[4]
+    def _follow_player_output(self, *args):
+        ''' Follow the output of the player
+
+            Returns a PumpedPipe (see output_pump.py) handing
+            every line the player prints to updateStatus(), and
+            calling _player_output_closed() when it exits.
+        '''
         recording_lock = args[5]
-        on_connect = args[6]
-        has_error = False
         if (logger.isEnabledFor(logging.DEBUG)):
-            logger.debug('updateStatus thread started.')
+            logger.debug('updateStatus started.')
         #with lock:
         #    self.oldUserInput['Title'] = 'Connecting to: "{}"'.format(self.name)
         #    self.outputStream.write(msg=self.oldUserInput['Title'])
@@ -926,371 +984,317 @@ class Player(object):
                 self.oldUserInput['Title'] = 'Buffering: ' + self.name
             else:
                 self.oldUserInput['Title'] = 'Playing: ' + self.name
+        return PumpedPipe(
+            self.process.stdout,
+            lambda a_line: self.updateStatus(a_line, *args),
+            lambda: self._player_output_closed(*args),
+            name=self.PLAYER_NAME
+        )
+
+    def updateStatus(self, subsystemOutRaw, *args):
+        ''' Handle a line of the player's output
+
+            Called by the output pump; args are the ones
+            given to _follow_player_output().
+        '''
+        enable_crash_detection_function = args[4]
+        recording_lock = args[5]
+        on_connect = args[6]
+        # logger.error('DE subsystemOut = "{0}"'.format(subsystemOutRaw))
+        self._chapter_time = datetime.now()
         try:
-            out = self.process.stdout
-            while(True):
-                subsystemOutRaw = out.readline()
-                # logger.error('DE subsystemOut = "{0}"'.format(subsystemOutRaw))
-                self._chapter_time = datetime.now()
-                with recording_lock:
-                    try:
-                        subsystemOut = subsystemOutRaw.decode(self._station_encoding, 'replace')
-                    except:
-                        subsystemOut = subsystemOutRaw.decode('utf-8', 'replace')
-                if subsystemOut == '':
-                    break
-                # logger.error('DE subsystemOut = "{0}"'.format(subsystemOut))
-                with recording_lock:
-                    tmp = self._is_accepted_input(subsystemOut)
-                if not tmp:
-                    continue
-                subsystemOut = subsystemOut.strip()
-                subsystemOut = subsystemOut.replace('\r', '').replace('\n', '')
-                # logger.error('DE subsystemOut = "{0}"'.format(subsystemOut))
+            subsystemOut = subsystemOutRaw.decode(self._station_encoding, 'replace')
+        except:
+            subsystemOut = subsystemOutRaw.decode('utf-8', 'replace')
+        if not self._is_accepted_input(subsystemOut):
+            return
+        subsystemOut = subsystemOut.strip()
+        subsystemOut = subsystemOut.replace('\r', '').replace('\n', '')
+        # logger.error('DE subsystemOut = "{0}"'.format(subsystemOut))
 
+        with recording_lock:
+            if self.oldUserInput['Input'] == subsystemOut:
+                return
+            self.oldUserInput['Input'] = subsystemOut
+        if self.volume_string in subsystemOut:
+            # disable volume for mpv
+            if self.PLAYER_NAME != 'mpv':
+                # logger.error('***** volume')
                 with recording_lock:
-                    tmp = self.oldUserInput['Input']
-                if tmp != subsystemOut:
-                    if (logger.isEnabledFor(logging.DEBUG)):
-                        if version_info < (3, 0):
-                            disp = subsystemOut.encode('utf-8', 'replace').strip()
-                            # logger.debug('User input: {}'.format(disp))
+                    if self.oldUserInput['Volume'] == subsystemOut:
+                        return
+                    self.oldUserInput['Volume'] = subsystemOut
+                    if self.PLAYER_NAME == 'vlc':
+                        if '.' in subsystemOut:
+                            token = '.'
+                        elif ',' in subsystemOut:
+                            token = ','
                         else:
-                            # logger.debug('User input: {}'.format(subsystemOut))
-                            pass
+                            token = ''
+                        if token:
+                            sp = subsystemOut.split(token)
+                            subsystemOut = sp[0]
+                    sp = subsystemOut.split(self.volume_string)
+                    self.volume = ''.join(c for c in sp[-1].split()[0] if c.isdigit())
+
+                    show_volume = self.show_volume
+                    title = self.oldUserInput['Title']
+                    # IMPORTANT: do this here, so that vlc actual_volume
+                    # gets updated in _format_volume_string
+                    string_to_show = self._format_volume_string(subsystemOut) + self._format_title_string(title)
+
+                if show_volume and title:
+                    self.outputStream.write(msg=string_to_show, counter='')
+                    self.threadUpdateTitle()
+        elif self._is_in_playback_token(subsystemOut):
+            self.stop_timeout_counter_thread = True
+            try:
+                self.connection_timeout_thread.join()
+            except:
+                pass
+            if enable_crash_detection_function:
+                enable_crash_detection_function()
+            with recording_lock:
+                self.connecting = False
+                if (not self.playback_is_on) and (logger.isEnabledFor(logging.INFO)):
+                        logger.info('*** updateStatus(): Start of playback detected ***')
+                #if self.outputStream.last_written_string.startswith('Connecting to'):
+                if self.oldUserInput['Title'] == '':
+                    if self.buffering:
+                        new_input = 'Buffering: ' + self.name
+                    else:
+                        new_input = 'Playing: ' + self.name
+                else:
+                    new_input = self.oldUserInput['Title']
+            if not self.playback_is_on:
+                on_connect()
+            self.outputStream.write(msg=new_input, counter='')
+            with recording_lock:
+                self.playback_is_on = True
+                self.connecting = False
+            self._stop_delay_thread()
+            self.stations_history_add_function()
+            if 'AO: [' in subsystemOut or \
+                    'Stream buffering done' in subsystemOut or \
+                    'Buffering ' in subsystemOut:
+                self.buffering = False
+                if self.PLAYER_NAME == 'vlc':
+                    on_connect()
+                with self.buffering_lock:
+                    self.buffering_change_function()
+                with self.status_update_lock:
+                    if version_info > (3, 0):
+                        self._icy_data['audio_format'] = subsystemOut.split('] ')[1].split(' (')[0]
+                    else:
+                        self._icy_data['audio_format'] = subsystemOut.split('] ')[1].split(' (')[0].encode('utf-8')
+                    self.info_display_handler()
+                if self.oldUserInput['Title'].startswith('Buffering: '):
+                    self.outputStream.write(
+                            self.oldUserInput['Title'].replace('Buffering', 'Playing'),
+                            counter=''
+                            )
+            if self.PLAYER_NAME == 'mpv' and version_info < (3, 0):
+                for a_cmd in (
+                        b'{ "command": ["get_property", "metadata"], "request_id": 100 }\n',
+                        self.GET_AUDIO_CODEC,
+                        self.GET_AUDIO_CODEC_NAME):
+                    response = self._send_mpv_command( a_cmd, return_response=True)
+                    if response:
+                        self._get_mpv_metadata(response, lambda: False, enable_crash_detection_function)
+                        self.info_display_handler()
+                    else:
+                        if logger.isEnabledFor(logging.INFO):
+                            logger.info('no response!!!')
+            # logger.error('DE 3 {}'.format(self._icy_data))
+        elif self._is_icy_entry(subsystemOut):
+            if not subsystemOut.endswith('Icy-Title=(null)'):
+                if enable_crash_detection_function:
+                    enable_crash_detection_function()
+                # logger.error('***** icy_entry: "{}"'.format(subsystemOut))
+                title = self._format_title_string(subsystemOut)
+                # logger.error('DE title = "{}"'.format(title))
+                ok_to_display = False
+                self.stop_timeout_counter_thread = True
+                try:
+                    self.connection_timeout_thread.join()
+                except:
+                    pass
+                if not self.playback_is_on:
+                    if logger.isEnabledFor(logging.INFO):
+                        logger.info('*** updateStatus(): Start of playback detected (Icy-Title received) ***')
+                        on_connect()
+                with self.status_update_lock:
+                    self.playback_is_on = True
+                    self.connecting = False
+                self._stop_delay_thread()
+                self.stations_history_add_function()
+                ''' detect empty Icy-Title '''
+                title_without_prefix = title[len(self.icy_title_prefix):].strip()
+                # logger.error('DE title_without_prefix = "{}"'.format(title_without_prefix))
+                if title_without_prefix:
+                    #self._stop_delay_thread()
+                    # logger.error("***** updating title")
+                    if title_without_prefix.strip() == '-':
+                        ''' Icy-Title is empty '''
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug('Icy-Title = " - ", not displaying...')
+                    else:
+                        self.oldUserInput['Title'] = title
+                        # make sure title will not pop-up while Volume value is on
+                        if self.delay_thread is None:
+                            ok_to_display = True
+                        # if self.PLAYER_NAME != 'vlc':
+                        #     self.buffering = False
+                        #     with self.buffering_lock:
+                        #         self.buffering_change_function()
+                        if ok_to_display and self.playback_is_on:
+                            string_to_show = self.title_prefix + title
+                            self.outputStream.write(msg=string_to_show, counter='')
+                        else:
+                            if logger.isEnabledFor(logging.DEBUG):
+                                logger.debug('***** Title change inhibited: ok_to_display = {0}, playbabk_is_on = {1}'.format(ok_to_display, self.playback_is_on))
+                else:
+                    ok_to_display = True
+                    if (logger.isEnabledFor(logging.INFO)):
+                        logger.info('Icy-Title is NOT valid')
+                    if ok_to_display and self.playback_is_on:
+                        # logger.error('\n\nhere - self.buffering: {}'.format(self.buffering))
+                        if self.buffering:
+                            title = 'Buffering: ' + self.name
+                            # logger.error('buffering')
+                        else:
+                            title = 'Playing: ' + self.name
+                            # logger.error('playing')
+                        self.oldUserInput['Title'] = title
+                        string_to_show = self.title_prefix + title
+                        self.outputStream.write(msg=string_to_show, counter='')
+        #else:
+        #    if self.oldUserInput['Title'] == '':
+        #        self.oldUserInput['Title'] = 'Connecting to: "{}"'.format(self.name)
+        #        self.outputStream.write(msg=self.oldUserInput['Title'], counter='')
 
-                    with recording_lock:
-                        self.oldUserInput['Input'] = subsystemOut
-                        self_volume_string = self.volume_string
-                    if self_volume_string in subsystemOut:
-                        # disable volume for mpv
-                        if self.PLAYER_NAME != 'mpv':
-                            # logger.error('***** volume')
-                            with recording_lock:
-                                self_oldUserInput_Volume = self.oldUserInput['Volume']
-                            if self_oldUserInput_Volume != subsystemOut:
-                                with recording_lock:
-                                    self.oldUserInput['Volume'] = subsystemOut
-                                if self.PLAYER_NAME == 'vlc':
-                                    if '.' in subsystemOut:
-                                        token = '.'
-                                    elif ',' in subsystemOut:
-                                        token = ','
-                                    else:
-                                        token = ''
-                                    if token:
-                                        sp = subsystemOut.split(token)
-                                        subsystemOut = sp[0]
-                                with recording_lock:
-                                    sp = subsystemOut.split(self_volume_string)
-                                    self.volume = ''.join(c for c in sp[-1].split()[0] if c.isdigit())
-
-                                    self_show_volume = self.show_volume
-                                    self_oldUserInput_Title = self.oldUserInput['Title']
-                                    # IMPORTANT: do this here, so that vlc actual_volume
-                                    # gets updated in _format_volume_string
-                                    string_to_show = self._format_volume_string(subsystemOut) + self._format_title_string(self.oldUserInput['Title'])
-
-                                if self_show_volume and self_oldUserInput_Title:
-                                    self.outputStream.write(msg=string_to_show, counter='')
-                                    self.threadUpdateTitle()
-                    elif self._is_in_playback_token(subsystemOut):
-                        self.stop_timeout_counter_thread = True
-                        try:
-                            self.connection_timeout_thread.join()
-                        except:
-                            pass
-                        with recording_lock:
-                            self.connecting = False
-                        if enable_crash_detection_function:
-                            enable_crash_detection_function()
-                        with recording_lock:
-                            if (not self.playback_is_on) and (logger.isEnabledFor(logging.INFO)):
-                                    logger.info('*** updateStatus(): Start of playback detected ***')
-                            #if self.outputStream.last_written_string.startswith('Connecting to'):
-                            if self.oldUserInput['Title'] == '':
-                                if self.buffering:
-                                    new_input = 'Buffering: ' + self.name
-                                else:
-                                    new_input = 'Playing: ' + self.name
-                            else:
-                                new_input = self.oldUserInput['Title']
-                        if not self.playback_is_on:
+        else:
+            for a_token in self.icy_audio_tokens.keys():
+                if a_token in subsystemOut:
+                    if not self.playback_is_on:
+                        if logger.isEnabledFor(logging.INFO):
+                            logger.info('*** updateStatus(): Start of playback detected (Icy audio token received) ***')
                             on_connect()
-                        self.outputStream.write(msg=new_input, counter='')
-                        with recording_lock:
-                            self.playback_is_on = True
-                            self.connecting = False
-                        self._stop_delay_thread()
-                        self.stations_history_add_function()
-                        if 'AO: [' in subsystemOut or \
-                                'Stream buffering done' in subsystemOut or \
-                                'Buffering ' in subsystemOut:
-                            self.buffering = False
-                            if self.PLAYER_NAME == 'vlc':
-                                on_connect()
-                            with self.buffering_lock:
-                                self.buffering_change_function()
-                            with self.status_update_lock:
-                                if version_info > (3, 0):
-                                    self._icy_data['audio_format'] = subsystemOut.split('] ')[1].split(' (')[0]
-                                else:
-                                    self._icy_data['audio_format'] = subsystemOut.split('] ')[1].split(' (')[0].encode('utf-8')
-                                self.info_display_handler()
-                            if self.oldUserInput['Title'].startswith('Buffering: '):
-                                self.outputStream.write(
-                                        self.oldUserInput['Title'].replace('Buffering', 'Playing'),
-                                        counter=''
-                                        )
-                        if self.PLAYER_NAME == 'mpv' and version_info < (3, 0):
-                            for a_cmd in (
-                                    b'{ "command": ["get_property", "metadata"], "request_id": 100 }\n',
-                                    self.GET_AUDIO_CODEC,
-                                    self.GET_AUDIO_CODEC_NAME):
-                                response = self._send_mpv_command( a_cmd, return_response=True)
-                                if response:
-                                    self._get_mpv_metadata(response, lambda: False, enable_crash_detection_function)
-                                    self.info_display_handler()
-                                else:
-                                    if logger.isEnabledFor(logging.INFO):
-                                        logger.info('no response!!!')
-                        # logger.error('DE 3 {}'.format(self._icy_data))
-                    elif self._is_icy_entry(subsystemOut):
-                        if not subsystemOut.endswith('Icy-Title=(null)'):
-                            if enable_crash_detection_function:
-                                enable_crash_detection_function()
-                            # logger.error('***** icy_entry: "{}"'.format(subsystemOut))
-                            title = self._format_title_string(subsystemOut)
-                            # logger.error('DE title = "{}"'.format(title))
-                            ok_to_display = False
-                            self.stop_timeout_counter_thread = True
-                            try:
-                                self.connection_timeout_thread.join()
-                            except:
-                                pass
-                            if not self.playback_is_on:
-                                if logger.isEnabledFor(logging.INFO):
-                                    logger.info('*** updateStatus(): Start of playback detected (Icy-Title received) ***')
-                                    on_connect()
-                            with self.status_update_lock:
-                                self.playback_is_on = True
-                                self.connecting = False
-                            self._stop_delay_thread()
-                            self.stations_history_add_function()
-                            ''' detect empty Icy-Title '''
-                            title_without_prefix = title[len(self.icy_title_prefix):].strip()
-                            # logger.error('DE title_without_prefix = "{}"'.format(title_without_prefix))
-                            if title_without_prefix:
-                                #self._stop_delay_thread()
-                                # logger.error("***** updating title")
-                                if title_without_prefix.strip() == '-':
-                                    ''' Icy-Title is empty '''
-                                    if logger.isEnabledFor(logging.DEBUG):
-                                        logger.debug('Icy-Title = " - ", not displaying...')
-                                else:
-                                    self.oldUserInput['Title'] = title
-                                    # make sure title will not pop-up while Volume value is on
-                                    if self.delay_thread is None:
-                                        ok_to_display = True
-                                    # if self.PLAYER_NAME != 'vlc':
-                                    #     self.buffering = False
-                                    #     with self.buffering_lock:
-                                    #         self.buffering_change_function()
-                                    if ok_to_display and self.playback_is_on:
-                                        string_to_show = self.title_prefix + title
-                                        self.outputStream.write(msg=string_to_show, counter='')
-                                    else:
-                                        if logger.isEnabledFor(logging.DEBUG):
-                                            logger.debug('***** Title change inhibited: ok_to_display = {0}, playbabk_is_on = {1}'.format(ok_to_display, self.playback_is_on))
-                            else:
-                                ok_to_display = True
-                                if (logger.isEnabledFor(logging.INFO)):
-                                    logger.info('Icy-Title is NOT valid')
-                                if ok_to_display and self.playback_is_on:
-                                    # logger.error('\n\nhere - self.buffering: {}'.format(self.buffering))
-                                    if self.buffering:
-                                        title = 'Buffering: ' + self.name
-                                        # logger.error('buffering')
-                                    else:
-                                        title = 'Playing: ' + self.name
-                                        # logger.error('playing')
-                                    self.oldUserInput['Title'] = title
-                                    string_to_show = self.title_prefix + title
-                                    self.outputStream.write(msg=string_to_show, counter='')
-                    #else:
-                    #    if self.oldUserInput['Title'] == '':
-                    #        self.oldUserInput['Title'] = 'Connecting to: "{}"'.format(self.name)
-                    #        self.outputStream.write(msg=self.oldUserInput['Title'], counter='')
-
-                    else:
-                        for a_token in self.icy_audio_tokens.keys():
-                            if a_token in subsystemOut:
-                                if not self.playback_is_on:
-                                    if logger.isEnabledFor(logging.INFO):
-                                        logger.info('*** updateStatus(): Start of playback detected (Icy audio token received) ***')
-                                        on_connect()
-                                self.stop_timeout_counter_thread = True
+                    self.stop_timeout_counter_thread = True
+                    try:
+                        self.connection_timeout_thread.join()
+                    except:
+                        pass
+                    self.playback_is_on = True
+                    self.connecting = False
+                    self.stations_history_add_function()
+                    if enable_crash_detection_function:
+                        enable_crash_detection_function()
+                    # logger.error('DE token = "{}"'.format(a_token))
+                    # logger.error('DE icy_audio_tokens[a_token] = "{}"'.format(self.icy_audio_tokens[a_token]))
+                    a_str = subsystemOut.split(a_token)
+                    # logger.error('DE str = "{}"'.format(a_str))
+                    with self.status_update_lock:
+                        if self.icy_audio_tokens[a_token] == 'icy-br':
+                            self._icy_data[self.icy_audio_tokens[a_token]] = a_str[1].replace('kbit/s', '')
+                        else:
+                            self._icy_data[self.icy_audio_tokens[a_token]] = a_str[1]
+                        if self.icy_audio_tokens[a_token] == 'codec':
+                            if '[' in self._icy_data['codec']:
+                                self._icy_data['codec-name'] = self._icy_data['codec'].split('] ')[0].replace('[', '')
+                                self._icy_data['codec'] = self._icy_data['codec'].split('] ')[1]
+                        if version_info < (3, 0):
+                            for an_item in self._icy_data.keys():
                                 try:
-                                    self.connection_timeout_thread.join()
-                                except:
-                                    pass
-                                self.playback_is_on = True
-                                self.connecting = False
-                                self.stations_history_add_function()
-                                if enable_crash_detection_function:
-                                    enable_crash_detection_function()
-                                # logger.error('DE token = "{}"'.format(a_token))
-                                # logger.error('DE icy_audio_tokens[a_token] = "{}"'.format(self.icy_audio_tokens[a_token]))
-                                a_str = subsystemOut.split(a_token)
-                                # logger.error('DE str = "{}"'.format(a_str))
-                                with self.status_update_lock:
-                                    if self.icy_audio_tokens[a_token] == 'icy-br':
-                                        self._icy_data[self.icy_audio_tokens[a_token]] = a_str[1].replace('kbit/s', '')
-                                    else:
-                                        self._icy_data[self.icy_audio_tokens[a_token]] = a_str[1]
-                                    if self.icy_audio_tokens[a_token] == 'codec':
-                                        if '[' in self._icy_data['codec']:
-                                            self._icy_data['codec-name'] = self._icy_data['codec'].split('] ')[0].replace('[', '')
-                                            self._icy_data['codec'] = self._icy_data['codec'].split('] ')[1]
-                                    if version_info < (3, 0):
-                                        for an_item in self._icy_data.keys():
-                                            try:
-                                                self._icy_data[an_item] = self._icy_data[an_item].encode(self._station_encoding, 'replace')
-                                            except UnicodeDecodeError as e:
-                                                self._icy_data[an_item] = ''
-                                    if 'codec-name' in self._icy_data.keys():
-                                        self._icy_data['codec-name'] = self._icy_data['codec-name'].replace('"', '')
-                                # logger.error('DE audio data\n\n{}\n\n'.format(self._icy_data))
-                        self.info_display_handler()
-        except:
-            if logger.isEnabledFor(logging.ERROR):
-                logger.error('Error in updateStatus thread.', exc_info=True)
-            # return
+                                    self._icy_data[an_item] = self._icy_data[an_item].encode(self._station_encoding, 'replace')
+                                except UnicodeDecodeError as e:
+                                    self._icy_data[an_item] = ''
+                        if 'codec-name' in self._icy_data.keys():
+                            self._icy_data['codec-name'] = self._icy_data['codec-name'].replace('"', '')
+                    # logger.error('DE audio data\n\n{}\n\n'.format(self._icy_data))
+            self.info_display_handler()
+
+    def _player_output_closed(self, *args):
+        ''' The player's output is closed (the player exited) '''
+        stop = args[0]
+        stop_player = args[2]
+        detect_if_player_exited = args[3]
 
         ''' crash detection '''
         # logger.error('detect_if_player_exited = {0}, stop = {1}'.format(detect_if_player_exited(), stop()))
 
         if not stop():
-            if not platform.startswith('win'):
-                if detect_if_player_exited():
-                    if logger.isEnabledFor(logging.INFO):
-                        logger.info('----==== player disappeared! ====----')
-                    stop_player(
-                        from_update_thread=True,
-                        player_disappeared=True
-                    )
-                else:
-                    if logger.isEnabledFor(logging.INFO):
-                        logger.info('Crash detection is off; waiting to timeout')
+            if detect_if_player_exited():
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info('----==== player disappeared! ====----')
+                JOURNAL.emit('error', station=self.name, error='Player disappeared')
+                stop_player(
+                    from_update_thread=True,
+                    player_disappeared=True
+                )
             else:
-                if detect_if_player_exited():
-                    if logger.isEnabledFor(logging.INFO):
-                        logger.info('----==== player disappeared! ====----')
-                    stop_player(
-                        from_update_thread=True,
-                        player_disappeared = True
-                    )
-                else:
-                    if logger.isEnabledFor(logging.INFO):
-                        logger.info('Crash detection is off; waiting to timeout')
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info('Crash detection is off; waiting to timeout')
         if (logger.isEnabledFor(logging.INFO)):
-            logger.info('updateStatus thread stopped.')
+            logger.info('updateStatus stopped.')
         self._clear_empty_mkv()
 
+    def _monitor_output_closed(self):
+        if (logger.isEnabledFor(logging.INFO)):
+            logger.info('updateRecordingStatus stopped.')
 
-    def updateRecordingStatus(self, *args):
-        stop = args[0]
-        process = args[1]
-        recording_lock = args[2]
-        has_error = False
-        if (logger.isEnabledFor(logging.DEBUG)):
-            logger.debug('updateRecordingStatus thread started.')
-        #with lock:
-        #    self.oldUserInput['Title'] = 'Connecting to: "{}"'.format(self.name)
-        #    self.outputStream.write(msg=self.oldUserInput['Title'])
-        ''' Force volume display even when icy title is not received '''
-        # self.oldUserInput['Title'] = 'Playing: ' + self.name
+    def updateRecordingStatus(self, subsystemOutRaw, stop, recording_lock):
+        ''' Handle a line of the monitor player's output
+
+            Called by the output pump; returns False to stop
+            following it.
+        '''
+        if stop():
+            return False
         try:
-            out = self.monitor_process.stdout
-            while(True):
-                subsystemOutRaw = out.readline()
-                with recording_lock:
-                    try:
-                        subsystemOut = subsystemOutRaw.decode(self._station_encoding, 'replace')
-                    except:
-                        subsystemOut = subsystemOutRaw.decode('utf-8', 'replace')
-                if subsystemOut == '':
-                    break
-                # logger.error('DE subsystemOut = "{0}"'.format(subsystemOut))
-                if stop():
-                    break
-                with recording_lock:
-                    tmp = self._is_accepted_input(subsystemOut)
-                if not tmp:
-                    if stop():
-                        break
-                    continue
-                subsystemOut = subsystemOut.strip()
-                subsystemOut = subsystemOut.replace('\r', '').replace('\n', '')
-                # logger.error('DE subsystemOut = "{0}"'.format(subsystemOut))
+            subsystemOut = subsystemOutRaw.decode(self._station_encoding, 'replace')
+        except:
+            subsystemOut = subsystemOutRaw.decode('utf-8', 'replace')
+        # logger.error('DE subsystemOut = "{0}"'.format(subsystemOut))
+        if not self._is_accepted_input(subsystemOut):
+            return
+        subsystemOut = subsystemOut.strip()
+        subsystemOut = subsystemOut.replace('\r', '').replace('\n', '')
+        # logger.error('DE subsystemOut = "{0}"'.format(subsystemOut))
 
-                if stop():
-                    break
+        with recording_lock:
+            if self.oldUserInput['Input'] == subsystemOut:
+                return
+            self.oldUserInput['Input'] = subsystemOut
+        if (logger.isEnabledFor(logging.DEBUG)):
+            logger.debug('Monitor User input: {}'.format(subsystemOut))
+
+        if self.volume_string in subsystemOut:
+            # disable volume for mpv
+            if self.PLAYER_NAME != 'mpv':
+                # logger.error('***** volume')
                 with recording_lock:
-                    tmp = self.oldUserInput['Input']
-                if tmp != subsystemOut:
-                    if (logger.isEnabledFor(logging.DEBUG)):
-                        if version_info < (3, 0):
-                            disp = subsystemOut.encode('utf-8', 'replace').strip()
-                            logger.debug('Monitor User input: {}'.format(disp))
-                        else:
-                            logger.debug('Monitor User input: {}'.format(subsystemOut))
+                    if self.oldUserInput['Volume'] != subsystemOut:
+                        self.oldUserInput['Volume'] = subsystemOut
+                        if self.PLAYER_NAME == 'vlc':
+                            if '.' in subsystemOut:
+                                token = '.'
+                            elif ',' in subsystemOut:
+                                token = ','
+                            else:
+                                token = ''
+                            if token:
+                                sp = subsystemOut.split(token)
+                                subsystemOut = sp[0]
+                    self.volume = ''.join(c for c in subsystemOut if c.isdigit())
 
-                    if stop():
-                        break
-                    with recording_lock:
-                        self.oldUserInput['Input'] = subsystemOut
-                        self_volume_string = self.volume_string
-                        self_player_name = self.PLAYER_NAME
-                    if stop():
-                        break
-                    if self_volume_string in subsystemOut:
-                        # disable volume for mpv
-                        if self_player_name != 'mpv':
-                            # logger.error('***** volume')
-                            if stop():
-                                break
-                            with recording_lock:
-                                if self.oldUserInput['Volume'] != subsystemOut:
-                                    self.oldUserInput['Volume'] = subsystemOut
-                                    if self_player_name == 'vlc':
-                                        if '.' in subsystemOut:
-                                            token = '.'
-                                        elif ',' in subsystemOut:
-                                            token = ','
-                                        else:
-                                            token = ''
-                                        if token:
-                                            sp = subsystemOut.split(token)
-                                            subsystemOut = sp[0]
-                                self.volume = ''.join(c for c in subsystemOut if c.isdigit())
-
-                                # IMPORTANT: do this here, so that vlc actual_volume
-                                # gets updated in _format_volume_string
-                                string_to_show = self._format_volume_string(subsystemOut) + self._format_title_string(self.oldUserInput['Title'])
-
-                                if self.show_volume and self.oldUserInput['Title']:
-                                    self.outputStream.write(msg=string_to_show, counter='')
-                                    self.threadUpdateTitle()
-                            if stop():
-                                break
-        except:
-            if logger.isEnabledFor(logging.ERROR):
-                logger.error('Error in updateRecordingStatus thread.', exc_info=True)
-            # return
+                    # IMPORTANT: do this here, so that vlc actual_volume
+                    # gets updated in _format_volume_string
+                    string_to_show = self._format_volume_string(subsystemOut) + self._format_title_string(self.oldUserInput['Title'])
 
-        if (logger.isEnabledFor(logging.INFO)):
-            logger.info('updateRecordingStatus thread stopped.')
+                    if self.show_volume and self.oldUserInput['Title']:
+                        self.outputStream.write(msg=string_to_show, counter='')
+                        self.threadUpdateTitle()
 
     def updateMPVStatus(self, *args):
         stop = args[0]
@@ -1301,109 +1305,74 @@ class Player(object):
         if (logger.isEnabledFor(logging.DEBUG)):
             logger.debug('MPV updateStatus thread started.')
 
-        while True:
-            try:
-                sock = self._connect_to_socket(self.mpvsocket)
-            finally:
-                if sock:
-                    break
-                if stop():
-                    if (logger.isEnabledFor(logging.INFO)):
-                        logger.info('MPV updateStatus thread stopped (no connection to socket).')
-                    return
+        ipc = self._mpv_ipc()
+        while not ipc.connect():
+            if stop() or ipc.closed:
+                if (logger.isEnabledFor(logging.INFO)):
+                    logger.info('MPV updateStatus thread stopped (no connection to socket).')
+                return
+            sleep(.05)
         # Send data
-        message = b'{ "command": ["observe_property", 1, "metadata"] }\n'
-        try:
-            if platform.startswith('win'):
-                win32file.WriteFile(sock, message)
-            else:
-                sock.sendall(message)
-            go_on = True
-        except:
-            # logger.error('DE \n\nBroken pipe\n\n')
-            go_on = False
+        go_on = ipc.post(['observe_property', 1, 'metadata'])
+        load_command, self._mpv_load_command = self._mpv_load_command, None
+        if go_on and load_command is not None:
+            ''' the standby mpv: load the station '''
+            go_on = ipc.post(load_command)
         if go_on:
-            while True:
-                if stop():
-                    break
+            for n in ipc.messages(stop):
+                self._chapter_time = datetime.now()
+                # logger.error('DE Received: "{!r}"'.format(n))
+                if self._get_mpv_metadata(n, stop, enable_crash_detection_function):
+                    self._request_mpv_info_data(ipc)
+                    continue
                 try:
-                    if platform.startswith('win'):
-                        try:
-                            data = win32file.ReadFile(sock, 64*1024)
-                        except pywintypes.error as e:
-                            data = b''
-                    else:
-                        try:
-                            data = sock.recvmsg(4096)
-                        except:
-                            data = b''
-                    self._chapter_time = datetime.now()
-                    a_data = self._fix_returned_data(data)
-                    logger.error('DE Received: "{!r}"'.format(a_data))
-                    if a_data == b'' or stop():
+                    if stop():
                         break
-                    if a_data:
-                        all_data = a_data.split(b'\n')
-                        d = None
-                        for n in all_data:
-                            if n == b'':
+                    d = json.loads(n)
+                    if 'event' in d.keys():
+                        # logger.info('metadata-update\n\n')
+                        if d['event'] == 'metadata-update':
+                            # logger.info('{}\n\n'.format(d['event']))
+                            if not ipc.post(self.GET_TITLE):
                                 continue
-                            if self._get_mpv_metadata(n, stop, enable_crash_detection_function):
-                                self._request_mpv_info_data(sock)
-                            else:
-                                try:
-                                    if stop():
-                                        break
-                                    d = json.loads(n)
-                                    if 'event' in d.keys():
-                                        # logger.info('metadata-update\n\n')
-                                        if d['event'] == 'metadata-update':
-                                            # logger.info('{}\n\n'.format(d['event']))
-                                            try:
-                                                if platform.startswith('win'):
-                                                    win32file.WriteFile(sock, self.GET_TITLE)
-                                                else:
-                                                    sock.sendall(self.GET_TITLE)
-                                            except:
-                                                break
-                                            ret = self._set_mpv_playback_is_on(stop, enable_crash_detection_function)
-                                            if not ret:
-                                                break
-                                            self._request_mpv_info_data(sock)
-                                            self.info_display_handler()
-                                        elif d['event'] == 'playback-restart':
-                                            # logger.info('====== playback-restarted\n{}\n\n'.format(self.oldUserInput))
-                                            # logger.info('{}\n\n'.format(d['event']))
-                                            self.buffering = False
-                                            with self.buffering_lock:
-                                                self.buffering_change_function()
-                                            if not self.playback_is_on:
-                                                ret = self._set_mpv_playback_is_on(stop, enable_crash_detection_function)
-                                            if not ret:
-                                                break
-                                            self._request_mpv_info_data(sock)
-                                            self.info_display_handler()
-                                            if self.oldUserInput['Title'].startswith('Buffering: '):
-                                                self.outputStream.write(
-                                                        self.oldUserInput['Title'].replace('Buffering', 'Playing'),
-                                                        counter=''
-                                                        )
-                                        elif (d['event'] == 'file-loaded' or \
-                                                d['event'] == 'audio-reconfig') and \
-                                                self.buffering:
-                                            ''' buffering '''
-                                            # logger.info('{}\n\n'.format(d['event']))
-                                            if self.buffering and not self.playback_is_on:
-                                                logger.info('sending playback is on')
-                                                ret = self._set_mpv_playback_is_on(stop, enable_crash_detection_function)
-                                            if not ret:
-                                                break
-                                            self.info_display_handler()
-                                except:
-                                    pass
-                finally:
+                            ret = self._set_mpv_playback_is_on(stop, enable_crash_detection_function)
+                            if not ret:
+                                continue
+                            self._request_mpv_info_data(ipc)
+                            self.info_display_handler()
+                        elif d['event'] == 'playback-restart':
+                            # logger.info('====== playback-restarted\n{}\n\n'.format(self.oldUserInput))
+                            # logger.info('{}\n\n'.format(d['event']))
+                            self.buffering = False
+                            with self.buffering_lock:
+                                self.buffering_change_function()
+                            ret = True
+                            if not self.playback_is_on:
+                                ret = self._set_mpv_playback_is_on(stop, enable_crash_detection_function)
+                            if not ret:
+                                continue
+                            self._request_mpv_info_data(ipc)
+                            self.info_display_handler()
+                            if self.oldUserInput['Title'].startswith('Buffering: '):
+                                self.outputStream.write(
+                                        self.oldUserInput['Title'].replace('Buffering', 'Playing'),
+                                        counter=''
+                                        )
+                        elif (d['event'] == 'file-loaded' or \
+                                d['event'] == 'audio-reconfig') and \
+                                self.buffering:
+                            ''' buffering '''
+                            # logger.info('{}\n\n'.format(d['event']))
+                            ret = True
+                            if self.buffering and not self.playback_is_on:
+                                logger.info('sending playback is on')
+                                ret = self._set_mpv_playback_is_on(stop, enable_crash_detection_function)
+                            if not ret:
+                                continue
+                            self.info_display_handler()
+                except:
                     pass
-        self._close_pipe(sock)
+        ipc.close()
 
         if not stop():
             ''' haven't been asked to stop '''
@@ -1421,12 +1390,6 @@ class Player(object):
             logger.info('MPV updateStatus thread stopped.')
         self._clear_empty_mkv()
 
-    def _close_pipe(self, sock):
-        if platform.startswith('win'):
-            win32file.CloseHandle(sock)
-        else:
-            sock.close()
-
     def updateWinVLCStatus(self, *args):
         def do_crash_detection(detect_if_player_exited, stop):
             if self.playback_is_on:
@@ -1673,20 +1636,15 @@ class Player(object):
             pass
         self._clear_empty_mkv()
 
-    def _request_mpv_info_data(self, sock):
+    def _request_mpv_info_data(self, ipc):
+        ''' The replies are received by the status update thread '''
         with self.status_update_lock:
             ret = len(self._icy_data)
         if ret == 0:
-            if platform.startswith('win'):
-                win32file.WriteFile(sock, self.GET_TITLE)
-                win32file.WriteFile(sock, self.GET_AUDIO_FORMAT)
-                win32file.WriteFile(sock, self.GET_AUDIO_CODEC)
-                win32file.WriteFile(sock, self.GET_AUDIO_CODEC_NAME)
-            else:
-                sock.sendall(self.GET_TITLE)
-                sock.sendall(self.GET_AUDIO_FORMAT)
-                sock.sendall(self.GET_AUDIO_CODEC)
-                sock.sendall(self.GET_AUDIO_CODEC_NAME)
+            ipc.post(self.GET_TITLE)
+            ipc.post(self.GET_AUDIO_FORMAT)
+            ipc.post(self.GET_AUDIO_CODEC)
+            ipc.post(self.GET_AUDIO_CODEC_NAME)
 
     def _get_mpv_metadata(self, *args):
         ''' Get MPV metadata
@@ -1967,13 +1925,12 @@ class Player(object):
         return bool(self.process)
 
     def _start_monitor_update_thread(self):
-        self.monitor_update_thread = threading.Thread(
-            target=self.updateRecordingStatus,
-            args=(
-                lambda: self.stop_mpv_status_update_thread,
-                self.monitor_process,
-                self._recording_lock
-            )
+        stop = lambda: self.stop_mpv_status_update_thread
+        self.monitor_update_thread = PumpedPipe(
+            self.monitor_process.stdout,
+            lambda a_line: self.updateRecordingStatus(a_line, stop, self._recording_lock),
+            self._monitor_output_closed,
+            name=self.PLAYER_NAME + ' monitor'
         )
         ''' make sure the counter is stopped
             and a message other than "Connecting..."
@@ -1988,6 +1945,47 @@ class Player(object):
         # self.threadUpdateTitle()
         self.monitor_update_thread.start()
 
+    @property
+    def playback_is_on(self):
+        return self._playback_is_on
+
+    @playback_is_on.setter
+    def playback_is_on(self, value):
+        elapsed = None
+        if value and self._play_started is not None:
+            elapsed = monotonic() - self._play_started
+            self._play_started = None
+            _FIRST_AUDIO.observe(elapsed, self.PLAYER_NAME)
+            _STATION_FIRST_AUDIO.set(elapsed, self.name)
+            _STATION_CHANGE.observe(
+                elapsed, self.PLAYER_NAME,
+                'standby' if self._play_from_standby else 'new'
+            )
+        if value and not self._playback_is_on:
+            JOURNAL.emit(
+                'play', station=self.name, player=self.PLAYER_NAME,
+                first_audio=None if elapsed is None else round(elapsed, 3),
+                standby=self._play_from_standby
+            )
+        self._playback_is_on = value
+
+    @property
+    def volume(self):
+        return self._volume
+
+    @volume.setter
+    def volume(self, value):
+        ''' players report the volume as int or str;
+            -1 (unknown) and -2 are not journaled '''
+        if value != self._volume:
+            try:
+                vol = int(value)
+            except (ValueError, TypeError):
+                vol = -1
+            if vol >= 0:
+                JOURNAL.emit('volume', station=self.name, volume=vol)
+        self._volume = value
+
     def play(self,
              name,
              streamUrl,
@@ -2004,6 +2002,9 @@ class Player(object):
         # logger.error('self.monitor_process.pid = {}'.format(self.monitor_process))
         self.recording_filename = ''
         self.volume = -1
+        _PLAYER_STARTS.inc(self.PLAYER_NAME)
+        if self.process:
+            _PLAYER_RESTARTS.inc(self.PLAYER_NAME)
         self.close()
         self.name = name
         self.oldUserInput = {'Input': '', 'Volume': '', 'Title': ''}
@@ -2011,6 +2012,7 @@ class Player(object):
         self.show_volume = True
         self.title_prefix = ''
         self.playback_is_on = False
+        self._play_started = monotonic()
         self.delay_thread = None
         # self.outputStream.write(msg='Station: "{}" - Opening connection...'.format(name), counter='')
         self.outputStream.write(msg='Station: ' + name + ' - Opening connection...', counter='')
@@ -2052,10 +2054,12 @@ class Player(object):
             )
         else:
             if self.PLAYER_NAME == 'mpv' and version_info > (3, 0):
-                self.process = subprocess.Popen(opts, shell=False,
-                                                stdout=subprocess.DEVNULL,
-                                                stdin=subprocess.DEVNULL,
-                                                stderr=subprocess.DEVNULL)
+                self.process = self._start_from_standby(opts)
+                if self.process is None:
+                    self.process = subprocess.Popen(opts, shell=False,
+                                                    stdout=subprocess.DEVNULL,
+                                                    stdin=subprocess.DEVNULL,
+                                                    stderr=subprocess.DEVNULL)
                 self.update_thread = threading.Thread(
                     target=self.updateMPVStatus,
                     args=(lambda: self.stop_mpv_status_update_thread,
@@ -2072,19 +2076,17 @@ class Player(object):
                     stdin=subprocess.PIPE,
                     stderr=subprocess.STDOUT
                 )
-                self.update_thread = threading.Thread(
-                    target=self.updateStatus,
-                    args=(
-                        lambda: self.stop_mpv_status_update_thread,
-                        self.process,
-                        stop_player,
-                        detect_if_player_exited,
-                        enable_crash_detection_function,
-                        self._recording_lock,
-                        self._on_connect
-                    )
+                self.update_thread = self._follow_player_output(
+                    lambda: self.stop_mpv_status_update_thread,
+                    self.process,
+                    stop_player,
+                    detect_if_player_exited,
+                    enable_crash_detection_function,
+                    self._recording_lock,
+                    self._on_connect
                 )
         self.update_thread.start()
+        self._start_standby(opts)
         if self.PLAYER_NAME == 'vlc':
             if self.WIN:
                 pass
@@ -2162,6 +2164,25 @@ class Player(object):
                                 ).start()
                     # logger.error('=======================\n\n')
 
+    def _start_from_standby(self, opts):
+        ''' Use the standby player, if there is one that can
+            play with opts; returns its process, or None.
+
+            Currently implemented for mpv only.'''
+        self._play_from_standby = False
+        return None
+
+    def _start_standby(self, opts):
+        ''' Start a standby player for the next station,
+            with the options of the player just started
+
+            Currently implemented for mpv only.'''
+        pass
+
+    def close_standby(self):
+        ''' Terminate the standby player, if any '''
+        pass
+
     def _sendCommand(self, command):
         ''' send keystroke command to player '''
         if [x for x in ('q', 'shutdown') if command.startswith(x)]:
@@ -2201,6 +2222,8 @@ class Player(object):
     def close(self):
         self.currently_recording = False
         ''' kill player instance '''
+        if self.process is not None:
+            JOURNAL.emit('stop', station=self.name, player=self.PLAYER_NAME)
         self._no_mute_on_stop_playback()
 
         ''' First close the subprocess '''
@@ -2465,16 +2488,20 @@ class MpvPlayer(Player):
             os.system('rm ' + mpvsocket + ' 2>/dev/null');
 
         commands = {
-                'volume_up':   b'{ "command": ["cycle", "volume", "up"], "request_id": 1000 }\n',
-                'volume_down': b'{ "command": ["cycle", "volume", "down"], "request_id": 1001 }\n',
-                'mute':        b'{ "command": ["cycle", "mute"], "request_id": 1002 }\n',
-                'pause':       b'{ "command": ["cycle", "pause"], "request_id": 1003 }\n',
-                'quit':        b'{ "command": ["quit"], "request_id": 1004}\n',
+                'volume_up':   ['cycle', 'volume', 'up'],
+                'volume_down': ['cycle', 'volume', 'down'],
+                'mute':        ['cycle', 'mute'],
+                'pause':       ['cycle', 'pause'],
+                'quit':        ['quit'],
                 }
 
         ''' if found in built options, buffering is ON '''
         buffering_tokens = ('cache', 'demuxer-readahead-secs')
 
+        ''' True if mpv supports --input-ipc-server
+            (None: not checked yet) '''
+        newer_mpv = None
+
     def __init__(self,
                  config,
                  outputStream,
@@ -2495,6 +2522,18 @@ class MpvPlayer(Player):
         )
         self.config_files = self.all_config_files['mpv']
         self.recording_filename = ''
+        ''' the IPC connection to the running mpv '''
+        self._ipc = None
+        ''' the idle mpv kept for the next station:
+            (process, socket, options), see _start_standby() '''
+        self._standby = None
+        self._standby_ids = count(1)
+        ''' the command the status update thread sends to
+            the standby mpv, to load the station '''
+        self._mpv_load_command = None
+        ''' the IPC socket of the running mpv; mpvsocket,
+            or the one of the standby mpv it was '''
+        self._ipc_socket = self.mpvsocket
         # logger.error('\n\nMPV recording = {}\n\n'.format(self._recording))
 
     def save_volume(self):
@@ -2509,17 +2548,20 @@ class MpvPlayer(Player):
         # logger.error('self.profile_name = "{}"'.format(self.profile_name))
         ''' Builds the options to pass to mpv subprocess.'''
 
-        ''' Test for newer MPV versions as it supports different IPC flags. '''
-        p = subprocess.Popen([self.PLAYER_CMD, '--no-video',  '--input-ipc-server=' + self.mpvsocket], stdout=subprocess.PIPE, stdin=subprocess.PIPE, shell=False)
-        out = p.communicate()
-        if 'not found' not in str(out[0]):
-            if logger.isEnabledFor(logging.DEBUG):
-                logger.debug('--input-ipc-server is supported.')
-            newerMpv = True
-        else:
-            if logger.isEnabledFor(logging.DEBUG):
-                logger.debug('--input-ipc-server is not supported.')
-            newerMpv = False
+        ''' Test for newer MPV versions as it supports different IPC flags.
+            Done once; it costs starting mpv. '''
+        if MpvPlayer.newer_mpv is None:
+            p = subprocess.Popen([self.PLAYER_CMD, '--no-video',  '--input-ipc-server=' + self.mpvsocket], stdout=subprocess.PIPE, stdin=subprocess.PIPE, shell=False)
+            out = p.communicate()
+            if 'not found' not in str(out[0]):
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug('--input-ipc-server is supported.')
+                MpvPlayer.newer_mpv = True
+            else:
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug('--input-ipc-server is not supported.')
+                MpvPlayer.newer_mpv = False
+        newerMpv = MpvPlayer.newer_mpv
         logger.error('\n\nself._cnf.user_agent_string = {}\n\n'.format(self._cnf.user_agent_string))
         opts = [self.PLAYER_CMD, '--no-video', '--quiet']
 
@@ -2610,46 +2652,7 @@ class MpvPlayer(Player):
         return self._get_pause_status()
 
     def _get_pause_status(self):
-        while True:
-            sock = self._connect_to_socket(self.mpvsocket)
-            try:
-                if platform.startswith('win'):
-                    win32file.WriteFile(sock, b'{ "command": ["get_property", "pause"], "request_id": 600 }\n')
-                else:
-                    sock.sendall(b'{ "command": ["get_property", "pause"], "request_id": 600 }\n')
-            except:
-                self._close_pipe(sock)
-                return
-            # wait for response
-
-            try:
-                if platform.startswith('win'):
-                    try:
-                        data = win32file.ReadFile(sock, 64*1024)
-                    except pywintypes.error as e:
-                        data = b''
-                else:
-                    if version_info < (3, 0):
-                        data = sock.recv(4096)
-                    else:
-                        data = sock.recvmsg(4096)
-                a_data = self._fix_returned_data(data)
-                # logger.error('DE Received: "{!r}"'.format(a_data))
-
-                if a_data:
-                    all_data = a_data.split(b'\n')
-                    for n in all_data:
-                        try:
-                            d = json.loads(n)
-                            if d['error'] == 'success':
-                                if isinstance(d['data'], bool):
-                                    self._close_pipe(sock)
-                                    return d['data']
-                        except:
-                            pass
-            finally:
-                pass
-            self._close_pipe(sock)
+        return self._get_mpv_property('pause', bool)
 
     def _mute(self):
         ''' mute mpv '''
@@ -2659,59 +2662,135 @@ class MpvPlayer(Player):
         return self._get_mute_status()
 
     def _get_mute_status(self):
-        while True:
-            sock = self._connect_to_socket(self.mpvsocket)
-            try:
-                if platform.startswith('win'):
-                    win32file.WriteFile(sock, b'{ "command": ["get_property", "mute"], "request_id": 600 }\n')
-                else:
-                    sock.sendall(b'{ "command": ["get_property", "mute"], "request_id": 600 }\n')
-            except:
-                self._close_pipe(sock)
-                return
-            # wait for response
-
-            try:
-                if platform.startswith('win'):
-                    try:
-                        data = win32file.ReadFile(sock, 64*1024)
-                    except pywintypes.error as e:
-                        data = b''
-                else:
-                    if version_info < (3, 0):
-                        data = sock.recv(4096)
-                    else:
-                        data = sock.recvmsg(4096)
-                a_data = self._fix_returned_data(data)
-                # logger.error('DE Received: "{!r}"'.format(a_data))
-
-                if a_data:
-                    all_data = a_data.split(b'\n')
-                    for n in all_data:
-                        try:
-                            d = json.loads(n)
-                            if d['error'] == 'success':
-                                if isinstance(d['data'], bool):
-                                    self._close_pipe(sock)
-                                    return d['data']
-                        except:
-                            pass
-            finally:
-                pass
-            self._close_pipe(sock)
+        return self._get_mpv_property('mute', bool)
+
+    def _get_mpv_property(self, a_property, a_type):
+        ''' Return the value of an mpv property, or None '''
+        reply = self._mpv_ipc().command(['get_property', a_property])
+        if reply and reply.get('error') == 'success' and \
+                isinstance(reply.get('data'), a_type):
+            return reply['data']
+        return None
 
     def _stop(self):
         self.currently_recording = False
         ''' kill mpv instance '''
         self.stop_mpv_status_update_thread = True
         self._send_mpv_command('quit')
+        ipc, self._ipc = self._ipc, None
+        if ipc is not None:
+            ipc.close()
         if not platform.startswith('win'):
-            os.system('rm ' + self.mpvsocket + ' 2>/dev/null');
+            os.system('rm ' + self._ipc_socket + ' 2>/dev/null');
         self._icy_data = {}
         self.monitor = self.monitor_process = self.monitor_opts = None
         if self._chapters:
             self._chapters.write_chapters_to_file(self.recording_filename)
 
+    def _start_from_standby(self, opts):
+        ''' Use the standby mpv, if it was started with the
+            same options; returns its process, or None.
+
+            The status update thread then has it load the
+            station (see updateMPVStatus).
+        '''
+        standby, self._standby = self._standby, None
+        self._play_from_standby = False
+        self._mpv_load_command = None
+        self._ipc_socket = self.mpvsocket
+        if standby is None:
+            return None
+        atexit.unregister(self.close_standby)
+        process, mpvsocket, standby_opts = standby
+        if process.poll() is not None or \
+                standby_opts != self._standby_opts(opts):
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug('standby mpv not usable; starting a new one')
+            self._close_standby(standby)
+            return None
+        self._ipc_socket = mpvsocket
+        if opts[-1].startswith('--playlist='):
+            self._mpv_load_command = ['loadlist', opts[-1][len('--playlist='):]]
+        else:
+            self._mpv_load_command = ['loadfile', opts[-1]]
+        self._play_from_standby = True
+        _PLAYER_STANDBY_STARTS.inc(self.PLAYER_NAME)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info('Using standby mpv (PID {})'.format(process.pid))
+        return process
+
+    def _start_standby(self, opts):
+        ''' Start an idle mpv, with the options of the one just
+            started, so that the next station only needs to be
+            loaded into it (config option mpv_standby).
+
+            It is started with --idle=once: once a station is
+            loaded, it exits when the station ends (or fails),
+            like an mpv started with it, so that the status
+            update thread notices.
+
+            Not done while recording: the recording file is
+            one of the options.
+        '''
+        if not self._cnf.mpv_standby or \
+                self._recording > 0 or \
+                version_info < (3, 0):
+            return
+        standby_opts = self._standby_opts(opts)
+        if standby_opts is None:
+            return
+        self.close_standby()
+        mpvsocket = '{0}.{1}'.format(MpvPlayer.mpvsocket, next(self._standby_ids))
+        ipc_option = opts[-2].split('=')[0]
+        try:
+            process = subprocess.Popen(
+                standby_opts + ['--idle=once', ipc_option + '=' + mpvsocket],
+                shell=False,
+                stdout=subprocess.DEVNULL,
+                stdin=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+        except OSError:
+            if logger.isEnabledFor(logging.ERROR):
+                logger.error('Cannot start standby mpv', exc_info=True)
+            return
+        self._standby = (process, mpvsocket, standby_opts)
+        ''' while there is a standby mpv '''
+        atexit.register(self.close_standby)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('standby mpv started (PID {0}, socket "{1}")'.format(process.pid, mpvsocket))
+
+    def _standby_opts(self, opts):
+        ''' The options of a standby mpv that can replace a
+            player started with opts: all of them but the IPC
+            socket and the station (the last two); None if
+            opts are not like that '''
+        if len(opts) > 2 and \
+                opts[-2].startswith(('--input-ipc-server=', '--input-unix-socket=')):
+            return opts[:-2]
+        return None
+
+    def close_standby(self):
+        ''' Terminate the standby mpv, if any '''
+        standby, self._standby = self._standby, None
+        if standby is not None:
+            atexit.unregister(self.close_standby)
+            self._close_standby(standby)
+
+    def _close_standby(self, standby):
+        process, mpvsocket, _ = standby
+        if process.poll() is None:
+            self._kill_process_tree(process.pid)
+            try:
+                process.wait()
+            except:
+                pass
+        if not platform.startswith('win'):
+            try:
+                os.remove(mpvsocket)
+            except OSError:
+                pass
+
     def _volume_up(self):
         ''' increase mpv's volume '''
         self._send_mpv_command('volume_up')
@@ -2732,32 +2811,19 @@ class MpvPlayer(Player):
         ''' format mpv's volume '''
         return '[' + volume_string[volume_string.find(self.volume_string):].replace('ume', '')+'] '
 
-    def _connect_to_socket(self, server_address):
-        if platform.startswith('win'):
-            count = 0
-            # logger.error('\n\n_connect_to_socket: {}\n\n'.format(server_address))
-            try:
-                handle = win32file.CreateFile(
-                    server_address,
-                    win32file.GENERIC_READ | win32file.GENERIC_WRITE,
-                    0,
-                    None,
-                    win32file.OPEN_EXISTING,
-                    0,
-                    None
-                )
-                res = win32pipe.SetNamedPipeHandleState(handle, win32pipe.PIPE_READMODE_MESSAGE, None, None)
-                return handle
-            except pywintypes.error as e:
-                return None
-        else:
-            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-            try:
-                sock.connect(server_address)
-                return sock
-            except:
-                self._close_pipe(sock)
-                return None
+    def _mpv_ipc(self):
+        ''' The connection to the running mpv
+
+            One connection is used for the lifetime of an mpv
+            process, by the status update thread (to receive
+            events) and by everything sending commands to mpv.
+            A new one is created once it gets closed (when
+            mpv terminates, or playback is stopped).
+        '''
+        ipc = self._ipc
+        if ipc is None or ipc.closed:
+            ipc = self._ipc = MpvIpc(self._ipc_socket)
+        return ipc
 
     def _send_mpv_command(self, a_command, return_response=False):
         ''' Send a command to MPV
@@ -2765,7 +2831,8 @@ class MpvPlayer(Player):
             Parameters
             =========
             a_command
-                The command to send.
+                The command to send; either a key of
+                self.commands or an encoded JSON message.
             return_response
                 if True, return a string, otherwise
                 return a boolean
@@ -2779,121 +2846,23 @@ class MpvPlayer(Player):
                 we get after issuing the command ('' if failed).
 
         '''
-
-        #while True:
-        #    sock = self._connect_to_socket(self.mpvsocket)
-        #    if sock:
-        #        break
-        #    sleep(.25)
-        sock = self._connect_to_socket(self.mpvsocket)
-        if sock is None:
-            if return_response:
-                return ''
-            else:
-                return False
-
-        # Send data
-        try:
-            if platform.startswith('win'):
-                if a_command in self.commands.keys():
-                    win32file.WriteFile(sock, self.commands[a_command])
-                else:
-                    win32file.WriteFile(sock, a_command)
-            else:
-                if a_command in self.commands.keys():
-                    sock.sendall(self.commands[a_command])
-                else:
-                    sock.sendall(a_command)
-        except:
-            self._close_pipe(sock)
-            if return_response:
-                return ''
-            else:
-                return False
-        # read the response
-        if platform.startswith('win'):
-            try:
-                data = win32file.ReadFile(sock, 64*1024)
-            except pywintypes.error as e:
-                data = b''
+        if a_command in self.commands.keys():
+            args = self.commands[a_command]
         else:
-            try:
-                if version_info < (3, 0):
-                    data = sock.recv(4096)
-                else:
-                    data = sock.recvmsg(4096)
-            except sock.error as e:
-                data = ''
-        # logger.error('DE data = {}'.format(data))
-            #sock.colse()
-            #return False
-        # logger.error('DE data = "{}"'.format(data))
-        self._close_pipe(sock)
+            args = json.loads(a_command)['command']
+        reply = self._mpv_ipc().command(args)
+        # logger.error('DE reply = "{}"'.format(reply))
         if return_response:
-            return data
-        else:
-            return True
+            if reply is None:
+                return ''
+            return json.dumps(reply, separators=(',', ':')).encode('utf-8')
+        return reply is not None
 
     def get_volume(self):
         ''' Display volume for MPV '''
-        vol = 0
-        while True:
-            sock = self._connect_to_socket(self.mpvsocket)
-            if sock:
-                break
-            sleep(.25)
-
-        # Send data
-        message = b'{ "command": ["get_property", "volume"] }\n'
-        try:
-            if platform.startswith('win'):
-                win32file.WriteFile(sock, message)
-            else:
-                sock.sendall(message)
-        except:
-            self._close_pipe(sock)
-            return
-
-        # wait for response
-        got_it = True
-        while got_it:
-            try:
-                if platform.startswith('win'):
-                    try:
-                        data = win32file.ReadFile(sock, 64*1024)
-                    except pywintypes.error as e:
-                        data = b''
-                else:
-                    if version_info < (3, 0):
-                        data = sock.recv(4096)
-                    else:
-                        data = sock.recvmsg(4096)
-
-                # logger.error('DE Received: "{!r}"'.format(a_data))
-                a_data = self._fix_returned_data(data)
-
-                if a_data == b'':
-                    break
-
-                if data:
-
-                    all_data = a_data.split(b'\n')
-                    for n in all_data:
-                        try:
-                            d = json.loads(n)
-                            if d['error'] == 'success':
-                                try:
-                                    vol = int(d['data'])
-                                    got_it = False
-                                    break
-                                except:
-                                    pass
-                        except:
-                            pass
-            finally:
-                pass
-        self._close_pipe(sock)
-        self.volume = vol
+        vol = self._get_mpv_property('volume', (int, float))
+        if vol is not None:
+            self.volume = int(vol)
 
     def _display_mpv_volume_value(self):
         ''' Display volume for MPV
@@ -3223,6 +3192,35 @@ class VlcPlayer(Player):
                 ' buffering done'
             )
 
+        ''' Output lines without any of these are ignored
+            (see _is_accepted_input) '''
+        if platform.startswith('win'):
+            ''' adding _playback_token_tuple contents here
+                otherwise they may not be handled at all...
+            '''
+            _accept_filter = (volume_string,
+                              'buffering',
+                              'error',
+                              'debug: ',
+                              'format: ',
+                              'using: ',
+                              'Content-Type',
+                              'main audio',
+                              'Segment #',
+                              'icy-',
+                              'Icy-'
+                              )
+        else:
+            _accept_filter = (volume_string,
+                              'buffering',
+                              'error',
+                              'http stream debug: ',
+                              'format: ',
+                              ': using',
+                              'icy-',
+                              'Icy-',
+                              )
+
         ''' Windows only variables '''
         _vlc_stdout_log_file = ''
         _port = None
@@ -3544,45 +3542,16 @@ class VlcPlayer(Player):
         return self._title_string_format_text_tag(ret_string)
 
     def _is_accepted_input(self, input_string):
-        ''' vlc input filtering '''
-        ret = False
-        if self.WIN:
-            ''' adding _playback_token_tuple contents here
-                otherwise they may not be handled at all...
-            '''
-            accept_filter = (self.volume_string,
-                             'buffering',
-                             'error',
-                             'debug: ',
-                             'format: ',
-                             'using: ',
-                             'Content-Type',
-                             'main audio',
-                             'Segment #',
-                             'icy-',
-                             'Icy-'
-                             )
-        else:
-            accept_filter = (self.volume_string,
-                             'buffering',
-                             'error',
-                             'http stream debug: ',
-                             'format: ',
-                             ': using',
-                             'icy-',
-                             'Icy-',
-                             )
-        reject_filter = ()
-        for n in accept_filter:
+        ''' vlc input filtering
+
+            Called for every line vlc prints; the filter
+            is a class attribute, so that it is not built
+            again for each of them.
+        '''
+        for n in self._accept_filter:
             if n in input_string:
-                ret = True
-                break
-        if ret:
-            for n in reject_filter:
-                if n in input_string:
-                    ret = False
-                    break
-        return ret
+                return True
+        return False
 
     def get_volume(self, repeat=False):
         ''' get vlc's actual_volume'''
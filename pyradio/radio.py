@@ -6597,6 +6597,7 @@ ____Using |fallback| theme.''')
                 to_record = self.player.recording
                 if self.player.isPlaying():
                     self.stopPlayer()
+                self.player.close_standby()
                 self.player = None
                 for i, n in enumerate(player.available_players):
                     if n.PLAYER_NAME == ret:
@@ -10187,6 +10188,7 @@ ____Using |fallback| theme.''')
                     self._cnf.online_browser.save_config()
                     sel._cnf.online_browser = None
         self.player.close()
+        self.player.close_standby()
         self._cnf.save_config()
         self._cnf.remove_session_lock_file()
         for a_sig in self.handled_signals.keys():
@@ -10229,6 +10231,7 @@ ____Using |fallback| theme.''')
                 logger.info('My console window got closed... Terminating...')
             self._force_exit = True
             self.player.close_from_windows()
+            self.player.close_standby()
             self._cnf.save_config()
             self._wait_for_threads()
             self._cnf.remove_session_lock_file()
@@ -1,18 +1,67 @@
 # -*- coding: utf-8 -*-
 import socket
+import selectors
 import logging
-from os import remove
+import threading
+import queue
+import json
+import gzip
+import hashlib
+import hmac
+import ssl
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from os import remove, stat, chmod
 from os.path import basename, exists
 from sys import platform, version_info
+from urllib.parse import parse_qs, unquote
+from html import escape
 import requests
-from time import sleep
+from time import time, monotonic
 from .simple_curses_widgets import SimpleCursesLineEdit
+from .station_index import StationIndex
+from .journal import JOURNAL
+from .http_parser import HttpRequest, HttpRequestParser, HttpParseError
+from .websocket import WebSocketParser, WebSocketError, accept_key, \
+    encode_frame, encode_close, OP_TEXT, OP_CLOSE, OP_PING, OP_PONG
+from .metrics import REGISTRY, CONTENT_TYPE as METRICS_CONTENT_TYPE, \
+    counter, gauge, histogram
 
 import locale
 locale.setlocale(locale.LC_ALL, "")
 
 logger = logging.getLogger(__name__)
 
+_REQUESTS = counter(
+    'pyradio_server_requests_total',
+    'Remote Control Server requests', ('path', 'code')
+)
+_REQUEST_DURATION = histogram(
+    'pyradio_server_request_duration_seconds',
+    'Remote Control Server request latency', ('path', )
+)
+_CONNECTIONS = counter(
+    'pyradio_server_connections_total',
+    'Remote Control Server connections accepted'
+)
+_OPEN_CONNECTIONS = gauge(
+    'pyradio_server_open_connections',
+    'Remote Control Server open connections', ('type', )
+)
+
+''' what a non-blocking (plain or TLS) socket raises
+    when it cannot take more data right now '''
+_WOULD_BLOCK = (
+    BlockingIOError, InterruptedError,
+    ssl.SSLWantReadError, ssl.SSLWantWriteError
+)
+
+HAS_BROTLI = True
+try:
+    import brotli
+except:
+    HAS_BROTLI = False
+
 HAS_NETIFACES = True
 try:
     if not platform.lower().startswith('win'):
@@ -144,6 +193,591 @@ class IPsWithNumbers(object):
         '''
         return ip.lower() if self.ip_exists(ip) else 'localhost'
 
+class _EncodedBody(object):
+    ''' A static response body, along with its
+        compressed versions and its ETag
+    '''
+
+    __slots__ = ('body', 'encoded', 'etag')
+
+    def __init__(self, body):
+        self.body = body.encode('utf-8') if isinstance(body, str) else body
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest()[:20] + '"'
+        self.encoded = {'gzip': gzip.compress(self.body, 9)}
+        if HAS_BROTLI:
+            self.encoded['br'] = brotli.compress(self.body)
+
+
+class _ListingCache(object):
+    ''' Rendered stations / playlists listings
+
+        Items are kept in LRU order; the key of an item must
+        contain everything the rendered output depends on
+        (playlist, edit generation, selection, etc.), so that
+        stale items are never returned, just evicted.
+    '''
+
+    MAX_ITEMS = 32
+
+    def __init__(self):
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, render):
+        ''' return the cached item for key, or
+            the (cached) return value of render()
+        '''
+        with self._lock:
+            out = self._items.get(key)
+            if out is not None:
+                self._items.move_to_end(key)
+                return out
+        out = render()
+        with self._lock:
+            self._items[key] = out
+            while len(self._items) > self.MAX_ITEMS:
+                self._items.popitem(last=False)
+        return out
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class _HtmlTable(object):
+    ''' A stations / playlists / search terms table of the web page
+
+        The rows are rendered once, from pre-compiled templates,
+        without a selected row; render() only has to re-render
+        the selected one, so a table can be cached (and served)
+        regardless of the selection.
+
+        The table of the stations of the current playlist has a
+        version (data-version); the page uses it to move the
+        playing station marker in place, and to ask for the
+        table only when it has changed (/html/st?v=<version>).
+    '''
+
+    HEAD = '''<h5>Search field</h5>
+<input class="form-control" id="myInput" type="text" placeholder="Type to search for a {search}...">
+<br>
+<table class="table table-bordered">
+<thead>
+<tr class="btn-success">
+<td colspan="2" style="color: white; font-weight: bolder;">{caption}</td>
+</tr>
+</thead>
+<tbody id="myTable"{attrs}>
+'''
+    ROW = (
+        '<tr id="r{n}">\n'
+        '<td id="n{n}" class="text-right">{n}</td>\n'
+        '<td id="{n}"><a href="#" onclick="js_send_simple_command_with_stop(\'{url}\', {timeout});">{name}</a></td>\n'
+        '</tr>'
+    )
+    SELECTED_ROW = (
+        '<tr id="r{n}" class="btn-success">\n'
+        '<td id="n{n}" class="text-right" style="color: white;">{n}</td>\n'
+        '<td id="{n}"><a style="color: white;" href="#" onclick="js_send_simple_command_with_stop(\'{url}\', {timeout});">{name}</a></td>\n'
+        '</tr>'
+    )
+    GROUP_ROW = (
+        '<tr id="r{n}">\n'
+        '<td id="n{n}" class="text-center group-header" colspan="2">{name}</td>\n'
+        '</tr>'
+    )
+    TAIL = '\n</tbody>\n</table>'
+
+    def __init__(self, head, in_list, urls, timeout, first=0, tail=''):
+        ''' urls is a function returning the URL of an item '''
+        self.head = head
+        self.first = first
+        self.tail = self.TAIL + tail
+        self._in_list = in_list
+        self._urls = urls
+        self._timeout = timeout
+        self.rows = [self._row(i, n) for i, n in enumerate(in_list, start=first)]
+
+    def _row(self, i, name, template=None):
+        if name.startswith('<b>') or name.startswith('<B>'):
+            return self.GROUP_ROW.format(n=i+1, name=name)
+        return (template or self.ROW).format(
+            n=i+1, name=name,
+            url=self._urls(i+1),
+            timeout=self._timeout
+        )
+
+    def render(self, sel=-1):
+        rows = self.rows
+        if self.first <= sel < self.first + len(rows):
+            rows = list(rows)
+            rows[sel - self.first] = self._row(
+                sel, self._in_list[sel - self.first], self.SELECTED_ROW
+            )
+        return self.head + '\n'.join(rows) + self.tail
+
+
+class _RateLimiter(object):
+    ''' Per client token bucket
+
+        Every client (IP address) can send up to burst
+        requests at once, refilled at rate requests per
+        second; a rate of 0 disables rate limiting.
+    '''
+
+    ''' buckets of clients that have been idle long enough to
+        be full again are removed when there are more than this '''
+    MAX_CLIENTS = 256
+
+    def __init__(self, rate, burst):
+        self._rate = rate
+        self._burst = max(1, burst)
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def allow(self, client):
+        if self._rate <= 0:
+            return True
+        now = monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(client, (self._burst, now))
+            tokens = min(self._burst, tokens + (now - last) * self._rate)
+            allowed = tokens >= 1
+            self._buckets[client] = (tokens - 1 if allowed else tokens, now)
+            if len(self._buckets) > self.MAX_CLIENTS:
+                self._expire(now)
+        return allowed
+
+    def _expire(self, now):
+        refill = self._burst / self._rate
+        for client in [x for x, v in self._buckets.items() if now - v[1] > refill]:
+            del self._buckets[client]
+
+
+class _Flight(object):
+    ''' A coalesced command: the request to execute,
+        and the reply shared by all the requests joined
+    '''
+
+    __slots__ = ('request', 'reply', 'token', 'done')
+
+    def __init__(self, request):
+        self.request = request
+        self.reply = ''
+        self.token = None
+        self.done = threading.Event()
+
+
+class _QueuedCommand(object):
+    ''' A command queued to the command worker '''
+
+    __slots__ = (
+        'token', 'command', 'func', 'args', 'state',
+        'result', 'error', 'queued', 'finished', 'done'
+    )
+
+    def __init__(self, token, command, func, args):
+        self.token = token
+        self.command = command
+        self.func = func
+        self.args = args
+        ''' queued, running, done, error or cancelled '''
+        self.state = 'queued'
+        self.result = None
+        self.error = None
+        self.queued = time()
+        self.finished = None
+        self.done = threading.Event()
+
+    def to_json(self):
+        result = self.result
+        if not isinstance(result, (str, int, float, type(None))):
+            result = str(result)
+        return {
+            'token': self.token,
+            'command': self.command,
+            'state': self.state,
+            'result': result,
+            'queued': round(self.queued, 3),
+            'finished': None if self.finished is None else round(self.finished, 3)
+        }
+
+
+class _CommandWorker(object):
+    ''' Executes the commands that change the player state
+
+        A single thread owns the player: it executes these
+        commands in order. Text commands are just queued, and
+        the request is replied to with "202 Accepted" right
+        away, so a slow player (connecting to its IPC socket,
+        starting a new station, etc.) never delays the reply;
+        commands whose reply depends on their outcome (html
+        commands, for example) wait for it (see call()).
+
+        Every command gets a token; the outcome of the last
+        MAX_JOBS commands is kept, so that clients can wait
+        for it (/wait/<token>).
+
+        A volume command identical to one still waiting in the
+        queue is merged with it (gets the same token).
+    '''
+
+    MAX_JOBS = 256
+    MERGED = ('/volumeup', '/volumedown', '/volumesave')
+
+    def __init__(self, after=None):
+        ''' after is called after every command '''
+        self._after = after
+        self._queue = queue.Queue()
+        self._jobs = OrderedDict()
+        self._waiting = {}
+        self._jobs_lock = threading.Lock()
+        self._token = 0
+        self._thread = None
+        self._stopped = False
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run,
+            name='pyradio-server-commands'
+        )
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        ''' commands still queued are cancelled '''
+        with self._jobs_lock:
+            self._stopped = True
+        self._queue.put(None)
+
+    def submit(self, command, func, args=()):
+        ''' queue func(*args); returns the _QueuedCommand '''
+        with self._jobs_lock:
+            if self._stopped:
+                job = _QueuedCommand(0, command, func, args)
+                job.state = 'cancelled'
+                job.done.set()
+                return job
+            if command in self.MERGED:
+                job = self._waiting.get(command)
+                if job is not None:
+                    return job
+            self._token += 1
+            job = _QueuedCommand(self._token, command, func, args)
+            self._jobs[job.token] = job
+            while len(self._jobs) > self.MAX_JOBS:
+                self._jobs.popitem(last=False)
+            if command in self.MERGED:
+                self._waiting[command] = job
+            ''' under the lock, so that stop() cannot
+                be in between the check and this '''
+            self._queue.put(job)
+        return job
+
+    def call(self, command, func, args=()):
+        ''' execute func(*args) in the worker's thread,
+            and return its return value
+        '''
+        if self._thread is None or \
+                self._stopped or \
+                threading.current_thread() is self._thread:
+            return func(*args)
+        job = self.submit(command, func, args)
+        job.done.wait()
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def get(self, token):
+        with self._jobs_lock:
+            return self._jobs.get(token)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None or self._stopped:
+                break
+            with self._jobs_lock:
+                if self._waiting.get(job.command) is job:
+                    del self._waiting[job.command]
+                job.state = 'running'
+            try:
+                job.result = job.func(*job.args)
+                self._finish(job, 'done')
+            except Exception as e:
+                logger.error('Remote Control Server: command "{0}" failed: "{1}"'.format(job.command, e))
+                job.result = str(e)
+                job.error = e
+                self._finish(job, 'error')
+            if self._after is not None:
+                self._after()
+        ''' stopped; cancel the commands left in the queue '''
+        while True:
+            if job is not None:
+                self._finish(job, 'cancelled')
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+    def _finish(self, job, state):
+        with self._jobs_lock:
+            if self._waiting.get(job.command) is job:
+                del self._waiting[job.command]
+            job.state = state
+            job.finished = time()
+        job.done.set()
+
+
+class _Connection(object):
+    ''' A client connection of the Remote Control Server '''
+
+    __slots__ = (
+        'socket', 'address', 'parser', 'last_active', 'detached',
+        'ws', 'write_lock', 'listener', 'local', 'handshake',
+        'pending', 'dropped', 'readable'
+    )
+
+    def __init__(self, a_socket, address):
+        self.socket = a_socket
+        self.address = address
+        self.parser = HttpRequestParser()
+        self.last_active = time()
+        ''' True when the socket is handed over to the push channel '''
+        self.detached = False
+        ''' WebSocket frame parser, after the connection is upgraded '''
+        self.ws = None
+        ''' events pushed to a WebSocket connection, waiting
+            for its worker to send them (guarded by write_lock) '''
+        self.write_lock = threading.Lock()
+        self.pending = bytearray()
+        ''' True when the connection is to be closed, because
+            a write has failed or too many events are pending '''
+        self.dropped = False
+        self.listener = None
+        ''' True for Unix domain socket connections '''
+        self.local = False
+        ''' True while a TLS handshake is due '''
+        self.handshake = False
+        ''' False when the selector has only found the
+            connection writable (it has events pending) '''
+        self.readable = True
+
+
+class _EventsFollower(object):
+    ''' A connection following the events journal (/events?follow=1)
+
+        Called from the journal's thread; the socket is
+        non-blocking, data it cannot take right away is kept
+        in a buffer, and the follower is dropped if that buffer
+        grows larger than MAX_PENDING.
+    '''
+
+    MAX_PENDING = 65536
+
+    def __init__(self, a_socket, sse=False, event_types=None):
+        self.socket = a_socket
+        self.sse = sse
+        self.event_types = event_types
+        self.closed = False
+        self._pending = bytearray()
+        a_socket.setblocking(False)
+
+    def __call__(self, event, line):
+        if self.closed:
+            return False
+        if self.event_types and event['type'] not in self.event_types:
+            return True
+        if self.sse:
+            data = 'id: {0}\nevent: {1}\ndata: {2}\n\n'.format(event['seq'], event['type'], line)
+        else:
+            data = line + '\n'
+        self._pending.extend(data.encode('utf-8'))
+        try:
+            sent = self.socket.send(self._pending)
+            del self._pending[:sent]
+        except _WOULD_BLOCK:
+            pass
+        except (OSError, socket.error):
+            self.close()
+            return False
+        if len(self._pending) > self.MAX_PENDING:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug('Remote Control Server: dropping slow events follower')
+            self.close()
+            return False
+        return True
+
+    def close(self):
+        self.closed = True
+        try:
+            self.socket.close()
+        except (OSError, socket.error):
+            pass
+
+
+class _PushChannel(object):
+    ''' Event subscribers of the Remote Control Server
+
+        Events are published from any thread and delivered by a
+        dedicated thread; only events whose data have changed are
+        delivered, so idle subscribers cost nothing but a heartbeat
+        every HEARTBEAT seconds.
+
+        There are two kinds of subscribers:
+          - Server-Sent Events sockets; these are non-blocking,
+            data a subscriber cannot receive right away is kept
+            in a per subscriber buffer, and the subscriber is
+            dropped if that buffer grows larger than MAX_PENDING
+          - listeners; functions called with (event, data),
+            used by the WebSocket connections; they must not
+            block, so they only queue the events for the
+            worker of the connection to send
+    '''
+
+    HEARTBEAT = 15
+    MAX_PENDING = 65536
+
+    def __init__(self):
+        ''' subscribers and listeners are kept along with
+            the sequence number of the last event they have
+            (with the state snapshot sent to them) '''
+        self._subscribers = {}
+        self._listeners = {}
+        self._last = {}
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = None
+
+    @property
+    def subscribers(self):
+        return len(self._subscribers) + len(self._listeners)
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run,
+            name='pyradio-server-push'
+        )
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._queue.put(None)
+
+    def publish(self, event, data):
+        with self._lock:
+            if self._last.get(event) == data:
+                return
+            self._last[event] = data
+            self._seq += 1
+            self._queue.put(('event', (self._seq, event, data)))
+
+    def subscribe(self, a_socket):
+        ''' the socket is owned by the channel from now on;
+            the current state is sent to it first
+        '''
+        self._queue.put(('subscribe', a_socket))
+
+    def add_listener(self, func):
+        ''' func(event, data) will be called with the current
+            state first, and then with every change;
+            it is removed when it raises an exception
+        '''
+        self._queue.put(('listen', func))
+
+    def remove_listener(self, func):
+        self._queue.put(('unlisten', func))
+
+    def _format(self, event, data):
+        out = ['event: ' + event]
+        out.extend(['data: ' + x for x in str(data).split('\n')])
+        return ('\n'.join(out) + '\n\n').encode('utf-8')
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.HEARTBEAT)
+            except queue.Empty:
+                self._send_to_all(b': keep-alive\n\n')
+                continue
+            if item is None:
+                break
+            action, data = item
+            if action == 'event':
+                seq, event, value = data
+                b_msg = self._format(event, value)
+                for a_socket, entry in list(self._subscribers.items()):
+                    if seq > entry[1]:
+                        self._send(a_socket, b_msg)
+                for func, since in list(self._listeners.items()):
+                    if seq > since:
+                        self._call(func, event, value)
+            elif action == 'subscribe':
+                with self._lock:
+                    snapshot = b''.join(
+                        [self._format(k, v) for k, v in self._last.items()]
+                    )
+                    seq = self._seq
+                data.setblocking(False)
+                self._subscribers[data] = [bytearray(), seq]
+                if snapshot:
+                    self._send(data, snapshot)
+            elif action == 'listen':
+                with self._lock:
+                    snapshot = list(self._last.items())
+                    seq = self._seq
+                self._listeners[data] = seq
+                for k, v in snapshot:
+                    if not self._call(data, k, v):
+                        break
+            elif action == 'unlisten':
+                self._listeners.pop(data, None)
+        for a_socket in list(self._subscribers.keys()):
+            self._drop(a_socket)
+        self._listeners = {}
+
+    def _call(self, func, event, data):
+        try:
+            func(event, data)
+        except Exception as e:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug('Remote Control Server: removing event listener: "{}"'.format(e))
+            self._listeners.pop(func, None)
+            return False
+        return True
+
+    def _send_to_all(self, b_msg):
+        for a_socket in list(self._subscribers.keys()):
+            self._send(a_socket, b_msg)
+
+    def _send(self, a_socket, b_msg):
+        entry = self._subscribers.get(a_socket)
+        if entry is None:
+            return
+        pending = entry[0]
+        pending.extend(b_msg)
+        try:
+            sent = a_socket.send(pending)
+            del pending[:sent]
+        except _WOULD_BLOCK:
+            pass
+        except (OSError, socket.error):
+            self._drop(a_socket)
+            return
+        if len(pending) > self.MAX_PENDING:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug('Remote Control Server: dropping slow event stream subscriber')
+            self._drop(a_socket)
+
+    def _drop(self, a_socket):
+        self._subscribers.pop(a_socket, None)
+        try:
+            a_socket.close()
+        except (OSError, socket.error):
+            pass
+
+
 class PyRadioServer(object):
     _filter_string = '''
                     <script>
@@ -420,6 +1054,25 @@ div[id^='a_']:hover { underline: none;}
         }
     });
 
+    // mute, recording, volume and station changes are pushed
+    // by the server, so that the page does not have to poll
+    eventSource.addEventListener("mute", (event) => {
+        js_set_muted(event.data == 1);
+    });
+
+    eventSource.addEventListener("recording", (event) => {
+        js_set_recording(event.data);
+    });
+
+    // "<version> <station number>"; the marker is moved in
+    // place, if the stations table shown is the current one
+    eventSource.addEventListener("playing", (event) => {
+        var sp = event.data.split(" ");
+        if ( $("#myTable").attr("data-version") == sp[0] ){
+            js_set_playing(sp[1]);
+        }
+    });
+
     eventSource.onerror = function(m) {
         error_count++;
         if ( error_count > 5 ) {
@@ -434,6 +1087,65 @@ div[id^='a_']:hover { underline: none;}
         eventSource.close();
     }
 
+    ////////////////////////////////////////////////////////////////////
+    //                   WebSocket implementation                     //
+    ////////////////////////////////////////////////////////////////////
+
+    // commands are sent over a WebSocket when it is open,
+    // instead of making a new request for each one of them
+    var ws = null;
+    var ws_id = 0;
+    var ws_callbacks = {};
+
+    function js_open_ws(){
+        if ( ! window.WebSocket ){
+            return;
+        }
+        var proto = ( location.protocol == "https:" ) ? "wss://" : "ws://";
+        ws = new WebSocket(proto + location.host + "/html/ws");
+        ws.onmessage = function(event){
+            var msg = JSON.parse(event.data);
+            if ( ( "id" in msg ) && ( msg.id in ws_callbacks ) ){
+                var callback = ws_callbacks[msg.id];
+                delete ws_callbacks[msg.id];
+                callback(msg.reply);
+            }
+        };
+        ws.onclose = function(){
+            ws = null;
+            ws_callbacks = {};
+        };
+    }
+
+    function js_get(the_command, callback){
+        if ( ws !== null && ws.readyState == WebSocket.OPEN ){
+            ws_id++;
+            ws_callbacks[ws_id] = callback;
+            ws.send(JSON.stringify({"id": ws_id, "command": the_command}));
+        } else {
+            $.get(the_command, callback);
+        }
+    }
+
+    ////////////////////////////////////////////////////////////////////
+
+    ////////////////////////////////////////////////////////////////////
+    //              Incremental stations table updates                //
+    ////////////////////////////////////////////////////////////////////
+
+    // the last stations table received; if it is still current,
+    // the server replies "<!--same:n-->" instead of sending it again
+    var stations_table = null;
+
+    function js_set_playing(n){
+        var old = $("#myTable tr.btn-success");
+        old.removeClass("btn-success");
+        old.find("td, a").css("color", "");
+        var row = $("#r" + n);
+        row.addClass("btn-success");
+        row.find("td:not(.group-header), a").css("color", "white");
+    }
+
     ////////////////////////////////////////////////////////////////////
 
     function js_send_simple_command_with_stop(the_command, the_timeout){
@@ -484,8 +1196,17 @@ div[id^='a_']:hover { underline: none;}
         // if ( ( the_command == '/html/st' ) || ( the_command == '/html/pl' ) || ( ( the_command.startsWith("/html/pl/" ) && ( the_command.length > 9 )) )){
         //     js_get_selection();
         // }
-        $.get(the_command, function(result){
+        var to_send = the_command;
+        var playing = -1;
+        if ( the_command == '/html/st' && stations_table !== null ){
+            to_send = the_command + "?v=" + stations_table.version;
+        }
+        js_get(to_send, function(result){
             // console.log(the_command, result, typeof result);
+            if ( result.startsWith("<!--same:") && stations_table !== null ){
+                playing = parseInt(result.slice(9));
+                result = stations_table.html;
+            }
             //
             //  Check for html to display
             //
@@ -539,12 +1260,16 @@ div[id^='a_']:hover { underline: none;}
             clearTimeout(msg_timeout);
             js_set_title("#msg_text", result, the_command);
             js_show_element("msg");
+            if ( the_command == '/html/st' ){
+                var version = $("#myTable").attr("data-version");
+                stations_table = version ? {"version": version, "html": result} : null;
+                if ( playing > -1 ){
+                    js_set_playing(playing);
+                }
+            }
             if (the_timeout > 0){
                 msg_timeout = setTimeout(js_hide_msg, the_timeout);
             }
-            if ( the_command == "/html/mute" ) {
-                js_fix_muted();
-            }
             // console.log("the_command:", the_command)
             if ( ( the_command == '/html/st' ) || ( the_command == '/html/pl' ) || ( ( the_command.startsWith("/html/pl/" ) && ( the_command.length > 9 )) )){
                 // console.log("-- selection =", selection);
@@ -577,8 +1302,6 @@ div[id^='a_']:hover { underline: none;}
                     }
                 }
         }
-        js_fix_recording();
-        // js_fix_muted();
         // console.log("--------");
         js_disable_all_buttons(false);
         });
@@ -763,8 +1486,13 @@ div[id^='a_']:hover { underline: none;}
         const getRecordingStatus = async () => {
             const response = await fetch("/html/rec_status");
             const data = await response.text();
+            js_set_recording(data);
+        }
+        getRecordingStatus();
+    }
 
-            // console.log("async recording:", data);
+    function js_set_recording(data){
+            // console.log("recording:", data);
             var element = document.getElementById("recording");
             if ( data == 0 ){
                 element.className = "btn btn-danger";
@@ -787,28 +1515,29 @@ div[id^='a_']:hover { underline: none;}
                 element.innerHTML = "REC<br>Disabled";
                 element.disabled = true;
             }
-        }
-        getRecordingStatus();
     }
 
     function js_fix_muted(){
         const getMuted = async () => {
             const response = await fetch("/html/is_muted");
             const data = await response.text();
-
             // console.log("async:", data);
-            var element = document.getElementById("mute");
-            if ( data == 0 ){
-                element.className = "btn btn-danger";
-                element.innerHTML = "Unmute<br>Player"
-            } else {
-                element.className = "btn btn-warning";
-                element.innerHTML = "Mute<br>Player"
-            }
+            js_set_muted(data == 0);
         }
         getMuted();
     }
 
+    function js_set_muted(muted){
+        var element = document.getElementById("mute");
+        if ( muted ){
+            element.className = "btn btn-danger";
+            element.innerHTML = "Unmute<br>Player"
+        } else {
+            element.className = "btn btn-warning";
+            element.innerHTML = "Mute<br>Player"
+        }
+    }
+
     function js_fix_radio_browser(){
         const getRadioBrowser = async () => {
             const response = await fetch("/html/is_radio_browser");
@@ -856,6 +1585,7 @@ div[id^='a_']:hover { underline: none;}
 
     function js_init(){
         url_to_reload = window.location.href;
+        js_open_ws();
         js_fix_muted();
         js_fix_recording();
         js_fix_radio_browser();
@@ -901,6 +1631,10 @@ Restricted Commands (Main mode only)
 /playlists/x,y        /pl/x,y      play station id y from playlist id x
 /stations             /st          get stations list from current playlist
 /stations/x           /st/x        play station id x from current playlist
+/find?q=x                          find stations by name, URL or group name
+                                     (?pl=y: search playlist id y)
+/play_by_name/x       /pbn/x       play station named x from current playlist
+                                     (?pl=y: from playlist id y)
 /next                 /n           play next station
 /previous             /p           play previous station
 /histnext             /hn          play next station from history
@@ -917,7 +1651,29 @@ Restricted Commands (Main mode only)
 /rb_first_page        /frb         load RadioBrowser first results page
 /rb_next_page         /nrb         load RadioBrowser next results page
 /rb_previous_page     /prb         load RadioBrowser previous results page
-/reconfig                          force a headless instance to read config''',
+/reconfig                          force a headless instance to read config
+/metrics                           get metrics (Prometheus text format)
+/events                            get events journal (JSON lines)
+                                     (?since=x&type=y,z&follow=1)
+/wait/x                            wait for queued command with token x
+                                     (?timeout=seconds)
+
+JSON Commands
+---------------------------------------------------------------------------
+/json/state                        get player state
+/json/volume                       get volume and mute status
+/json/rb                           get RadioBrowser search items and page
+/json/stations                     get stations list from current playlist
+                                     (Main mode only)
+/json/playlists                    get playlists list (Main mode only)
+/json/playlists/x                  get stations list from playlist id x
+                                     (Main mode only)
+/json/find?q=x                     find stations (Main mode only)
+
+Stations lists (/st, /pl/x, /json/st, /json/pl/x) accept the parameters
+  ?offset=x&limit=y     list y stations (0: all), skipping the first x
+  ?around=z&limit=y     list y stations around z, where z is a station
+                          id, "selection" or "playing" (current playlist)''',
         '/quit': 'PyRadio Remote Service exiting!\nCheers!',
         '/volumeup': 'Volume increased!',
         '/volumedown': 'Volume decreased!',
@@ -941,10 +1697,98 @@ Restricted Commands (Main mode only)
         '/like': 'Station tagged (liked)',
     }
 
-    def __init__(self, bind_ip, bind_port, config, player, commands):
+    ''' number of connections served concurrently '''
+    MAX_WORKERS = 10
+    ''' maximum number of connections with requests being served
+        or waiting for a worker; when reached, the server stops
+        accepting and reading from connections until some are done
+    '''
+    MAX_IN_FLIGHT = 32
+    ''' backlog of the listening socket '''
+    LISTEN_BACKLOG = 16
+    ''' requests per second and burst allowed per client (IP) '''
+    RATE_LIMIT = 20
+    RATE_BURST = 40
+    ''' seconds to wait for a client to send / receive data '''
+    CLIENT_TIMEOUT = 5
+    ''' seconds an idle keep-alive connection is kept open '''
+    KEEP_ALIVE_TIMEOUT = 5
+    RECV_SIZE = 4096
+
+    ''' default number of stations listed around the selection '''
+    LISTING_WINDOW = 20
+
+    ''' seconds /wait/<token> waits for a command by default, and at most '''
+    WAIT_TIMEOUT = 10
+    MAX_WAIT_TIMEOUT = 60
+
+    ''' number of playlists to keep station indexes for '''
+    MAX_STATION_INDEXES = 8
+
+    ''' commands that do not change anything; the rest
+        are recorded in the events journal '''
+    QUERY_COMMANDS = (
+        '/title', '/html_info', '/text_info', '/html_is_stopped',
+        '/html_is_radio_browser', '/html_init', '/volume',
+        '/list_radio_browser', '/radio_browser_page'
+    )
+
+    ''' maximum number of distinct paths in the metrics;
+        the rest are counted as "other" '''
+    MAX_METRICS_PATHS = 200
+
+    ''' html replies smaller than this are not compressed '''
+    MIN_COMPRESS_SIZE = 1024
+
+    ''' the cookie a browser keeps the access token in '''
+    TOKEN_COOKIE = 'pyradio_token'
+
+    def __init__(
+            self, bind_ip, bind_port, config, player, commands,
+            max_in_flight=None, listen_backlog=None,
+            rate_limit=None, rate_burst=None
+    ):
         self.has_netifaces = HAS_NETIFACES
         if not self.has_netifaces:
             return
+        if max_in_flight is not None:
+            self.MAX_IN_FLIGHT = max_in_flight
+        if listen_backlog is not None:
+            self.LISTEN_BACKLOG = listen_backlog
+        self._limiter = _RateLimiter(
+            self.RATE_LIMIT if rate_limit is None else rate_limit,
+            self.RATE_BURST if rate_burst is None else rate_burst
+        )
+        ''' connections being served, or waiting for a worker '''
+        self._in_flight = 0
+        ''' readable connections waiting for MAX_IN_FLIGHT '''
+        self._deferred = deque()
+        self._accepting = False
+        self._pool = None
+        ''' TLS context (if a certificate is set) and access token '''
+        self._ssl_context = None
+        self._token = ''
+        ''' coalesced commands waiting for the command lock '''
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        self._metrics_paths = set()
+        ''' per connection state (socket, path, etc.)
+            each connection is served by its own thread
+        '''
+        self._local = threading.local()
+        self._exit = threading.Event()
+        self._server = None
+        self._connections = set()
+        self._connections_lock = threading.Lock()
+        self._idle = deque()
+        ''' WebSocket connections with events pending '''
+        self._flush = deque()
+        self._push = None
+        self._worker = None
+        self._listings = _ListingCache()
+        self._station_indexes = OrderedDict()
+        self._station_indexes_lock = threading.Lock()
+        self._pages = {}
         self._bind_ip = bind_ip
         if bind_ip.lower() == 'localhost':
             self._bind_ip = '127.0.0.1'
@@ -952,7 +1796,11 @@ Restricted Commands (Main mode only)
             sys_ip = IPs()
             self._bind_ip = sys_ip.IPs[1]
         self._bind_port = bind_port
-        self._commands = commands
+        self._commands = {
+            k: v if k in self.QUERY_COMMANDS else self._journaled(k, self._in_worker(k, v))
+            for k, v in commands.items()
+        }
+        self._followers = set()
         self._cnf = config
         self._player = player
 
@@ -964,6 +1812,55 @@ Restricted Commands (Main mode only)
     def port(self):
         return self._bind_port
 
+    @property
+    def client_socket(self):
+        return getattr(self._local, 'client_socket', None)
+
+    @client_socket.setter
+    def client_socket(self, value):
+        self._local.client_socket = value
+
+    @property
+    def _path(self):
+        return getattr(self._local, 'path', '')
+
+    @_path.setter
+    def _path(self, value):
+        self._local.path = value
+
+    @property
+    def _is_html(self):
+        return getattr(self._local, 'is_html', False)
+
+    @_is_html.setter
+    def _is_html(self, value):
+        self._local.is_html = value
+
+    @property
+    def _request(self):
+        ''' the HttpRequest being served by the current thread '''
+        return getattr(self._local, 'request', None)
+
+    @_request.setter
+    def _request(self, value):
+        self._local.request = value
+
+    @property
+    def _replied(self):
+        return getattr(self._local, 'replied', False)
+
+    @_replied.setter
+    def _replied(self, value):
+        self._local.replied = value
+
+    @property
+    def error(self):
+        return getattr(self._local, 'error', None)
+
+    @error.setter
+    def error(self, value):
+        self._local.error = value
+
     def start_remote_control_server(
             self,
             config,
@@ -981,6 +1878,7 @@ Restricted Commands (Main mode only)
         self._path = ''
         self.config = config
         self.report_file = config().remote_control_server_report_file
+        self.socket_file = config().remote_control_server_socket_file
         self.lists = lists
         self.playlist_in_editor = playlist_in_editor
         self.can_send_command = can_send_command
@@ -994,6 +1892,13 @@ Restricted Commands (Main mode only)
         self._selected = -1
         self.muted = muted
         self.lock = lock
+        self._token = getattr(config(), 'remote_control_server_token', '')
+        try:
+            self._ssl_context = self._create_ssl_context(config())
+        except (OSError, ssl.SSLError) as e:
+            logger.error('Remote Control Server TLS error: "{}"'.format(e))
+            error_func(e)
+            return
         self._remove_report_file()
         try:
             server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -1005,41 +1910,543 @@ Restricted Commands (Main mode only)
             error_func(e)
             return
         try:
-            server.listen()  # max backlog of connections
+            server.listen(self.LISTEN_BACKLOG)
         except (OSError, socket.error) as e:
             logger.error('Remote Control Server error: "{}"'.format(e))
             server.close()
             error_func(e)
             return
         if logger.isEnabledFor(logging.INFO):
-            logger.info('Remote Control Server listening on {}:{}'.format(self._bind_ip, self._bind_port))
+            logger.info('Remote Control Server listening on {0}:{1}{2}'.format(
+                self._bind_ip, self._bind_port,
+                ' (TLS)' if self._ssl_context else ''
+            ))
 
         self._create_report_file()
-        while True:
+        self._server = server
+        self._encode_pages()
+        self._push = _PushChannel()
+        self._push.start()
+        self._worker = _CommandWorker(self.publish_state)
+        self._worker.start()
+        JOURNAL.open(self.report_file[:-4] + '-events.ndjson')
+        _OPEN_CONNECTIONS.function = self._count_connections
+        server.setblocking(False)
+        unix_server = self._start_unix_server()
+        self._selector = selectors.DefaultSelector()
+        ''' used by the workers to hand idle keep-alive
+            connections back to the selector, and to wake
+            it up when it is time to exit
+        '''
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._wakeup_r.setblocking(False)
+        self._listening = (server, ) if unix_server is None else (server, unix_server)
+        for n in self._listening:
+            self._selector.register(n, selectors.EVENT_READ)
+        self._accepting = True
+        self._selector.register(self._wakeup_r, selectors.EVENT_READ)
+        self._pool = pool = ThreadPoolExecutor(
+            max_workers=self.MAX_WORKERS,
+            thread_name_prefix='pyradio-server'
+        )
+        while not self._exit.is_set():
             try:
-                self.client_socket, address = server.accept()
-                request = self.client_socket.recv(1024)
-            except socket.error as e:
+                events = self._selector.select(timeout=1)
+            except (OSError, socket.error) as e:
                 self._remove_report_file()
                 dead_func(e)
                 break
-            self.error = None
-            self._handle_client_connection(address, request)
-            if self.error is not None:
-                # self.client_socket.close()
-                self._remove_report_file()
-                dead_func(self.error)
-                break
-            if self._path == '/quit':
-                self.client_socket.close()
-                self._remove_report_file()
+            error = None
+            for key, mask in events:
+                if key.fileobj in self._listening:
+                    error = self._accept_connection(key.fileobj)
+                    if error is not None:
+                        break
+                elif key.fileobj is self._wakeup_r:
+                    try:
+                        self._wakeup_r.recv(1024)
+                    except (OSError, socket.error):
+                        pass
+                else:
+                    ''' data from a connection; a worker will
+                        serve it and hand it back when done
+                    '''
+                    self._selector.unregister(key.fileobj)
+                    key.data.readable = bool(mask & selectors.EVENT_READ)
+                    self._deferred.append(key.data)
+            if error is not None:
+                if not self._exit.is_set():
+                    self._remove_report_file()
+                    dead_func(error)
                 break
+            self._rearm_connections()
+            self._flush_connections()
+            self._dispatch_connections()
+            self._close_idle_connections()
+        self._close_connections()
+        self._push.stop()
+        self._worker.stop()
+        for n in list(self._followers):
+            n.close()
+        JOURNAL.close()
+        pool.shutdown(wait=False)
+        self._selector.close()
+        self._wakeup_r.close()
+        self._wakeup_w.close()
         server.close()
+        if unix_server is not None:
+            unix_server.close()
+            self._remove_socket_file()
+        self._server = None
         if logger.isEnabledFor(logging.INFO):
             logger.info('Remote Control Server exiting...')
         # just in case...
         self._remove_report_file()
 
+    def _accept_connection(self, server):
+        ''' accept a new connection and start watching it
+            Returns None on success, or the socket error
+        '''
+        try:
+            client_socket, address = server.accept()
+        except (BlockingIOError, InterruptedError):
+            return None
+        except (OSError, socket.error) as e:
+            return e
+        local = client_socket.family == getattr(socket, 'AF_UNIX', None)
+        if local:
+            ''' Unix domain socket; no (ip, port) address '''
+            address = ('localhost', 'unix')
+        handshake = False
+        if self._ssl_context is not None and not local:
+            ''' the handshake is done by the workers, a step
+                each time the client sends something; the
+                socket is non-blocking until it is done, so
+                that a slow client does not hold a worker '''
+            client_socket.setblocking(False)
+            try:
+                client_socket = self._ssl_context.wrap_socket(
+                    client_socket, server_side=True,
+                    do_handshake_on_connect=False
+                )
+            except (OSError, ssl.SSLError):
+                client_socket.close()
+                return None
+            handshake = True
+        else:
+            client_socket.setblocking(True)
+            client_socket.settimeout(self.CLIENT_TIMEOUT)
+        conn = _Connection(client_socket, address)
+        conn.local = local
+        conn.handshake = handshake
+        _CONNECTIONS.inc()
+        with self._connections_lock:
+            self._connections.add(conn)
+        self._selector.register(client_socket, selectors.EVENT_READ, conn)
+        return None
+
+    def _dispatch_connections(self):
+        ''' Hand readable connections to the workers, as long as
+            there are less than MAX_IN_FLIGHT of them in flight;
+            stop accepting new connections while there are not
+            (they will wait in the listen backlog)
+        '''
+        while self._deferred:
+            with self._connections_lock:
+                if self._in_flight >= self.MAX_IN_FLIGHT:
+                    break
+                self._in_flight += 1
+            self._pool.submit(self._serve_in_flight, self._deferred.popleft())
+        if self._deferred and self._accepting:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug('Remote Control Server: too many requests in flight; pausing')
+            for n in self._listening:
+                self._selector.unregister(n)
+            self._accepting = False
+        elif not self._deferred and not self._accepting:
+            for n in self._listening:
+                self._selector.register(n, selectors.EVENT_READ)
+            self._accepting = True
+
+    def _rearm_connections(self):
+        ''' watch the connections the workers are done with '''
+        while self._idle:
+            conn = self._idle.popleft()
+            if conn.dropped:
+                self._drop_connection(conn)
+                continue
+            events = selectors.EVENT_READ
+            if conn.pending:
+                events |= selectors.EVENT_WRITE
+            try:
+                self._selector.register(conn.socket, events, conn)
+            except (ValueError, KeyError, OSError):
+                self._drop_connection(conn)
+
+    def _flush_connections(self):
+        ''' watch the WebSocket connections that have events
+            pending until they are writable, and close the ones
+            the push channel has given up on; connections being
+            served are taken care of when handed back
+        '''
+        while self._flush:
+            conn = self._flush.popleft()
+            try:
+                key = self._selector.get_key(conn.socket)
+            except (ValueError, KeyError):
+                continue
+            if conn.dropped:
+                self._selector.unregister(conn.socket)
+                self._drop_connection(conn)
+            elif not key.events & selectors.EVENT_WRITE:
+                self._selector.modify(
+                    conn.socket,
+                    selectors.EVENT_READ | selectors.EVENT_WRITE,
+                    conn
+                )
+
+    def _close_idle_connections(self):
+        limit = time() - self.KEEP_ALIVE_TIMEOUT
+        idle = [key.data for key in self._selector.get_map().values()
+                if key.data is not None and key.data.ws is None and
+                key.data.last_active < limit]
+        for conn in idle:
+            self._selector.unregister(conn.socket)
+            self._drop_connection(conn)
+
+    def _wake_up_server(self):
+        try:
+            self._wakeup_w.send(b'\0')
+        except (OSError, socket.error, AttributeError):
+            pass
+
+    def _drop_connection(self, conn):
+        with self._connections_lock:
+            self._connections.discard(conn)
+        if conn.listener is not None:
+            self._push.remove_listener(conn.listener)
+            conn.listener = None
+        try:
+            conn.socket.close()
+        except (OSError, socket.error):
+            pass
+
+    def _count_connections(self):
+        ''' metrics gauge function '''
+        with self._connections_lock:
+            ws = len([x for x in self._connections if x.ws is not None])
+            total = len(self._connections)
+        events = self._push.subscribers if self._push else 0
+        return {
+            ('http', ): total - ws,
+            ('websocket', ): ws,
+            ('event-stream', ): events
+        }
+
+    def _metrics_path(self, path):
+        ''' path label for the metrics; numeric parameters
+            are replaced by "x", to keep the number of
+            distinct labels low
+        '''
+        sp = path.split('/')
+        for i in range(len(sp)):
+            if sp[i] and sp[i].replace(',', '').isdigit():
+                sp[i] = 'x'
+        path = '/'.join(sp)
+        if path not in self._metrics_paths:
+            if len(self._metrics_paths) >= self.MAX_METRICS_PATHS:
+                return 'other'
+            self._metrics_paths.add(path)
+        return path
+
+    def _close_connections(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                try:
+                    conn.socket.shutdown(socket.SHUT_RDWR)
+                    conn.socket.close()
+                except (OSError, socket.error):
+                    pass
+            self._connections.clear()
+
+    def _serve_in_flight(self, conn):
+        try:
+            self._serve_connection(conn)
+        finally:
+            with self._connections_lock:
+                self._in_flight -= 1
+            if self._deferred:
+                self._wake_up_server()
+
+    def _serve_connection(self, conn):
+        ''' Serve the requests pending on a connection
+            (runs in a worker thread)
+
+            Every connection has its own socket state; the commands
+            themselves are executed under self.lock, so that access
+            to lists(), sel() and the player is serialized.
+        '''
+        self.client_socket = conn.socket
+        keep_alive = False
+        if conn.handshake:
+            try:
+                conn.socket.do_handshake()
+            except (ssl.SSLWantReadError, ssl.SSLWantWriteError):
+                ''' the rest of the handshake is not here yet;
+                    wait for it in the selector (connections that
+                    do not complete it are closed as idle ones) '''
+                self.client_socket = None
+                self._idle.append(conn)
+                self._wake_up_server()
+                return
+            except (OSError, socket.error) as e:
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug('Remote Control Server: TLS handshake with {0}:{1} failed: "{2}"'.format(conn.address[0], conn.address[1], e))
+                self.client_socket = None
+                self._drop_connection(conn)
+                return
+            conn.handshake = False
+            conn.socket.setblocking(True)
+            conn.socket.settimeout(self.CLIENT_TIMEOUT)
+            if not conn.socket.pending():
+                ''' wait for the request in the selector '''
+                self.client_socket = None
+                conn.last_active = time()
+                self._idle.append(conn)
+                self._wake_up_server()
+                return
+        if conn.ws is not None and \
+                not self._ws_send(conn, b''):
+            data = None
+        elif not conn.readable:
+            ''' only here to send the pending events '''
+            data = None
+            keep_alive = True
+        else:
+            data = self._receive(conn)
+        if data and conn.ws is not None:
+            keep_alive = self._serve_websocket(conn, data)
+        elif data:
+            try:
+                requests = conn.parser.feed(data)
+                keep_alive = True
+            except HttpParseError as e:
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug('Remote Control Server: bad request from {0}:{1}: "{2}"'.format(conn.address[0], conn.address[1], e))
+                self._request = None
+                self._replied = False
+                self._send_response(str(e) + '\n', status=e.status)
+                requests = []
+            for request in requests:
+                keep_alive = self._serve_request(conn, request)
+                if not keep_alive:
+                    break
+        self.client_socket = None
+        self._request = None
+        if conn.detached:
+            ''' the push channel owns the socket now '''
+            with self._connections_lock:
+                self._connections.discard(conn)
+        elif keep_alive and not conn.dropped and \
+                not self._exit.is_set():
+            conn.last_active = time()
+            self._idle.append(conn)
+            self._wake_up_server()
+        else:
+            self._drop_connection(conn)
+
+    def _receive(self, conn):
+        ''' Returns the data received, or None on error '''
+        try:
+            data = conn.socket.recv(self.RECV_SIZE)
+            ''' TLS: data already decrypted does
+                not wake up the selector '''
+            pending = getattr(conn.socket, 'pending', None)
+            while data and pending is not None and pending():
+                data += conn.socket.recv(self.RECV_SIZE)
+        except (OSError, socket.error) as e:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug('Remote Control Server: error receiving from {0}:{1}: "{2}"'.format(conn.address[0], conn.address[1], e))
+            data = None
+        return data
+
+    def _serve_request(self, conn, request):
+        ''' Execute a request and make sure exactly one
+            reply is sent for it (pipelined requests on
+            the same connection depend on that)
+
+            Returns True if the connection is to be kept alive
+        '''
+        self._local.conn = conn
+        self._request = request
+        self._replied = False
+        self.error = None
+        self._path = ''
+        self._local.status = '200'
+        self._local.token = None
+        self._local.set_cookie = False
+        start = monotonic()
+        try:
+            return self._execute_request(conn, request)
+        finally:
+            path = self._metrics_path(request.path)
+            _REQUEST_DURATION.observe(monotonic() - start, path)
+            _REQUESTS.inc(path, self._local.status)
+
+    def _execute_request(self, conn, request):
+        if request.path != '/quit' and \
+                not conn.local and \
+                not self._limiter.allow(conn.address[0]):
+            self._send_response(
+                'Too many requests\n',
+                status='429 Too Many Requests',
+                headers=['Retry-After: 1']
+            )
+            return request.keep_alive and self.error is None
+        if not self._authorized(conn, request):
+            self._send_response(
+                'Unauthorized\n',
+                status='401 Unauthorized',
+                headers=['WWW-Authenticate: Bearer realm="PyRadio"']
+            )
+            return request.keep_alive and self.error is None
+        key = self._coalesce_key(request.path)
+        if request.path.startswith('/wait/'):
+            ''' not under the command lock; the
+                command worker needs it '''
+            self._wait_for_command(request.path[6:])
+        elif key is None:
+            with self.lock:
+                self._handle_holding_lock(conn.address, request)
+        else:
+            self._execute_coalesced(conn, key, request)
+        if not self._replied:
+            self._send_response('')
+        self.publish_state()
+        if conn.detached:
+            return False
+        if conn.ws is not None:
+            return True
+        if self.error is not None:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug('Remote Control Server: error sending to {0}:{1}: "{2}"'.format(conn.address[0], conn.address[1], self.error))
+            return False
+        if self._path == '/quit':
+            self._exit.set()
+            self._wake_up_server()
+            return False
+        return request.keep_alive
+
+    def _authorized(self, conn, request):
+        ''' True if no token is set, for Unix domain socket
+            connections, and for requests with the token:
+              - in an "Authorization: Bearer <token>" header
+              - in the TOKEN_COOKIE cookie
+              - as a "token" query parameter; the cookie is then
+                set in the reply, so that a browser only has to
+                open the page with it once
+        '''
+        if not self._token or conn.local:
+            return True
+        auth = request.header('authorization')
+        if auth[:7].lower() == 'bearer ' and \
+                self._token_matches(auth[7:].strip()):
+            return True
+        for n in request.header('cookie').split(';'):
+            name, _, value = n.strip().partition('=')
+            if name == self.TOKEN_COOKIE and self._token_matches(value):
+                return True
+        token = parse_qs(request.query).get('token')
+        if token and self._token_matches(token[-1]):
+            self._local.set_cookie = True
+            return True
+        return False
+
+    def _token_matches(self, token):
+        return hmac.compare_digest(token.encode('utf-8'), self._token.encode('utf-8'))
+
+    def _create_ssl_context(self, cnf):
+        ''' The TLS context, if a certificate is set
+
+            All connections use the same context, so that its
+            session cache (and session tickets) let clients resume
+            their TLS sessions when they reconnect, instead of
+            doing a full handshake every time.
+        '''
+        cert = getattr(cnf, 'remote_control_server_certificate', '')
+        if not cert:
+            return None
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.minimum_version = ssl.TLSVersion.TLSv1_2
+        context.load_cert_chain(
+            cert, getattr(cnf, 'remote_control_server_key', '') or None
+        )
+        return context
+
+    def _coalesce_key(self, path):
+        ''' Volume commands are coalesced; a flood of them
+            must not back up the player's command path.
+        '''
+        html = path.startswith('/html')
+        if html:
+            path = path[5:]
+        if path in ('/volumeup', '/vu'):
+            return html, '/vu'
+        if path in ('/volumedown', '/vd'):
+            return html, '/vd'
+        if path.startswith('/set_volume/') or path.startswith('/sv/'):
+            return html, '/sv'
+        return None
+
+    def _execute_coalesced(self, conn, key, request):
+        ''' Execute a command, unless the same command is already
+            waiting for the command lock; in that case just wait
+            for it to be executed and send the same reply.
+            For set volume commands, the last value requested
+            while waiting is the one set.
+        '''
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.request = request
+                leader = False
+            else:
+                flight = self._flights[key] = _Flight(request)
+                leader = True
+        if not leader:
+            flight.done.wait()
+            self._local.token = flight.token
+            if flight.reply:
+                self._send_response(flight.reply)
+            return
+        try:
+            with self.lock:
+                with self._flights_lock:
+                    del self._flights[key]
+                    to_execute = flight.request
+                self._local.capture = []
+                try:
+                    self._handle_holding_lock(conn.address, to_execute)
+                    flight.reply = ''.join(self._local.capture)
+                    flight.token = self._local.token
+                finally:
+                    self._local.capture = None
+        finally:
+            flight.done.set()
+        self._replied = False
+        if flight.reply:
+            self._send_response(flight.reply)
+
+    def _handle_holding_lock(self, address, request):
+        ''' _handle_client_connection(), called with self.lock
+            held; commands waiting for the command worker
+            release it meanwhile (see _in_worker) '''
+        self._local.holds_lock = True
+        try:
+            self._handle_client_connection(address, request)
+        finally:
+            self._local.holds_lock = False
+
     def _create_report_file(self):
         try:
             with open(self.report_file, 'w', encoding='utf-8') as f:
@@ -1047,6 +2454,43 @@ Restricted Commands (Main mode only)
         except:
             pass
 
+    def _start_unix_server(self):
+        ''' Also listen on a Unix domain socket in state_dir, so
+            that local clients can skip TCP; only the user
+            running PyRadio can connect to it.
+            Returns the socket, or None if not available.
+        '''
+        if platform.lower().startswith('win') or \
+                not hasattr(socket, 'AF_UNIX') or \
+                not self.socket_file:
+            return None
+        self._remove_socket_file()
+        try:
+            unix_server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        except (OSError, socket.error) as e:
+            logger.error('Remote Control Server: cannot create Unix socket: "{}"'.format(e))
+            return None
+        try:
+            unix_server.bind(self.socket_file)
+            chmod(self.socket_file, 0o600)
+            unix_server.listen(self.LISTEN_BACKLOG)
+        except (OSError, socket.error) as e:
+            logger.error('Remote Control Server: cannot listen on "{0}": "{1}"'.format(self.socket_file, e))
+            unix_server.close()
+            self._remove_socket_file()
+            return None
+        unix_server.setblocking(False)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info('Remote Control Server listening on {}'.format(self.socket_file))
+        return unix_server
+
+    def _remove_socket_file(self):
+        if self.socket_file and exists(self.socket_file):
+            try:
+                remove(self.socket_file)
+            except:
+                pass
+
     def _remove_report_file(self):
         if exists(self.report_file):
             try:
@@ -1055,23 +2499,7 @@ Restricted Commands (Main mode only)
                 pass
 
     def _handle_client_connection(self, address, request):
-        # logger.error ('Received {}'.format(request))
-        # logger.error ('\n\nReceived {}'.format(request.decode('utf-8', 'replace')))
-        try:
-            rcv = request.decode('utf-8')
-        except (OSError, socket.error) as e:
-            # self.client_socket.close()
-            self.error = e
-            return False
-        except:
-            rcv = 'Unicode Error'
-        sp = rcv.split(' ')
-
-
-        try:
-            self._path = sp[1]
-        except IndexError:
-            self._path = ''
+        self._path = request.path
         if logger.isEnabledFor(logging.INFO):
             logger.info('Accepted connection from {0}:{1} -> {2}'.format(address[0], address[1], self._path))
 
@@ -1085,7 +2513,13 @@ Restricted Commands (Main mode only)
             self._commands['/html_init']()
 
         elif self._path == '/title':
-            self.send_song_title(self.song_title())
+            if 'text/event-stream' in self._request.header('accept'):
+                self._start_event_stream()
+            else:
+                self.send_song_title(self.song_title())
+
+        elif self._path == '/ws':
+            self._start_websocket()
 
         elif self._path == '/favicon.ico':
             pass
@@ -1117,21 +2551,7 @@ Restricted Commands (Main mode only)
                 else:
                     self._send_text('Recording not supported')
             if self._is_html:
-                ''' 0: rec disabled, not recording
-                    1: rec enabled, not recording
-                    2: rec disabled, recording
-                    3: rec enabled, recording
-                '''
-                if self._player().recording == 0:
-                    if self._player().currently_recording:
-                        self._send_raw('2')
-                    else:
-                        self._send_raw('0')
-                else:
-                    if self._player().currently_recording:
-                        self._send_raw('3')
-                    else:
-                        self._send_raw('1')
+                self._send_raw(str(self._recording_status()))
             else:
                 rec = ', currently recording' if self._player().currently_recording else ''
                 if self._player().recording == 0:
@@ -1180,7 +2600,7 @@ Restricted Commands (Main mode only)
             else:
                 if self.sel()[1] > -1:
                     # self._send_text('Player mute toggled!')
-                    self._commands['/mute']()
+                    self._run_command('/mute')
                 else:
                     self._send_text(self._text['/idle'])
 
@@ -1194,7 +2614,7 @@ Restricted Commands (Main mode only)
                     if self.muted():
                         self._send_text('Player is muted!')
                     else:
-                        out = self._commands['/volumesave']()
+                        self._run_command('/volumesave')
                         # if out:
                         #     self._send_text('Volume saved!')
                         # else:
@@ -1213,7 +2633,7 @@ Restricted Commands (Main mode only)
                         self._send_text('Player is muted!')
                     else:
                         # self._send_text(self._text['/volumeup'])
-                        self._commands['/volumeup']()
+                        self._run_command('/volumeup')
                 else:
                     self._send_text(self._text['/idle'])
 
@@ -1228,7 +2648,7 @@ Restricted Commands (Main mode only)
                         self._send_text('Player is muted!')
                     else:
                         # self._send_text(self._text['/volumedown'])
-                        self._commands['/volumedown']()
+                        self._run_command('/volumedown')
                 else:
                     self._send_text(self._text['/idle'])
 
@@ -1277,8 +2697,8 @@ Restricted Commands (Main mode only)
                     self._send_raw(self._text['/perm_html'])
             else:
                 if self.can_send_command():
+                    self._run_command('/next')
                     self._send_text(self._text['/next'])
-                    self._commands['/next']()
                 else:
                     self._send_text(self._text['/perm'])
 
@@ -1292,8 +2712,8 @@ Restricted Commands (Main mode only)
                     self._send_raw(self._text['/perm_html'])
             else:
                 if self.can_send_command():
+                    self._run_command('/previous')
                     self._send_text(self._text['/previous'])
-                    self._commands['/previous']()
                 else:
                     self._send_text(self._text['/perm'])
 
@@ -1315,8 +2735,8 @@ Restricted Commands (Main mode only)
                     elif l_item + 1 < llen:
                         go_on = True
                     if go_on:
+                        self._run_command('/histnext')
                         self._send_text(self._text['/histnext'])
-                        self._commands['/histnext']()
                     else:
                         self._send_text('Already at last history item!')
                 else:
@@ -1341,8 +2761,8 @@ Restricted Commands (Main mode only)
                     elif l_item == 0:
                         go_on = False
                     if go_on:
+                        self._run_command('/histprev')
                         self._send_text(self._text['/histprev'])
-                        self._commands['/histprev']()
                     else:
                         self._send_text('Already at first history item!')
                 else:
@@ -1364,11 +2784,11 @@ Restricted Commands (Main mode only)
             else:
                 if self.can_send_command():
                     if self.sel()[1] > -1:
+                        self._run_command('/stop')
                         self._send_text(self._text['/stop'])
-                        self._commands['/stop']()
                     else:
+                        self._run_command('/start')
                         self._send_text(self._text['/start'])
-                        self._commands['/start']()
                 else:
                     self._send_text(self._text['/perm'])
 
@@ -1406,8 +2826,8 @@ Restricted Commands (Main mode only)
                                 self._commands['/jump'](ret)
                                 self._send_raw('<div class="alert alert-success">Playing <b>{}</b></div>'.format(self.lists()[0][-1][ret-1][0]))
                             else:
+                                self._run_command('/jump', ret)
                                 self._send_text(' Playing station: "{}"'.format(self.lists()[0][-1][ret-1][0]))
-                                self._commands['/jump'](ret)
                     has_error = False
             else:
                 if self._is_html:
@@ -1613,6 +3033,23 @@ Restricted Commands (Main mode only)
                     else:
                         self._send_raw('Error: Volume must be 0-100')
 
+        elif self._path == '/find':
+            if self.can_send_command():
+                self._find_stations()
+            elif self._is_html:
+                self._send_raw(self._text['/perm_html'])
+            else:
+                self._send_text(self._text['/perm'])
+
+        elif self._path.startswith('/play_by_name/') or \
+                self._path.startswith('/pbn/'):
+            if self.can_send_command():
+                self._play_by_name(unquote(self._path.split('/', 2)[2]))
+            elif self._is_html:
+                self._send_raw(self._text['/perm_html'])
+            else:
+                self._send_text(self._text['/perm'])
+
         elif self._path.startswith('/playlists') or \
                 self._path.startswith('/pl') or \
                 self._path == '/stations' or \
@@ -1636,78 +3073,7 @@ Restricted Commands (Main mode only)
                             if pl is None:
                                 self._send_text(self._text['/error'])
                             else:
-                                go_on = True
-                                try:
-                                    playlist_name = self.lists()[1][-1][pl][0]
-                                except IndexError:
-                                    self._send_text('Error: Playlist not found (id={})'.format(pl+1))
-                                    go_on = False
-                                if go_on:
-                                    p_name = basename(self.playlist_in_editor()[:-4])
-                                    if p_name == playlist_name:
-                                        # play station from current playlist
-                                        self._commands['/jump'](st+1)
-                                        if self._is_html:
-                                            self._send_raw(
-                                                '<div class="alert alert-success">Playing station <b>{0}</b> from playlist <i>{1}</i></b>'.format(
-                                                    self.lists()[0][-1][st][0],
-                                                    p_name
-                                                )
-                                            )
-                                        else:
-                                            self._send_text(
-                                                'Playing station "{0}" (id={1}) from playlist "{2}" (id={3})'.format(
-                                                    self.lists()[0][-1][st][0],
-                                                    st+1,
-                                                    p_name,
-                                                    pl+1
-                                                )
-                                            )
-                                    else:
-                                        # need to load a new playlist
-                                        if self.config().dirty_playlist:
-                                            self._send_text(
-                                                'Current playlist not saved; cannot load other playlist...'
-                                            )
-                                        else:
-                                            in_file, playlist_stations = self.config().read_playlist_for_server(playlist_name)
-                                            if playlist_stations:
-                                                if st < len(playlist_stations):
-                                                    item = [playlist_name, playlist_stations[st], st]
-                                                    if logger.isEnabledFor(logging.DEBUG):
-                                                        logger.debug('item = {}'.format(item))
-                                                    # radio.py 8762
-                                                    if self._is_html:
-                                                        self._commands['open_history'](in_file, item)
-                                                        self._send_raw(
-                                                            '<div class="alert alert-success">Playing station <b>{0}</b> from playlist <i>{1}</i></div>'.format(
-                                                                playlist_stations[st],
-                                                                playlist_name
-                                                            )
-                                                        )
-                                                    else:
-                                                        self._send_text(
-                                                            'Playing station "{0}" (id={1}) from playlist "{2}" (id={3})'.format(
-                                                                playlist_stations[st],
-                                                                st+1,
-                                                                playlist_name,
-                                                                pl+1
-                                                            )
-                                                        )
-                                                        sleep(1)
-                                                        self._commands['open_history'](in_file, item)
-                                                else:
-                                                    self._send_text(
-                                                        'Error: Requested station (id={0}) not found in playlist "{1}" (id={2})'.format(
-                                                            st+1, playlist_name, pl+1,
-                                                        )
-                                                    )
-                                            else:
-                                                self._send_text(
-                                                    'Error opening playlist "{0}" (id={1})'.format(
-                                                        playlist_name, pl+1
-                                                    )
-                                                )
+                                self._play_from_playlist(pl, st)
 
             else:
                 if not self.can_send_command():
@@ -1722,28 +3088,60 @@ Restricted Commands (Main mode only)
 
                     elif ret.startswith('/'):
                         if ret == '/stations':
-                            if self._is_html:
-                                self._selected = self.sel()[1]
-                                self._send_raw(
-                                    self._format_html_table(
-                                        self._list_stations(html=True), 0,
-                                        sel=self._selected,
-                                        show_page_navigation=self._cnf._online_browser is not None
+                            sel = self.sel()
+                            page = self._get_paging(len(self.lists()[0][-1]), sel)
+                            if page is None:
+                                self._send_paging_error()
+                            elif self._is_html:
+                                self._selected = sel[1]
+                                show_page_navigation = self._cnf._online_browser is not None
+                                if page[0] <= self._selected < page[1] and \
+                                        parse_qs(self._request.query).get('v', [None])[-1] == self._stations_version(page):
+                                    ''' the page has this table already;
+                                        it only has to mark the playing station '''
+                                    self._send_raw('<!--same:{}-->'.format(self._selected + 1))
+                                else:
+                                    self._send_raw(
+                                        self._listings.get(
+                                            self._listing_key(
+                                                'st_html', page,
+                                                self._rb_page_key() if show_page_navigation else None
+                                            ),
+                                            lambda: self._format_html_table(
+                                                self._list_stations(html=True, page=page), 0,
+                                                sel=None,
+                                                show_page_navigation=show_page_navigation,
+                                                first=page[0],
+                                                total=len(self.lists()[0][-1])
+                                            )
+                                        ).render(self._selected)
                                     )
-                                )
                             else:
-                                self._send_text(self._list_stations())
+                                self._send_text(
+                                    self._listings.get(
+                                        self._listing_key('st', sel, page),
+                                        lambda: self._list_stations(sel=sel, page=page)
+                                    )
+                                )
                         elif ret == '/playlists':
                             if self._is_html:
                                 self._selected = self._get_playlist_id(basename(self.playlist_in_editor()[:-4]))
                                 self._send_raw(
-                                    self._format_html_table(
-                                        self._list_playlists(html=True), 1,
-                                        sel=self._selected
+                                    self._listings.get(
+                                        self._listing_key('pl_html', self._selected),
+                                        lambda: self._format_html_table(
+                                            self._list_playlists(html=True), 1,
+                                            sel=self._selected
+                                        )
                                     )
                                 )
                             else:
-                                self._send_text(self._list_playlists())
+                                self._send_text(
+                                    self._listings.get(
+                                        self._listing_key('pl'),
+                                        self._list_playlists
+                                    )
+                                )
                         else:
                             self._send_text(self._text[ret])
 
@@ -1764,49 +3162,402 @@ Restricted Commands (Main mode only)
                                 in_file, out = self.config().read_playlist_for_server(
                                     playlist_name
                                 )
-                                if out:
+                                page = self._get_paging(len(out)) if out else None
+                                if out and page is None:
+                                    self._send_paging_error()
+                                elif out:
+                                    key = self._listing_key(
+                                        'pl_x_html' if self._is_html else 'pl_x',
+                                        ret, in_file, self._file_signature(in_file), page
+                                    )
                                     if self._is_html:
                                         self._send_raw(
-                                            self._format_html_table(
-                                                self._list_stations(stations=out, html=True),
-                                                index=2,
-                                                playlist_index=ret
+                                            self._listings.get(
+                                                key,
+                                                lambda: self._format_html_table(
+                                                    self._list_stations(stations=out, html=True, page=page),
+                                                    index=2,
+                                                    playlist_index=ret,
+                                                    first=page[0]
+                                                )
                                             )
                                         )
                                     else:
                                         self._send_text(
-                                            self._list_stations(playlist_name, out).replace(r'<b>', '').replace(r'</b>', '')
+                                            self._listings.get(
+                                                key,
+                                                lambda: self._list_stations(playlist_name, out, page=page).replace(r'<b>', '').replace(r'</b>', '')
+                                            )
                                         )
                                 else:
                                     if self._is_html:
                                         self._send_raw('<div class="alert txt-center alert-danger">Error reading playlist: <b>{}</b></div>'.format(playlist_name))
                                     else:
                                         self._send_text('Error reading playlist: "{}"'.format(playlist_name))
+        elif self._path == '/json' or self._path.startswith('/json/'):
+            self._send_json_reply()
+
+        elif self._path == '/metrics':
+            self._send_response(REGISTRY.render(), content_type=METRICS_CONTENT_TYPE)
+
+        elif self._path == '/events':
+            self._send_events()
         else:
             self._send_text(self._text['/error'])
 
         return True
 
     def send_song_title(self, msg=None):
+        ''' the reply goes to the connection served by the
+            current thread; there is none when called from
+            the player / log threads
+        '''
         if not msg:
             return
+        if self._push is not None:
+            self._push.publish('/html/title', '<b>' + msg + '</b>')
+        if self.client_socket is None:
+            return
         f_msg = 'retry: 150\nevent: /html/title\ndata: <b>' + msg + '</b>\n\n'
-        b_msg = f_msg.encode('utf-8')
-        txt = '''HTTP/1.1 200 OK
-Content-Type: text/event-stream; charset=UTF-8
-Cache-Control: no-cache
-Connection: keep-alive, Keep-Alive
-Keep-Alive: timeout=1, max=1000
-Content-Length: {}
-
-'''.format(len(b_msg)).encode('utf-8')
-        with self.lock:
+        self._send_response(
+            f_msg,
+            content_type='text/event-stream; charset=UTF-8',
+            headers=('Cache-Control: no-cache', )
+        )
+
+    def _start_event_stream(self):
+        ''' Turn the current connection into a Server-Sent Events
+            stream; title, volume, mute, recording and station
+            changes are pushed to it as they happen
+        '''
+        conn = self._local.conn
+        head = '\r\n'.join((
+            'HTTP/1.1 200 OK',
+            'Content-Type: text/event-stream; charset=UTF-8',
+            'Cache-Control: no-cache',
+            'Connection: keep-alive',
+            'X-Accel-Buffering: no',
+        )) + '\r\n\r\nretry: 3000\n\n'
+        self._replied = True
+        try:
+            self.client_socket.sendall(head.encode('utf-8'))
+        except socket.error as e:
+            self.error = e
+            return
+        conn.detached = True
+        title = self.song_title()
+        if title:
+            self._push.publish('/html/title', '<b>' + title + '</b>')
+        self.publish_state()
+        self._push.subscribe(conn.socket)
+
+    def _send_events(self):
+        ''' Reply with the events of the journal kept in memory,
+            as newline-delimited JSON; with ?follow=1 (or an
+            "Accept: text/event-stream" header, for Server-Sent
+            Events) keep the connection open and send new events
+            as they happen.
+
+            Parameters (all optional):
+                since   only events after this sequence number
+                        (or the Last-Event-ID header)
+                type    comma separated list of event types
+        '''
+        query = parse_qs(self._request.query)
+        sse = 'text/event-stream' in self._request.header('accept')
+        try:
+            since = int(query.get('since', [self._request.header('last-event-id', '0')])[-1] or 0)
+        except ValueError:
+            self._send_response('Error: Invalid "since" parameter\n', status='400 Bad Request')
+            return
+        event_types = [x for x in ','.join(query.get('type', [])).split(',') if x]
+        follow = sse or query.get('follow', ['0'])[-1].lower() in ('1', 'true', 'yes')
+        if not follow:
+            self._send_response(
+                ''.join(
+                    json.dumps(n, ensure_ascii=False) + '\n'
+                    for n in JOURNAL.since(since, event_types)
+                ),
+                content_type='application/x-ndjson; charset=UTF-8'
+            )
+            return
+        conn = self._local.conn
+        head = '\r\n'.join((
+            'HTTP/1.1 200 OK',
+            'Content-Type: ' + ('text/event-stream' if sse else 'application/x-ndjson') + '; charset=UTF-8',
+            'Cache-Control: no-cache',
+            'Connection: ' + ('keep-alive' if sse else 'close'),
+            'X-Accel-Buffering: no',
+        )) + '\r\n\r\n'
+        self._replied = True
+        try:
+            self.client_socket.sendall(head.encode('utf-8'))
+        except socket.error as e:
+            self.error = e
+            return
+        conn.detached = True
+        follower = _EventsFollower(conn.socket, sse, event_types)
+        self._followers = set(n for n in self._followers if not n.closed)
+        self._followers.add(follower)
+        JOURNAL.add_listener(follower, since)
+
+    def _run_command(self, command, *args):
+        ''' Queue a command that changes the player state to
+            the command worker; the reply to the request will
+            be "202 Accepted", with the command's token
+        '''
+        job = self._worker.submit(
+            command, self._execute_queued,
+            (self._local.conn, command, args)
+        )
+        self._local.token = job.token
+
+    def _execute_queued(self, conn, command, args):
+        ''' runs in the command worker's thread '''
+        self._local.conn = conn
+        return self._commands[command](*args)
+
+    def _in_worker(self, command, func):
+        ''' func, executed by the command worker (once started)
+
+            A request waiting for it does not hold self.lock
+            meanwhile, so that a slow player does not hold up
+            the other requests.
+        '''
+        def in_worker(*args):
+            if self._worker is None:
+                return func(*args)
+            if not getattr(self._local, 'holds_lock', False):
+                return self._worker.call(command, func, args)
+            self._local.holds_lock = False
+            self.lock.release()
+            try:
+                return self._worker.call(command, func, args)
+            finally:
+                self.lock.acquire()
+                self._local.holds_lock = True
+        return in_worker
+
+    def _wait_for_command(self, token):
+        ''' Reply with the outcome of a queued command, waiting
+            for it for up to ?timeout= seconds (default
+            WAIT_TIMEOUT, at most MAX_WAIT_TIMEOUT);
+            "202 Accepted" if it is still not executed
+        '''
+        self._is_html = False
+        try:
+            timeout = float(parse_qs(self._request.query).get('timeout', [self.WAIT_TIMEOUT])[-1])
+            job = self._worker.get(int(token))
+        except ValueError:
+            self._send_json({'error': 'Invalid token or timeout'}, status='400 Bad Request')
+            return
+        if job is None:
+            self._send_json({'error': 'Unknown token: ' + token}, status='404 Not Found')
+            return
+        job.done.wait(min(max(timeout, 0), self.MAX_WAIT_TIMEOUT))
+        self._send_json(
+            job.to_json(),
+            status='200 OK' if job.done.is_set() else '202 Accepted'
+        )
+
+    def _journaled(self, command, func):
+        ''' func, recording its calls in the events journal '''
+        def journaled(*args):
             try:
-                self.client_socket.sendall(txt + b_msg)
-            except socket.error as e:
-                self.error = e
+                client = self._local.conn.address[0]
             except AttributeError:
-                pass
+                client = None
+            JOURNAL.emit(
+                'command',
+                command=command,
+                args=[x if isinstance(x, (int, str)) else str(x) for x in args],
+                client=client
+            )
+            return func(*args)
+        return journaled
+
+    def _start_websocket(self):
+        ''' Upgrade the current connection to a WebSocket
+
+            Commands are sent as text messages, either as a plain
+            command ("/vu", "/html/st", etc.) or as a JSON object
+            ({"id": 1, "command": "/vu"}); each one gets a JSON
+            reply ({"id": 1, "reply": "..."}). State changes are
+            pushed as {"event": "volume", "data": 50}, just like
+            on the event stream.
+        '''
+        key = self._request.header('sec-websocket-key')
+        if 'websocket' not in self._request.header('upgrade').lower() or \
+                not key:
+            self._send_response(
+                'Error: WebSocket upgrade expected\n',
+                status='400 Bad Request'
+            )
+            return
+        conn = self._local.conn
+        head = '\r\n'.join((
+            'HTTP/1.1 101 Switching Protocols',
+            'Upgrade: websocket',
+            'Connection: Upgrade',
+            'Sec-WebSocket-Accept: ' + accept_key(key),
+        )) + '\r\n\r\n'
+        self._replied = True
+        if not self._ws_send(conn, head.encode('utf-8')):
+            self.error = socket.error('WebSocket handshake failed')
+            return
+        conn.ws = WebSocketParser()
+        conn.listener = lambda event, data: self._ws_event(conn, event, data)
+        self._push.add_listener(conn.listener)
+
+    def _serve_websocket(self, conn, data):
+        ''' Handle WebSocket frames
+            Returns True if the connection is to be kept alive
+        '''
+        try:
+            messages = conn.ws.feed(data)
+        except WebSocketError as e:
+            self._ws_send(conn, encode_close(e.code, str(e)))
+            return False
+        for opcode, payload in messages:
+            if opcode == OP_CLOSE:
+                self._ws_send(conn, encode_close())
+                return False
+            elif opcode == OP_PING:
+                if not self._ws_send(conn, encode_frame(payload, OP_PONG)):
+                    return False
+            elif opcode == OP_TEXT:
+                if not self._ws_command(conn, payload):
+                    return False
+        return True
+
+    def _ws_command(self, conn, payload):
+        ''' Execute a command received on a WebSocket
+            The reply is captured and sent back as a JSON message.
+        '''
+        msg_id = None
+        try:
+            command = payload.decode('utf-8').strip()
+            if command.startswith('{'):
+                msg = json.loads(command)
+                msg_id = msg.get('id')
+                command = str(msg.get('command', ''))
+        except (UnicodeDecodeError, ValueError, AttributeError):
+            return self._ws_reply(conn, msg_id, 'Error: Invalid command')
+        if not command.startswith('/'):
+            command = '/' + command
+        if command.split('?')[0] in ('/quit', '/ws', '/html/ws'):
+            return self._ws_reply(conn, msg_id, 'Error: Command not available on a WebSocket')
+        if not conn.local and \
+                not self._limiter.allow(conn.address[0]):
+            return self._ws_reply(conn, msg_id, 'Error: Too many requests')
+        self._local.conn = conn
+        self._local.capture = []
+        self._local.token = None
+        self._request = HttpRequest('GET', command, 'HTTP/1.1', {})
+        self._replied = False
+        self.error = None
+        self._path = ''
+        try:
+            with self.lock:
+                self._handle_holding_lock(conn.address, self._request)
+            reply = ''.join(self._local.capture)
+        finally:
+            self._local.capture = None
+        self.publish_state()
+        return self._ws_reply(conn, msg_id, reply, self._local.token)
+
+    def _ws_reply(self, conn, msg_id, reply, token=None):
+        out = {'reply': reply}
+        if msg_id is not None:
+            out['id'] = msg_id
+        if token is not None:
+            out['token'] = token
+        return self._ws_send(conn, encode_frame(json.dumps(out)))
+
+    def _ws_event(self, conn, event, data):
+        ''' push channel listener of a WebSocket connection
+
+            The event is queued for the worker of the connection;
+            the push thread does not write to the socket, so that
+            a slow client does not hold up the other subscribers
+            (and a TLS socket is not used by two threads at once).
+            The connection is closed if it falls too far behind.
+        '''
+        b_msg = encode_frame(json.dumps({'event': event, 'data': data}))
+        with conn.write_lock:
+            if not conn.dropped:
+                conn.pending.extend(b_msg)
+                if len(conn.pending) > _PushChannel.MAX_PENDING:
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug('Remote Control Server: dropping slow WebSocket client {0}:{1}'.format(conn.address[0], conn.address[1]))
+                    conn.dropped = True
+            dropped = conn.dropped
+        self._flush.append(conn)
+        self._wake_up_server()
+        if dropped:
+            raise socket.error('WebSocket connection closed')
+
+    def _ws_send(self, conn, b_msg):
+        ''' Send a message after the events pending for the
+            connection (runs in the worker of the connection)
+            Any failure, even after a part of the data has been
+            sent, marks the connection to be closed.
+        '''
+        with conn.write_lock:
+            if conn.dropped:
+                return False
+            b_msg = bytes(conn.pending) + b_msg
+            del conn.pending[:]
+        if b_msg:
+            try:
+                conn.socket.sendall(b_msg)
+            except (OSError, socket.error):
+                conn.dropped = True
+                return False
+        return True
+
+    def publish_state(self):
+        ''' Publish the player state to the event stream subscribers
+            Only the values that have changed are actually sent.
+        '''
+        if self._push is None:
+            return
+        try:
+            player = self._player()
+            try:
+                volume = int(player.volume)
+            except (ValueError, TypeError):
+                volume = -1
+            mute = 1 if self.muted() else 0
+            rec = self._recording_status()
+            playing = self.sel()[1]
+            station = self.lists()[0][-1][playing][0] if playing > -1 else ''
+            version = self._stations_version((0, len(self.lists()[0][-1])))
+        except (AttributeError, IndexError, TypeError):
+            return
+        for event, data in (
+            ('volume', volume),
+            ('mute', mute),
+            ('recording', rec),
+            ('station', station),
+            ('playing', '{0} {1}'.format(version, playing + 1)),
+        ):
+            self._push.publish(event, data)
+
+    def _recording_status(self):
+        ''' 0: rec disabled, not recording
+            1: rec enabled, not recording
+            2: rec disabled, recording
+            3: rec enabled, recording
+            4: recording not supported
+        '''
+        player = self._player()
+        if platform.lower().startswith('win') and \
+                player.PLAYER_NAME == 'vlc':
+            return 4
+        if player.recording == 0:
+            return 2 if player.currently_recording else 0
+        return 3 if player.currently_recording else 1
 
     def _send_raw(self, msg):
         # logger.error('msg = "{}"'.format(msg))
@@ -1814,20 +3565,7 @@ Content-Length: {}
             msg = 'Unknown reply...'
         if msg.startswith('retry: '):
             return
-        f_msg = msg + '\n'
-        b_msg = f_msg.encode('utf-8')
-        txt = '''HTTP/1.1 200 OK
-Content-Type: text/txt; charset=UTF-8
-Connection: keep-alive, Keep-Alive
-Keep-Alive: timeout=1, max=1000
-Content-Length: {}
-
-'''.format(len(b_msg)).encode('utf-8')
-        with self.lock:
-            try:
-                self.client_socket.sendall(txt + b_msg)
-            except socket.error as e:
-                self.error = e
+        self._send_response(msg + '\n')
 
     def _send_text(
         self, msg,
@@ -1839,38 +3577,621 @@ Content-Length: {}
         if self._is_html:
             self._send_html(put_script=put_script)
             return
-        f_msg = msg + '\n'
-        b_msg = f_msg.encode('utf-8')
-        txt = '''HTTP/1.1 200 OK
-Content-Type: text/txt; charset=UTF-8
-Connection: keep-alive, Keep-Alive
-Keep-Alive: timeout=1, max=1000
-Content-Length: {}
-
-'''.format(len(b_msg)).encode('utf-8')
-        with self.lock:
-            try:
-                self.client_socket.sendall(txt + b_msg)
-            except socket.error as e:
-                self.error = e
+        self._send_response(msg + '\n')
 
-    def _send_html(self, msg=None, put_script=False):
+    def _encode_pages(self):
+        ''' The web page is static; encode and compress
+            it once, instead of doing it on every request
+        '''
         f_msg = self._html + '\n'
-        if put_script:
-            f_msg = self._insert_html_script(f_msg)
-        b_msg = f_msg.encode('utf-8')
-        txt = '''HTTP/1.1 200 OK
-Content-Type: text/html; charset=UTF-8
-Connection: keep-alive, Keep-Alive
-Keep-Alive: timeout=1, max=1000
-Content-Length: {}
-
-'''.format(len(b_msg)).encode('utf-8')
-        with self.lock:
+        self._pages = {
+            False: _EncodedBody(f_msg),
+            True: _EncodedBody(self._insert_html_script(f_msg))
+        }
+
+    def _send_html(self, msg=None, put_script=False):
+        page = self._pages.get(put_script)
+        if page is None or self._request is None:
+            f_msg = self._html + '\n'
+            if put_script:
+                f_msg = self._insert_html_script(f_msg)
+            self._send_response(f_msg, content_type='text/html; charset=UTF-8')
+            return
+        headers = ['ETag: ' + page.etag, 'Cache-Control: no-cache']
+        if self._etag_matches(page.etag):
+            self._send_response(
+                b'', content_type='text/html; charset=UTF-8',
+                status='304 Not Modified', headers=headers
+            )
+            return
+        encoding = self._accepted_encoding(page.encoded)
+        self._send_response(
+            page.encoded[encoding] if encoding else page.body,
+            content_type='text/html; charset=UTF-8',
+            headers=headers,
+            content_encoding=encoding
+        )
+
+    def _etag_matches(self, etag):
+        if_none_match = self._request.header('if-none-match')
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == '*':
+            return True
+        for n in if_none_match.split(','):
+            n = n.strip()
+            if n.startswith('W/'):
+                n = n[2:]
+            if n == etag:
+                return True
+        return False
+
+    def _accepted_encoding(self, available=('br', 'gzip')):
+        ''' Return the preferred content coding the client
+            accepts (and we can produce), or None for identity
+        '''
+        if self._request is None:
+            return None
+        accept = self._request.header('accept-encoding')
+        if not accept:
+            return None
+        accepted = {}
+        for n in accept.split(','):
+            sp = n.strip().split(';')
+            q = 1.0
+            for param in sp[1:]:
+                param = param.strip()
+                if param.startswith('q='):
+                    try:
+                        q = float(param[2:])
+                    except ValueError:
+                        q = 0
+            accepted[sp[0].strip().lower()] = q
+        best = None
+        for n in ('br', 'gzip'):
+            if n not in available:
+                continue
+            q = accepted.get(n, accepted.get('*', 0))
+            if q > 0 and (best is None or q > best[1]):
+                best = (n, q)
+        return best[0] if best else None
+
+    def _send_response(
+            self, msg,
+            content_type='text/txt; charset=UTF-8',
+            status='200 OK',
+            headers=None,
+            content_encoding=None
+    ):
+        ''' Send a reply to the request served by the current thread
+
+            Only the first reply to a request is sent; any
+            other would be taken as the reply to the next
+            request of a keep-alive connection.
+
+            content_encoding is the coding msg is already
+            compressed with; otherwise large html replies are
+            compressed if the client accepts it.
+        '''
+        capture = getattr(self._local, 'capture', None)
+        if capture is not None:
+            ''' command received on a WebSocket '''
+            if not self._replied:
+                self._replied = True
+                capture.append(msg if isinstance(msg, str) else msg.decode('utf-8', 'replace'))
+            return
+        if self.client_socket is None:
+            return
+        if self._replied:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug('Remote Control Server: request already replied to; dropping reply')
+            return
+        token = getattr(self._local, 'token', None)
+        if token is not None and status.startswith('200'):
+            ''' the command has been queued '''
+            status = '202 Accepted'
+            headers = list(headers or []) + [
+                'X-Command-Token: {}'.format(token),
+                'Location: /wait/{}'.format(token)
+            ]
+        self._replied = True
+        self._local.status = status[:3]
+        b_msg = msg.encode('utf-8') if isinstance(msg, str) else msg
+        if content_encoding is None and \
+                self._is_html and \
+                len(b_msg) >= self.MIN_COMPRESS_SIZE and \
+                status.startswith('200'):
+            if self._accepted_encoding(('gzip', )):
+                ''' a fast level, these are created per request '''
+                b_msg = gzip.compress(b_msg, 5)
+                content_encoding = 'gzip'
+        head = [
+            'HTTP/1.1 ' + status,
+            'Content-Type: ' + content_type
+        ]
+        if headers:
+            head.extend(headers)
+        if content_encoding:
+            head.append('Content-Encoding: ' + content_encoding)
+        if self._is_html:
+            head.append('Vary: Accept-Encoding')
+        if getattr(self._local, 'set_cookie', False):
+            self._local.set_cookie = False
+            head.append('Set-Cookie: {0}={1}; Path=/; HttpOnly; SameSite=Strict{2}'.format(
+                self.TOKEN_COOKIE, self._token,
+                '; Secure' if self._ssl_context else ''
+            ))
+        if self._request is not None and self._request.keep_alive:
+            head.append('Connection: keep-alive')
+            head.append('Keep-Alive: timeout={}, max=1000'.format(self.KEEP_ALIVE_TIMEOUT))
+        else:
+            head.append('Connection: close')
+        if not status.startswith('304'):
+            head.append('Content-Length: {}'.format(len(b_msg)))
+        txt = ('\r\n'.join(head) + '\r\n\r\n').encode('utf-8')
+        if self._request is not None and self._request.method == 'HEAD':
+            b_msg = b''
+        try:
+            self.client_socket.sendall(txt + b_msg)
+        except socket.error as e:
+            self.error = e
+
+    def _send_json(self, obj, status='200 OK'):
+        self._send_response(
+            json.dumps(obj, ensure_ascii=False),
+            content_type='application/json; charset=UTF-8',
+            status=status
+        )
+
+    def _send_json_reply(self):
+        ''' Reply to a /json/... request
+
+            The data come straight from the in-memory lists,
+            without going through the text / html formatting.
+            Lists of stations accept paging parameters:
+                ?offset=x&limit=y
+        '''
+        sp = [x for x in self._path.split('/') if x][1:]
+        if sp in (['state'], ['status']):
+            self._send_json(self._json_state())
+        elif sp in (['volume'], ['v']):
+            self._send_json(self._json_volume())
+        elif sp in (['rb'], ['radio_browser']):
+            self._send_json(self._json_radio_browser())
+        elif sp and sp[0] in ('stations', 'st', 'playlists', 'pl', 'find'):
+            if not self.can_send_command():
+                self._send_json({'error': self._text['/perm']}, '403 Forbidden')
+                return
+            if len(sp) > 2:
+                self._send_json({'error': self._text['/error']}, '404 Not Found')
+            elif sp[0] == 'find':
+                if len(sp) == 1:
+                    self._json_find_stations()
+                else:
+                    self._send_json({'error': self._text['/error']}, '404 Not Found')
+            elif sp[0] in ('stations', 'st'):
+                if len(sp) == 1:
+                    self._json_current_stations()
+                else:
+                    self._send_json({'error': self._text['/error']}, '404 Not Found')
+            elif len(sp) == 1:
+                self._json_playlists()
+            else:
+                self._json_playlist_stations(sp[1])
+        else:
+            self._send_json({'error': self._text['/error']}, '404 Not Found')
+
+    def _get_paging(self, total, sel=None):
+        ''' Return the (offset, end) of the requested page
+            of a list of total items, or None if the paging
+            parameters are invalid.
+
+            Parameters (all optional):
+                offset  number of items to skip
+                limit   maximum number of items; 0 (the default)
+                        means "no limit"
+                around  "selection", "playing" or an item id;
+                        return a window of limit (default
+                        LISTING_WINDOW) items centered on it
+                        (offset is ignored)
+
+            sel is the (selection, playing) tuple, captured
+            once by the caller; None if it does not apply.
+        '''
+        query = parse_qs(self._request.query) if self._request is not None else {}
+        try:
+            offset = int(query.get('offset', ['0'])[-1])
+            limit = int(query.get('limit', ['0'])[-1])
+        except ValueError:
+            return None
+        if offset < 0 or limit < 0:
+            return None
+        around = query.get('around', [''])[-1].lower()
+        if around:
+            if around in ('selection', 'sel', 's'):
+                if sel is None:
+                    return None
+                center = sel[0]
+            elif around in ('playing', 'p'):
+                if sel is None:
+                    return None
+                center = sel[1] if sel[1] > -1 else sel[0]
+            else:
+                try:
+                    center = int(around) - 1
+                except ValueError:
+                    return None
+            if limit == 0:
+                limit = self.LISTING_WINDOW
+            offset = max(0, min(center - limit // 2, total - limit))
+        offset = min(offset, total)
+        end = total if limit == 0 else min(offset + limit, total)
+        return offset, end
+
+    def _send_paging_error(self):
+        if self._is_html:
+            self._send_raw('<div class="alert txt-center alert-danger">Error in paging parameters</div>')
+        else:
+            self._send_text('Error in paging parameters')
+
+    def _json_page(self, stations, extra, sel=None):
+        ''' Send a page of a list of stations
+
+            stations are items of the form [name, url, ...]
+            extra is a dict of additional values to send
+            sel is the (selection, playing) tuple, if applicable
+        '''
+        paging = self._get_paging(len(stations), sel)
+        if paging is None:
+            self._send_json({'error': 'Invalid paging parameters'}, '400 Bad Request')
+            return
+        offset, end = paging
+        out = [self._json_station(i, stations[i]) for i in range(offset, end)]
+        extra.update({
+            'total': len(stations),
+            'offset': offset,
+            'count': len(out),
+            'stations': out
+        })
+        self._send_json(extra)
+
+    def _json_station(self, i, n):
+        group = n[1] == '-'
+        return {
+            'id': i + 1,
+            'name': n[0],
+            'url': '' if group else n[1],
+            'encoding': n[2] if len(n) > 2 and not group else '',
+            'group': group
+        }
+
+    def _json_find_stations(self):
+        params = self._get_find_parameters()
+        if params is None or not params[0]:
+            self._send_json({'error': 'Invalid search parameters'}, '400 Bad Request')
+            return
+        query, playlist_id = params
+        playlist_name, stations, index = self._station_index(playlist_id)
+        if playlist_name is None:
+            self._send_json(
+                {'error': 'Playlist not found (id={})'.format(playlist_id)},
+                '404 Not Found'
+            )
+            return
+        out = [self._json_station(i, stations[i]) for i in index.find(query)]
+        self._send_json({
+            'playlist': playlist_name,
+            'query': query,
+            'count': len(out),
+            'stations': out
+        })
+
+    def _json_current_stations(self):
+        sel, playing = self.sel()
+        self._json_page(
+            self.lists()[0][-1],
+            {
+                'playlist': basename(self.playlist_in_editor()[:-4]),
+                'radio_browser': bool(self._cnf.browsing_station_service),
+                'selection': sel + 1,
+                'playing': playing + 1
+            },
+            (sel, playing)
+        )
+
+    def _json_playlists(self):
+        current = basename(self.playlist_in_editor()[:-4])
+        out = []
+        for i, n in enumerate(self.lists()[1][-1]):
+            out.append({
+                'id': i + 1,
+                'name': n[0],
+                'loaded': n[0] == current
+            })
+        self._send_json({'total': len(out), 'playlists': out})
+
+    def _json_playlist_stations(self, playlist_id):
+        try:
+            pl = int(playlist_id) - 1
+        except ValueError:
+            self._send_json({'error': self._text['/error']}, '400 Bad Request')
+            return
+        try:
+            if pl < 0:
+                raise IndexError
+            playlist_name = self.lists()[2][-1][pl][0]
+        except IndexError:
+            self._send_json(
+                {'error': 'Playlist not found (id={})'.format(pl + 1)},
+                '404 Not Found'
+            )
+            return
+        if playlist_name == basename(self.playlist_in_editor()[:-4]):
+            ''' no need to read the file, we have it in memory '''
+            stations = self.lists()[0][-1]
+        else:
+            in_file, stations = self.config().read_playlist_for_server(
+                playlist_name, full=True
+            )
+            if in_file is None:
+                self._send_json(
+                    {'error': 'Error reading playlist: "{}"'.format(playlist_name)},
+                    '500 Internal Server Error'
+                )
+                return
+        self._json_page(stations, {'playlist': playlist_name, 'id': pl + 1})
+
+    def _json_volume(self):
+        try:
+            volume = int(self._player().volume)
+        except (ValueError, TypeError):
+            volume = -1
+        return {'volume': volume, 'muted': bool(self.muted())}
+
+    def _json_state(self):
+        player = self._player()
+        sel, playing = self.sel()
+        try:
+            station = self.lists()[0][-1][playing][0] if playing > -1 else ''
+        except IndexError:
+            station = ''
+        out = {
+            'player': player.PLAYER_NAME,
+            'playing': bool(player.isPlaying() and player.playback_is_on),
+            'station': station,
+            'title': self.song_title() or '',
+            'playlist': basename(self.playlist_in_editor()[:-4]),
+            'selection': sel + 1,
+            'station_id': playing + 1,
+            'recording': self._recording_status(),
+            'radio_browser': bool(self._cnf.browsing_station_service)
+        }
+        out.update(self._json_volume())
+        return out
+
+    def _json_radio_browser(self):
+        if not self._cnf.browsing_station_service:
+            return {'active': False}
+        index, items = self.rb_html_search_strings()
+        return {
+            'active': True,
+            'page': self._cnf._online_browser.page + 1,
+            'limit': self._cnf._online_browser.current_search_limit,
+            'default': index + 1,
+            'items': [{'id': i + 1, 'term': n} for i, n in enumerate(items or [])]
+        }
+
+    def _station_index(self, playlist_id=None):
+        ''' Return (playlist name, stations, index) for the
+            current playlist or for playlist_id (as listed by
+            /pl); (None, None, None) if it cannot be read.
+
+            Indexes are kept per playlist and brought up to date
+            when the playlist is edited (edit generation) or its
+            file is modified; the current playlist is indexed
+            from memory, other playlists from their files.
+        '''
+        current = basename(self.playlist_in_editor()[:-4])
+        if playlist_id is None:
+            playlist_name = current
+        else:
+            try:
+                if playlist_id < 1:
+                    raise IndexError
+                playlist_name = self.lists()[1][-1][playlist_id - 1][0]
+            except IndexError:
+                return None, None, None
+        with self._station_indexes_lock:
+            item = self._station_indexes.get(playlist_name)
+            if item is not None:
+                self._station_indexes.move_to_end(playlist_name)
+        if item is None:
+            item = [StationIndex(), None, None]
+        index, stations, in_file = item
+        if playlist_name == current:
+            stations = self.lists()[0][-1]
+            signature = (self.config().edit_generation, id(stations), len(stations))
+        else:
+            signature = self._file_signature(in_file)
+            if signature is None or signature != index.signature:
+                in_file, stations = self.config().read_playlist_for_server(
+                    playlist_name, full=True
+                )
+                if in_file is None:
+                    return None, None, None
+                signature = self._file_signature(in_file)
+        if signature != index.signature:
+            count = index.update(stations, signature)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug('Station index of "{0}": {1} of {2} rows updated'.format(playlist_name, count, len(stations)))
+        item[1:] = stations, in_file
+        with self._station_indexes_lock:
+            self._station_indexes[playlist_name] = item
+            while len(self._station_indexes) > self.MAX_STATION_INDEXES:
+                self._station_indexes.popitem(last=False)
+        return playlist_name, stations, index
+
+    def _get_find_parameters(self):
+        ''' Return the (query, playlist id) of a /find or
+            /play_by_name request, or None if the playlist id
+            is invalid; playlist id is None for the current
+            playlist, query is "" if not given
+        '''
+        query = parse_qs(self._request.query) if self._request is not None else {}
+        playlist_id = query.get('pl', [None])[-1]
+        if playlist_id is not None:
             try:
-                self.client_socket.sendall(txt + b_msg)
-            except socket.error as e:
-                self.error = e
+                playlist_id = int(playlist_id)
+            except ValueError:
+                return None
+        return query.get('q', [''])[-1].strip(), playlist_id
+
+    def _send_find_error(self, msg):
+        if self._is_html:
+            self._send_raw('<div class="alert txt-center alert-danger">{}</div>'.format(escape(msg)))
+        else:
+            self._send_text('Error: ' + msg)
+
+    def _find_stations(self):
+        params = self._get_find_parameters()
+        if params is None or not params[0]:
+            self._send_find_error('Invalid search parameters')
+            return
+        query, playlist_id = params
+        playlist_name, stations, index = self._station_index(playlist_id)
+        if playlist_name is None:
+            self._send_find_error('Playlist not found (id={})'.format(playlist_id))
+            return
+        rows = index.find(query)
+        if self._is_html:
+            if rows:
+                self._send_raw(
+                    '<div class="alert alert-info">Stations matching <b>{0}</b> in playlist <i>{1}</i><br>{2}</div>'.format(
+                        escape(query), playlist_name,
+                        '<br>'.join(
+                            '{0}. {1}'.format(
+                                i + 1,
+                                '<b>' + stations[i][0] + '</b>' if stations[i][1] == '-' else stations[i][0]
+                            ) for i in rows
+                        )
+                    )
+                )
+            else:
+                self._send_raw(
+                    '<div class="alert txt-center alert-danger">No stations matching <b>{0}</b> in playlist <i>{1}</i></div>'.format(
+                        escape(query), playlist_name
+                    )
+                )
+        elif rows:
+            pad_str = '{:' + str(len(str(len(stations)))) + '}. '
+            self._send_text(
+                'Stations matching "{0}" in playlist "{1}"\n'.format(query, playlist_name) +
+                '\n'.join('  ' + pad_str.format(i + 1) + stations[i][0] for i in rows)
+            )
+        else:
+            self._send_text('No stations matching "{0}" in playlist "{1}"'.format(query, playlist_name))
+
+    def _play_by_name(self, name):
+        ''' Play the first station called name (compared as
+            is, or else case and accents insensitive)
+        '''
+        params = self._get_find_parameters()
+        if params is None or not name.strip():
+            self._send_find_error('Invalid station name or parameters')
+            return
+        playlist_id = params[1]
+        playlist_name, stations, index = self._station_index(playlist_id)
+        if playlist_name is None:
+            self._send_find_error('Playlist not found (id={})'.format(playlist_id))
+            return
+        rows = index.by_name(name)
+        if not rows:
+            self._send_find_error('Station "{0}" not found in playlist "{1}"'.format(name, playlist_name))
+        elif playlist_id is not None:
+            self._play_from_playlist(playlist_id - 1, rows[0])
+        elif self._is_html:
+            self._commands['/jump'](rows[0] + 1)
+            self._send_raw('<div class="alert alert-success">Playing <b>{}</b></div>'.format(stations[rows[0]][0]))
+        else:
+            self._run_command('/jump', rows[0] + 1)
+            self._send_text(' Playing station: "{}"'.format(stations[rows[0]][0]))
+
+    def _play_from_playlist(self, pl, st):
+        ''' Play station st of playlist pl (both 0-based),
+            loading the playlist if it is not the current one
+        '''
+        go_on = True
+        try:
+            playlist_name = self.lists()[1][-1][pl][0]
+        except IndexError:
+            self._send_text('Error: Playlist not found (id={})'.format(pl+1))
+            go_on = False
+        if go_on:
+            p_name = basename(self.playlist_in_editor()[:-4])
+            if p_name == playlist_name:
+                # play station from current playlist
+                if self._is_html:
+                    self._commands['/jump'](st+1)
+                    self._send_raw(
+                        '<div class="alert alert-success">Playing station <b>{0}</b> from playlist <i>{1}</i></b>'.format(
+                            self.lists()[0][-1][st][0],
+                            p_name
+                        )
+                    )
+                else:
+                    self._run_command('/jump', st+1)
+                    self._send_text(
+                        'Playing station "{0}" (id={1}) from playlist "{2}" (id={3})'.format(
+                            self.lists()[0][-1][st][0],
+                            st+1,
+                            p_name,
+                            pl+1
+                        )
+                    )
+            else:
+                # need to load a new playlist
+                if self.config().dirty_playlist:
+                    self._send_text(
+                        'Current playlist not saved; cannot load other playlist...'
+                    )
+                else:
+                    in_file, playlist_stations = self.config().read_playlist_for_server(playlist_name)
+                    if playlist_stations:
+                        if st < len(playlist_stations):
+                            item = [playlist_name, playlist_stations[st], st]
+                            if logger.isEnabledFor(logging.DEBUG):
+                                logger.debug('item = {}'.format(item))
+                            # radio.py 8762
+                            if self._is_html:
+                                self._commands['open_history'](in_file, item)
+                                self._send_raw(
+                                    '<div class="alert alert-success">Playing station <b>{0}</b> from playlist <i>{1}</i></div>'.format(
+                                        playlist_stations[st],
+                                        playlist_name
+                                    )
+                                )
+                            else:
+                                self._run_command('open_history', in_file, item)
+                                self._send_text(
+                                    'Playing station "{0}" (id={1}) from playlist "{2}" (id={3})'.format(
+                                        playlist_stations[st],
+                                        st+1,
+                                        playlist_name,
+                                        pl+1
+                                    )
+                                )
+                        else:
+                            self._send_text(
+                                'Error: Requested station (id={0}) not found in playlist "{1}" (id={2})'.format(
+                                    st+1, playlist_name, pl+1,
+                                )
+                            )
+                    else:
+                        self._send_text(
+                            'Error opening playlist "{0}" (id={1})'.format(
+                                playlist_name, pl+1
+                            )
+                        )
 
     def _get_numbers(self, comma):
         if logger.isEnabledFor(logging.DEBUG):
@@ -1931,6 +4252,39 @@ Content-Length: {}
         else:
             return None
 
+    def _listing_key(self, *args):
+        ''' Key of a cached listing
+
+            Includes the state all listings depend on: the
+            playlist in the editor, the stations and playlists
+            lists and their edit generation (changed by
+            PyRadioStations whenever they are edited or saved).
+        '''
+        stations = self.lists()[0][-1]
+        playlists = self.lists()[1][-1]
+        return (
+            self.config().edit_generation,
+            self.playlist_in_editor(),
+            id(stations), len(stations),
+            id(playlists), len(playlists),
+        ) + args
+
+    def _rb_page_key(self):
+        try:
+            return (
+                self._cnf._online_browser.page,
+                self._cnf._online_browser.current_search_limit
+            )
+        except AttributeError:
+            return None
+
+    def _file_signature(self, a_file):
+        try:
+            st = stat(a_file)
+        except (OSError, TypeError):
+            return None
+        return st.st_mtime_ns, st.st_size
+
     def _get_playlist_id(self, a_playlist):
         try:
             return [x[0] for x in self.lists()[1][-1]].index(a_playlist)
@@ -1938,77 +4292,73 @@ Content-Length: {}
             return -1
 
     def close_server(self):
-        # create socket
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        except socket.error as e:
-            s.close()
-            return False, e
-
+        ''' Stop the server (called from another thread)
 
+            Waits for the request being executed, if any.
+        '''
         with self.lock:
-            try:
-                s.connect((self._bind_ip, self._bind_port))
-                request = "GET /quit HTTP/1.0\n\n".encode('utf-8')
-                s.sendall(request)
-            except socket.error as e:
-                s.close()
-                return False, e
-
-        # Receive data
-        try:
-            reply = s.recv(4096)
-        except socket.error as e:
-            s.close()
-            return False, e
-        s.close()
+            self._exit.set()
+            self._wake_up_server()
         return True, None
 
     def _list_stations(
         self,
         playlist_name=None,
         stations=None,
-        html=False
+        html=False,
+        sel=None,
+        page=None
     ):
-        out = []
+        ''' List the stations of the current playlist, or the
+            station names of playlist_name, if stations is given
+
+            sel     the (selection, playing) tuple (current playlist)
+            page    (offset, end) of the stations to list
+        '''
         if stations is None:
-            for n in self.lists()[0][-1]:
-                if html:
-                    if n[1] == '-':
-                        out.append('<b>' + n[0] + '</b>')
-                    else:
-                        out.append(n[0])
-                else:
-                        out.append(n[0])
+            stations = self.lists()[0][-1]
             p_name = basename(self.playlist_in_editor()[:-4])
+            current = True
+            if sel is None:
+                sel = self.sel()
         else:
-            out = stations
             p_name = playlist_name
-        if html:
-            return out
+            current = False
+        total = len(stations)
+        offset, end = page if page else (0, total)
+        if current:
+            if html:
+                return ['<b>' + n[0] + '</b>' if n[1] == '-' else n[0] for n in stations[offset:end]]
+            names = [n[0] for n in stations[offset:end]]
+        else:
+            names = stations[offset:end]
+            if html:
+                return names
 
-        pad = len(str(len(out)))
+        pad = len(str(total))
         pad_str = '{:' + str(pad) + '}. '
 
-        for i in range(0, len(out)):
+        out = []
+        for i, n in enumerate(names, start=offset):
             tok = '  '
-            if stations is None:
-                if i == self.sel()[0] and i == self.sel()[1]:
+            if current:
+                if i == sel[0] and i == sel[1]:
                     ''' selected and playing '''
                     tok = '+>'
-                elif i == self.sel()[0]:
+                elif i == sel[0]:
                     ''' selected '''
                     tok = '> '
-                elif i == self.sel()[1]:
+                elif i == sel[1]:
                     ''' playing '''
                     tok = '+ '
-                out[i] = tok + pad_str.format(i+1) + out[i]
-            else:
-                out[i] = tok + pad_str.format(i+1) + out[i]
-        if stations is None:
-            return 'Stations List for Playlist: "' + p_name + '"\n' +  '\n'.join(out) + '\n\nFirst column\n  [> ]: Selected, [+ ]: Playing, [+>]: Both'
+            out.append(tok + pad_str.format(i+1) + n)
+        head = 'Stations List for Playlist: "' + p_name + '"\n'
+        if (offset, end) != (0, total):
+            head += 'Stations {0}-{1} of {2}\n'.format(offset+1, end, total)
+        if current:
+            return head + '\n'.join(out) + '\n\nFirst column\n  [> ]: Selected, [+ ]: Playing, [+>]: Both'
         else:
-            return 'Stations List for Playlist: "' + p_name + '"\n' +  '\n'.join(out)
+            return head + '\n'.join(out)
 
     def _list_playlists(self, html=False):
         # logger.error('playlist_in_editor = "{}"'.format(self.playlist_in_editor()))
@@ -2047,7 +4397,8 @@ Content-Length: {}
     def _format_html_table(
             self, in_list, index,
             playlist_index=None, sel=-1,
-            show_page_navigation=False
+            show_page_navigation=False,
+            first=0, total=None
         ):
         '''
         format html table for |CONTENT|
@@ -2055,15 +4406,18 @@ Content-Length: {}
         Parameters
         ==========
         in_list         list of items
-        sel             selected item
+        sel             selected item; if None, the _HtmlTable
+                        is returned instead of its html
         index           type of output (stations / playlist) and URL formatter
         playlist_index  playist index (only valid if index == 2)
+        first           index of the first item of in_list (when paging)
+        total           total number of items (when paging)
         '''
         if show_page_navigation:
             out = []
             show_prev_button = self._cnf._online_browser.page > 0
             show_first_button = self._cnf._online_browser.page > 1
-            show_next_button = len(in_list) == self._cnf._online_browser.current_search_limit
+            show_next_button = (len(in_list) if total is None else total) == self._cnf._online_browser.current_search_limit
             if show_next_button or show_prev_button:
                 out.append(r'''
 <div id="page" class="row" style="margin-top: 40px;">
@@ -2094,48 +4448,37 @@ Content-Length: {}
         url = ['/html/st/{}', '/html/pl/{}', '/html/pl/{0},{1}', '/html/srb/{}']
         search_term = ('station', 'playlist', 'station', 'term')
         timeout = ('1500', '0', '1500', '1500')
-        head = '''                    <h5>Search field</h5>
-                    <input class="form-control" id="myInput" type="text" placeholder="Type to search for a {0}...">
-                    <br>
-                    <table class="table table-bordered">
-                        <thead>
-                            <tr class="btn-success">
-                                <td colspan="2" style="color: white; font-weight: bolder;">{1}</td>
-                            </tr>
-                        </thead>
-                        <tbody id="myTable">
-'''.format(search_term[index], head_captions[index])
-        out = []
-        for i, n in enumerate(in_list):
-            header = False
-            if n.startswith('<b>') or \
-                    n.startswith('<B>'):
-                header = True
-                out.append('                            <tr>')
-            else:
-                if sel == i:
-                    out.append('                            <tr class="btn-success">')
-                else:
-                    out.append('                            <tr>')
-                if sel == i:
-                    out.append('                                <td id="n{0}" class="text-right" style="color: white;">{1}</td>'.format(i+1, i+1))
-                else:
-                    out.append('                                <td id="n{0}" class="text-right">{1}</td>'.format(i+1, i+1))
-            if header:
-                out.append('                               <td id="n' + str(i+1) + '" class="text-center group-header" colspan="2">' + n + '</td>')
-            else:
-                if index in (0, 1, 3):
-                    t_url = url[index].format(i+1)
-                else:
-                    t_url = url[2].format(playlist_index+1, i+1)
-                if sel == i:
-                    out.append('                               <td id="' + str(i+1) + '"><a style="color: white;" href="#" onclick="js_send_simple_command_with_stop(\'' + t_url + '\', ' + timeout[index] + ');">' + n + '</a></td>')
-                else:
-                    out.append('                               <td id="' + str(i+1) + '"><a href="#" onclick="js_send_simple_command_with_stop(\'' + t_url + '\', ' + timeout[index] + ');">' + n + '</a></td>')
-            out.append('                            </tr>')
-        out.append('                        </tbody>')
-        out.append('                    </table>')
-        return nav + head + '\n' + '\n'.join(out) + self._filter_string
+        if index == 2:
+            urls = lambda x: url[2].format(playlist_index+1, x)
+        else:
+            urls = url[index].format
+        attrs = ''
+        if index == 0:
+            attrs = ' data-version="{}"'.format(
+                self._stations_version((first, first + len(in_list)))
+            )
+        table = _HtmlTable(
+            nav + _HtmlTable.HEAD.format(
+                search=search_term[index],
+                caption=head_captions[index],
+                attrs=attrs
+            ),
+            in_list, urls, timeout[index],
+            first=first, tail=self._filter_string
+        )
+        if sel is None:
+            return table
+        return table.render(sel)
+
+    def _stations_version(self, page):
+        ''' Identifies the stations table of the current playlist
+            (or RadioBrowser results page); changes whenever the
+            stations do. page is the (offset, end) of the stations
+            in the table, so that pages of it differ, too.
+        '''
+        return hashlib.md5(
+            repr(self._listing_key(self._rb_page_key(), page)).encode('utf-8')
+        ).hexdigest()[:12]
 
     def _read_playlist(self, a_playlist):
         pass
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+''' Station lookups for the Remote Control Server
+
+    A StationIndex maps station names, normalized names,
+    URLs and group names of a playlist to row numbers, so
+    that /find and /play_by_name do not have to walk the
+    playlist on every request.
+
+    Usage:
+        index = StationIndex()
+        index.update(stations)     # [name, url, ...] rows
+        index.find('jazz')         # -> sorted list of rows
+'''
+import re
+import threading
+import unicodedata
+
+_SPLIT = re.compile(r'[\W_]+')
+
+
+def normalize_name(name):
+    ''' Case, accents and punctuation insensitive form
+        of a name: "Café  del Mar!" -> "cafe del mar"
+    '''
+    name = unicodedata.normalize('NFKD', name.casefold())
+    name = ''.join(c for c in name if not unicodedata.combining(c))
+    return ' '.join(x for x in _SPLIT.split(name) if x)
+
+
+class StationIndex(object):
+    ''' Index of a list of [name, url, ...] rows
+
+        Group rows (url is "-") are indexed by name, and
+        each station row by the group it belongs to.
+
+        update() only re-indexes the rows from the first one
+        that differs from the previously indexed list, so
+        editing or appending stations at the end of a large
+        playlist does not rebuild the whole index.
+    '''
+
+    def __init__(self):
+        self._rows = []
+        self._row_group = []
+        self._by_name = {}
+        self._by_normalized = {}
+        self._by_url = {}
+        self._by_group = {}
+        self._lock = threading.Lock()
+        self.signature = None
+
+    def __len__(self):
+        return len(self._rows)
+
+    def update(self, stations, signature=None):
+        ''' Index stations; returns the number of rows re-indexed
+
+            signature identifies the indexed version of the list;
+            callers can skip update() while it is unchanged.
+        '''
+        rows = [(n[0], n[1]) for n in stations]
+        with self._lock:
+            first = 0
+            for old, new in zip(self._rows, rows):
+                if old != new:
+                    break
+                first += 1
+            for i in range(len(self._rows) - 1, first - 1, -1):
+                self._remove_row(i)
+            del self._rows[first:]
+            del self._row_group[first:]
+            group = self._row_group[-1] if self._row_group else -1
+            for i in range(first, len(rows)):
+                if rows[i][1] == '-':
+                    group = i
+                self._add_row(i, rows[i], group)
+            self.signature = signature
+            return len(rows) - first
+
+    def _add_row(self, i, row, group):
+        name, url = row
+        self._rows.append(row)
+        self._row_group.append(group)
+        if url == '-':
+            self._by_group.setdefault(normalize_name(name), []).append(i)
+            return
+        self._by_name.setdefault(name, []).append(i)
+        self._by_normalized.setdefault(normalize_name(name), []).append(i)
+        self._by_url.setdefault(url, []).append(i)
+        if group > -1:
+            self._by_group.setdefault(normalize_name(self._rows[group][0]), []).append(i)
+
+    def _remove_row(self, i):
+        ''' rows are removed last to first, so the row
+            number is always the last item of its lists
+        '''
+        name, url = self._rows[i]
+        if url == '-':
+            self._pop(self._by_group, normalize_name(name))
+            return
+        self._pop(self._by_name, name)
+        self._pop(self._by_normalized, normalize_name(name))
+        self._pop(self._by_url, url)
+        group = self._row_group[i]
+        if group > -1:
+            self._pop(self._by_group, normalize_name(self._rows[group][0]))
+
+    def _pop(self, a_dict, key):
+        items = a_dict[key]
+        items.pop()
+        if not items:
+            del a_dict[key]
+
+    def by_name(self, name):
+        ''' rows of the stations called name, or, if there
+            are none, of the stations with the same
+            normalized name
+        '''
+        with self._lock:
+            out = self._by_name.get(name)
+            if out is None:
+                out = self._by_normalized.get(normalize_name(name), [])
+            return list(out)
+
+    def find(self, query):
+        ''' rows matching query as a URL, a station
+            name or a group name, in playlist order
+        '''
+        normalized = normalize_name(query)
+        with self._lock:
+            out = set(self._by_url.get(query.strip(), ()))
+            out.update(self._by_name.get(query, ()))
+            out.update(self._by_normalized.get(normalized, ()))
+            out.update(self._by_group.get(normalized, ()))
+        return sorted(out)
+
+    def group_of(self, row):
+        ''' the row of the group row belongs to, or -1 '''
+        with self._lock:
+            try:
+                return self._row_group[row]
+            except IndexError:
+                return -1
@@ -0,0 +1,615 @@
+# -*- coding: utf-8 -*-
+''' PyRadio Headless Supervisor
+
+    Starts, health-checks and restarts a number of headless
+    PyRadio instances, each one using its own configuration
+    directory and remote control server address, and provides
+    a single HTTP API to control and query all of them.
+
+    The instances are read from a file, one per line:
+
+        # name     config dir                 address
+        kitchen    ~/.config/pyradio-kitchen  localhost:11121
+        bedroom    ~/.config/pyradio-bedroom  lan:11122   -s jazz
+
+    address is the IP_AND_PORT value of "pyradio --headless";
+    anything after it is passed to pyradio as is.
+
+    Headless PyRadio still runs its curses interface, so each
+    instance gets its own pseudo-terminal (the job tmux or
+    screen do in the start-headless-pyradio.sh scripts).
+
+    Only the standard library is used.
+'''
+import argparse
+import http.client
+import json
+import logging
+import os
+import re
+import select
+import selectors
+import shlex
+import signal
+import struct
+import subprocess
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os import path
+from time import monotonic
+from .client import UnixHTTPConnection
+
+logger = logging.getLogger(__name__)
+
+STOPPED = 'stopped'
+STARTING = 'starting'
+RUNNING = 'running'
+UNHEALTHY = 'unhealthy'
+BACKOFF = 'backoff'
+FAILED = 'failed'
+
+
+class Instance(object):
+    ''' A headless PyRadio instance '''
+
+    ''' seconds to wait for the server of a new instance '''
+    STARTUP_TIMEOUT = 30
+    ''' seconds to wait for an instance to exit, before killing it '''
+    STOP_TIMEOUT = 5
+    ''' failed health checks before restarting an instance '''
+    MAX_FAILURES = 3
+    ''' restart delay; doubled on each restart, up to MAX_BACKOFF,
+        reset when an instance has been healthy for STABLE_TIME '''
+    BACKOFF = 1
+    MAX_BACKOFF = 60
+    STABLE_TIME = 60
+    ''' terminal size of the instances '''
+    LINES = 24
+    COLUMNS = 80
+
+    def __init__(self, name, config_dir, address, args=None, command=None):
+        self.name = name
+        self.config_dir = config_dir
+        self.address = address
+        self.args = args or []
+        self.command = command or [sys.executable, '-m', 'pyradio.main']
+        self.report_file = path.join(config_dir, 'data', 'server-headless.txt')
+        self.socket_file = self.report_file[:-4] + '.sock'
+        self.process = None
+        self.master = None
+        self.state = STOPPED
+        self.enabled = False
+        self.restarts = 0
+        self.failures = 0
+        self.started = None
+        self.healthy_since = None
+        self.next_start = 0
+        self.last_error = ''
+        self.last_state = None
+        self.restart_reason = None
+        self._backoff = self.BACKOFF
+        self._checking = False
+        self._lock = threading.RLock()
+
+    @property
+    def port(self):
+        if self.address == 'auto':
+            return 11111
+        return int(self.address.rsplit(':', 1)[-1])
+
+    @property
+    def pid(self):
+        return self.process.pid if self.process else None
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        ''' Start the instance; returns the pty master fd
+            (the caller has to keep reading from it), or None
+        '''
+        ''' not available on Windows, where the
+            supervisor refuses to run '''
+        import fcntl
+        import pty
+        import termios
+        with self._lock:
+            if not self.enabled or self.is_alive():
+                ''' stopped meanwhile, or already running '''
+                return None
+            if not self._free_report_file():
+                return None
+            master, slave = pty.openpty()
+            fcntl.ioctl(slave, termios.TIOCSWINSZ,
+                        struct.pack('HHHH', self.LINES, self.COLUMNS, 0, 0))
+            env = dict(os.environ)
+            if env.get('TERM', 'dumb') == 'dumb':
+                env['TERM'] = 'xterm'
+            cmd = self.command + ['-c', self.config_dir, '--headless', self.address] + self.args
+            try:
+                self.process = subprocess.Popen(
+                    cmd, stdin=slave, stdout=slave, stderr=slave,
+                    env=env, start_new_session=True, close_fds=True
+                )
+            except OSError as e:
+                os.close(master)
+                self._fail('Cannot start pyradio: {}'.format(e))
+                return None
+            finally:
+                os.close(slave)
+            self.master = master
+            self.state = STARTING
+            self.started = monotonic()
+            self.healthy_since = None
+            self.failures = 0
+            self.restart_reason = None
+            if logger.isEnabledFor(logging.INFO):
+                logger.info('{0}: started (pid {1}): {2}'.format(self.name, self.process.pid, ' '.join(cmd)))
+            return master
+
+    def _free_report_file(self):
+        ''' A server lock file left by an instance that is not
+            running prevents a new one from starting; remove it
+            (like "pyradio --free-dead-headless-server" does)
+        '''
+        if not path.exists(self.report_file):
+            return True
+        if self.request('/json/state', timeout=1)[0] == 200:
+            self._fail('Another instance is using ' + self.config_dir)
+            return False
+        try:
+            os.remove(self.report_file)
+        except OSError:
+            pass
+        return True
+
+    def stop(self):
+        ''' Ask the instance to quit (as if "q" was pressed);
+            terminate it if it does not exit in time
+        '''
+        with self._lock:
+            self.enabled = False
+            self._terminate()
+            self.state = STOPPED
+
+    def _terminate(self):
+        if self.is_alive():
+            try:
+                os.write(self.master, b'q')
+            except OSError:
+                pass
+            if not self._wait(self.STOP_TIMEOUT):
+                self.process.terminate()
+                try:
+                    self.process.wait(self.STOP_TIMEOUT)
+                except subprocess.TimeoutExpired:
+                    self.process.kill()
+                    self.process.wait()
+            if logger.isEnabledFor(logging.INFO):
+                logger.info('{0}: stopped'.format(self.name))
+        self.close_master()
+
+    def _wait(self, timeout):
+        ''' wait for the process to exit, reading (and
+            discarding) what it writes to its terminal
+        '''
+        end = monotonic() + timeout
+        while self.process.poll() is None:
+            left = end - monotonic()
+            if left <= 0:
+                return False
+            try:
+                if select.select([self.master], [], [], min(left, .1))[0]:
+                    os.read(self.master, 65536)
+            except (OSError, ValueError):
+                try:
+                    self.process.wait(left)
+                except subprocess.TimeoutExpired:
+                    return False
+        return True
+
+    def close_master(self):
+        if self.master is not None:
+            try:
+                os.close(self.master)
+            except OSError:
+                pass
+            self.master = None
+
+    def restart(self, error):
+        ''' stop the instance and schedule its restart '''
+        with self._lock:
+            if not self.enabled:
+                ''' stopped meanwhile '''
+                return
+            self._terminate()
+            self._fail(error)
+            self.restarts += 1
+
+    def _fail(self, error):
+        self.last_error = error
+        self.state = BACKOFF if self.enabled else FAILED
+        self.next_start = monotonic() + self._backoff
+        self._backoff = min(self._backoff * 2, self.MAX_BACKOFF)
+        if logger.isEnabledFor(logging.ERROR):
+            logger.error('{0}: {1}'.format(self.name, error))
+
+    def request(self, a_path, timeout=2):
+        ''' Send a command to the instance's remote control
+            server; returns (HTTP status, content type, body),
+            with a status of 0 if the server cannot be reached
+        '''
+        conn = None
+        try:
+            if path.exists(self.socket_file):
+                conn = UnixHTTPConnection(self.socket_file, timeout=timeout)
+            else:
+                with open(self.report_file, 'r', encoding='utf-8') as f:
+                    host, port = f.read().strip().rsplit(':', 1)
+                conn = http.client.HTTPConnection(host, int(port), timeout=timeout)
+            conn.request('GET', a_path)
+            response = conn.getresponse()
+            return (
+                response.status,
+                response.getheader('Content-Type', 'text/plain'),
+                response.read()
+            )
+        except (OSError, ValueError, http.client.HTTPException) as e:
+            return 0, 'text/plain', str(e).encode('utf-8')
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def check(self):
+        ''' Health check: the server must reply to /json/state '''
+        status, _, body = self.request('/json/state')
+        with self._lock:
+            self._checking = False
+            if not self.is_alive() or self.state not in (STARTING, RUNNING, UNHEALTHY):
+                return
+            if status == 200:
+                try:
+                    self.last_state = json.loads(body.decode('utf-8'))
+                except ValueError:
+                    self.last_state = None
+                self.state = RUNNING
+                self.failures = 0
+                now = monotonic()
+                if self.healthy_since is None:
+                    self.healthy_since = now
+                elif now - self.healthy_since > self.STABLE_TIME:
+                    self._backoff = self.BACKOFF
+                return
+            if self.state == STARTING and \
+                    monotonic() - self.started < self.STARTUP_TIMEOUT:
+                return
+            self.failures += 1
+            self.healthy_since = None
+            self.state = UNHEALTHY
+            if self.failures >= self.MAX_FAILURES:
+                ''' the supervisor's thread does the restarting '''
+                self.restart_reason = 'Health check failed {0} times: {1}'.format(
+                    self.failures, body.decode('utf-8', 'replace')
+                )
+
+    def status(self):
+        with self._lock:
+            return {
+                'name': self.name,
+                'config_dir': self.config_dir,
+                'address': self.address,
+                'pid': self.pid,
+                'state': self.state,
+                'restarts': self.restarts,
+                'uptime': round(monotonic() - self.started) if self.is_alive() else 0,
+                'last_error': self.last_error,
+                'player': self.last_state
+            }
+
+
+class Supervisor(object):
+    ''' Keeps the instances running
+
+        One thread reads the output of all instances (it has
+        to be consumed, or they would block writing to their
+        terminals), notices instances that exit, starts them
+        again and schedules their health checks, which run
+        in a thread pool, like the API fan-out requests.
+    '''
+
+    ''' seconds between health checks '''
+    CHECK_INTERVAL = 5
+
+    def __init__(self, instances):
+        self.instances = OrderedDict((n.name, n) for n in instances)
+        self._selector = selectors.DefaultSelector()
+        self._selector_lock = threading.Lock()
+        self._exit = threading.Event()
+        self._wake_r, self._wake_w = os.pipe()
+        self._selector.register(self._wake_r, selectors.EVENT_READ)
+        self._registered = {}
+        self._executor = ThreadPoolExecutor(max_workers=max(4, 2 * len(self.instances)))
+        self._next_check = 0
+
+    def run(self):
+        for n in self.instances.values():
+            n.enabled = True
+        try:
+            while not self._exit.is_set():
+                self._read_output(1)
+                self._supervise()
+        finally:
+            for n in self.instances.values():
+                self._unregister(n)
+            list(self._executor.map(lambda x: x.stop(), self.instances.values()))
+            self._executor.shutdown()
+
+    def shutdown(self):
+        self._exit.set()
+        self._wake_up()
+
+    def _wake_up(self):
+        try:
+            os.write(self._wake_w, b'\0')
+        except OSError:
+            pass
+
+    def _read_output(self, timeout):
+        with self._selector_lock:
+            events = self._selector.select(timeout)
+        for key, _ in events:
+            if key.fd == self._wake_r:
+                os.read(self._wake_r, 1024)
+                continue
+            try:
+                data = os.read(key.fd, 65536)
+            except OSError:
+                ''' EIO: the instance has exited '''
+                data = b''
+            if not data:
+                self._unregister(key.data)
+
+    def _unregister(self, instance):
+        ''' instances close their terminals only after
+            this, so that a closed fd is never selected
+        '''
+        self._wake_up()
+        with self._selector_lock:
+            fd = self._registered.pop(instance.name, None)
+            if fd is not None:
+                self._selector.unregister(fd)
+
+    def _supervise(self):
+        now = monotonic()
+        check = now >= self._next_check
+        if check:
+            self._next_check = now + self.CHECK_INTERVAL
+        for n in self.instances.values():
+            if not n.enabled:
+                continue
+            if n.process is not None and not n.is_alive() and \
+                    n.state in (STARTING, RUNNING, UNHEALTHY):
+                self._unregister(n)
+                n.restart('Exited with code {}'.format(n.process.returncode))
+            elif n.restart_reason and n.is_alive():
+                self._unregister(n)
+                n.restart(n.restart_reason)
+            elif n.state in (STOPPED, FAILED, BACKOFF) and now >= n.next_start:
+                self._start(n)
+            elif check and n.is_alive() and not n._checking:
+                n._checking = True
+                self._executor.submit(n.check)
+
+    def start(self, instance):
+        instance.enabled = True
+        self._start(instance)
+
+    def _start(self, instance):
+        ''' start an enabled instance; Instance.start() does
+            nothing if it has been stopped meanwhile '''
+        if instance.is_alive():
+            return
+        self._unregister(instance)
+        instance.close_master()
+        master = instance.start()
+        if master is not None:
+            self._wake_up()
+            with self._selector_lock:
+                self._selector.register(master, selectors.EVENT_READ, instance)
+                self._registered[instance.name] = master
+
+    def stop(self, instance):
+        self._unregister(instance)
+        instance.stop()
+
+    def restart(self, instance):
+        self.stop(instance)
+        self.start(instance)
+
+    def fan_out(self, function, instances):
+        ''' call function(instance) for all instances in
+            parallel; returns {name: return value}
+        '''
+        return OrderedDict(zip(
+            [n.name for n in instances],
+            self._executor.map(function, instances)
+        ))
+
+
+class SupervisorRequestHandler(BaseHTTPRequestHandler):
+    ''' The supervisor's HTTP API
+
+        /                       status of all instances
+        /status/<name>          status of an instance
+        /all/<command>          send a remote control command to
+                                all instances (in parallel)
+        /i/<name>/<command>     send a command to an instance
+        /start/<name|all>       start instance(s)
+        /stop/<name|all>        stop instance(s)
+        /restart/<name|all>     restart instance(s)
+
+        Replies are JSON objects; the replies of the instances
+        are included as JSON when they are JSON (e.g. /all/json/state)
+        and as text otherwise.
+    '''
+
+    server_version = 'PyRadioSupervisor'
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        supervisor = self.server.supervisor
+        sp = self.path.split('/', 3)[1:]
+        target = sp[1] if len(sp) > 1 else ''
+        if self.path in ('/', '/status'):
+            self._send_json([n.status() for n in supervisor.instances.values()])
+        elif len(sp) == 2 and sp[0] == 'status':
+            instances = self._instances(target)
+            if instances:
+                self._send_json(instances[0].status())
+        elif sp[0] == 'all' and len(sp) > 1:
+            command = self.path[4:]
+            replies = supervisor.fan_out(
+                lambda x: x.request(command),
+                list(supervisor.instances.values())
+            )
+            self._send_json(OrderedDict(
+                (k, self._format_reply(*v)) for k, v in replies.items()
+            ))
+        elif sp[0] == 'i' and len(sp) > 2:
+            instances = self._instances(target)
+            if instances:
+                status, content_type, body = instances[0].request('/' + sp[2])
+                if status == 0:
+                    self._send_json({'error': body.decode('utf-8', 'replace')}, 502)
+                else:
+                    self._send(status, content_type, body)
+        elif sp[0] in ('start', 'stop', 'restart') and len(sp) == 2:
+            instances = self._instances(target)
+            if instances:
+                function = getattr(supervisor, sp[0])
+                supervisor.fan_out(function, instances)
+                self._send_json(OrderedDict((n.name, n.status()) for n in instances))
+        else:
+            self._send_json({'error': 'Not found'}, 404)
+
+    def _instances(self, name):
+        ''' the instances named by name ("all" for all) '''
+        instances = self.server.supervisor.instances
+        if name == 'all':
+            return list(instances.values())
+        if name in instances:
+            return [instances[name]]
+        self._send_json({'error': 'Instance not found: ' + name}, 404)
+        return []
+
+    def _format_reply(self, status, content_type, body):
+        out = {'status': status}
+        text = body.decode('utf-8', 'replace')
+        if status == 0:
+            out['error'] = text
+        elif 'json' in content_type:
+            try:
+                out['reply'] = json.loads(text)
+            except ValueError:
+                out['reply'] = text
+        else:
+            out['reply'] = text
+        return out
+
+    def _send_json(self, obj, status=200):
+        self._send(
+            status,
+            'application/json; charset=UTF-8',
+            json.dumps(obj, ensure_ascii=False).encode('utf-8')
+        )
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('{0}: {1}'.format(self.address_string(), format % args))
+
+
+def read_instances(a_file, command=None):
+    ''' Read the instances file; returns a list of Instance
+        objects, raises ValueError on errors
+    '''
+    out = []
+    with open(a_file, 'r', encoding='utf-8') as f:
+        for i, line in enumerate(f, start=1):
+            sp = shlex.split(line, comments=True)
+            if not sp:
+                continue
+            if len(sp) < 3:
+                raise ValueError('line {}: expected "name config_dir address"'.format(i))
+            name, config_dir, address = sp[:3]
+            if not re.match(r'^[\w-]+$', name) or name == 'all':
+                raise ValueError('line {0}: invalid name "{1}"'.format(i, name))
+            if address != 'auto' and not re.match(r'^[^:]+:\d+$', address):
+                raise ValueError('line {0}: invalid address "{1}"'.format(i, address))
+            config_dir = path.abspath(path.expanduser(config_dir))
+            instance = Instance(name, config_dir, address, sp[3:], command)
+            for n in out:
+                for x in 'name', 'config_dir', 'port':
+                    if getattr(n, x) == getattr(instance, x):
+                        raise ValueError('line {0}: {1} already used by "{2}"'.format(i, x.replace('_', ' '), n.name))
+            out.append(instance)
+    if not out:
+        raise ValueError('no instances defined')
+    return out
+
+
+def supervisor():
+    parser = argparse.ArgumentParser(
+        description='PyRadio Headless Supervisor'
+    )
+    parser.add_argument('-s', '--server', default='localhost:11110', metavar=('IP_AND_PORT', ),
+                        help='Address of the supervisor API. Default is "localhost:11110".')
+    parser.add_argument('--pyradio', default='',
+                        help='Command to execute PyRadio. Default is "{} -m pyradio.main".'.format(sys.executable))
+    parser.add_argument('-d', '--debug', action='store_true',
+                        help='Print debug messages.')
+    parser.add_argument('instances_file', metavar='INSTANCES_FILE',
+                        help='File with one "name config_dir address [pyradio options]" line per instance.')
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.debug else logging.INFO,
+        format='%(asctime)s - %(levelname)s: %(message)s'
+    )
+    if sys.platform.startswith('win'):
+        print('Error: Headless operation is not supported on Windows')
+        sys.exit(1)
+    try:
+        instances = read_instances(
+            args.instances_file,
+            shlex.split(args.pyradio) if args.pyradio else None
+        )
+        host, port = args.server.rsplit(':', 1)
+        api = ThreadingHTTPServer((host, int(port)), SupervisorRequestHandler)
+    except (OSError, ValueError) as e:
+        print('Error: {}'.format(e))
+        sys.exit(1)
+    api.daemon_threads = True
+    api.supervisor = Supervisor(instances)
+    threading.Thread(target=api.serve_forever, daemon=True).start()
+    logger.info('Supervisor API listening on {}'.format(args.server))
+
+    def _exit(signum, frame):
+        api.supervisor.shutdown()
+    signal.signal(signal.SIGTERM, _exit)
+    signal.signal(signal.SIGINT, _exit)
+    api.supervisor.run()
+    api.shutdown()
+
+
+if __name__ == '__main__':
+    supervisor()
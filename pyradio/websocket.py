@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+''' Minimal WebSocket (RFC 6455) support for the Remote Control Server
+
+    Only what a server needs is implemented: the opening handshake,
+    unmasking client frames, reassembling fragmented messages and
+    building (unmasked) server frames.
+'''
+import base64
+import hashlib
+import struct
+
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+CLOSE_NORMAL = 1000
+CLOSE_PROTOCOL_ERROR = 1002
+CLOSE_TOO_BIG = 1009
+
+_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+
+class WebSocketError(ValueError):
+    ''' Raised on a protocol violation by the client;
+        code is the close code to reply with
+    '''
+
+    def __init__(self, msg, code=CLOSE_PROTOCOL_ERROR):
+        super(WebSocketError, self).__init__(msg)
+        self.code = code
+
+
+def accept_key(key):
+    ''' the value of the Sec-WebSocket-Accept header '''
+    digest = hashlib.sha1((key.strip() + _GUID).encode('ascii')).digest()
+    return base64.b64encode(digest).decode('ascii')
+
+
+def encode_frame(payload, opcode=OP_TEXT):
+    ''' build a single (final, unmasked) frame '''
+    if isinstance(payload, str):
+        payload = payload.encode('utf-8')
+    length = len(payload)
+    if length < 126:
+        head = struct.pack('!BB', 0x80 | opcode, length)
+    elif length < 65536:
+        head = struct.pack('!BBH', 0x80 | opcode, 126, length)
+    else:
+        head = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+    return head + payload
+
+
+def encode_close(code=CLOSE_NORMAL, reason=''):
+    return encode_frame(struct.pack('!H', code) + reason.encode('utf-8'), OP_CLOSE)
+
+
+class WebSocketParser(object):
+    ''' Parse client frames from a byte stream
+
+        feed() returns a list of (opcode, payload) tuples;
+        fragmented messages are returned once complete, with
+        the opcode of their first frame, control frames
+        (close, ping, pong) are returned as they arrive.
+    '''
+
+    MAX_MESSAGE_SIZE = 1048576
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._fragments = None
+        self._fragments_opcode = None
+
+    def feed(self, data):
+        self._buf.extend(data)
+        out = []
+        while True:
+            frame = self._parse_frame()
+            if frame is None:
+                break
+            fin, opcode, payload = frame
+            if opcode >= OP_CLOSE:
+                if not fin:
+                    raise WebSocketError('Fragmented control frame')
+                out.append((opcode, payload))
+            elif opcode == OP_CONTINUATION:
+                if self._fragments is None:
+                    raise WebSocketError('Unexpected continuation frame')
+                self._fragments.extend(payload)
+                if len(self._fragments) > self.MAX_MESSAGE_SIZE:
+                    raise WebSocketError('Message too big', CLOSE_TOO_BIG)
+                if fin:
+                    out.append((self._fragments_opcode, bytes(self._fragments)))
+                    self._fragments = self._fragments_opcode = None
+            else:
+                if self._fragments is not None:
+                    raise WebSocketError('Expected continuation frame')
+                if fin:
+                    out.append((opcode, payload))
+                else:
+                    self._fragments = bytearray(payload)
+                    self._fragments_opcode = opcode
+        return out
+
+    def _parse_frame(self):
+        buf = self._buf
+        if len(buf) < 2:
+            return None
+        fin = bool(buf[0] & 0x80)
+        if buf[0] & 0x70:
+            raise WebSocketError('Reserved bits set')
+        opcode = buf[0] & 0x0F
+        if opcode not in (OP_CONTINUATION, OP_TEXT, OP_BINARY,
+                          OP_CLOSE, OP_PING, OP_PONG):
+            raise WebSocketError('Unknown opcode')
+        if not buf[1] & 0x80:
+            raise WebSocketError('Client frames must be masked')
+        length = buf[1] & 0x7F
+        pos = 2
+        if length == 126:
+            if len(buf) < 4:
+                return None
+            length = struct.unpack('!H', bytes(buf[2:4]))[0]
+            pos = 4
+        elif length == 127:
+            if len(buf) < 10:
+                return None
+            length = struct.unpack('!Q', bytes(buf[2:10]))[0]
+            pos = 10
+        if length > self.MAX_MESSAGE_SIZE:
+            raise WebSocketError('Message too big', CLOSE_TOO_BIG)
+        if len(buf) < pos + 4 + length:
+            return None
+        mask = buf[pos:pos + 4]
+        pos += 4
+        payload = self._unmask(buf[pos:pos + length], mask)
+        del buf[:pos + length]
+        return fin, opcode, payload
+
+    def _unmask(self, data, mask):
+        ''' xor the payload with the mask, using
+            big integers instead of a per byte loop
+        '''
+        length = len(data)
+        if length == 0:
+            return b''
+        key = bytes(mask) * (length // 4 + 1)
+        return (
+            int.from_bytes(data, 'big') ^
+            int.from_bytes(key[:length], 'big')
+        ).to_bytes(length, 'big')
@@ -28,7 +28,8 @@ meta = dict(
     entry_points={
         'console_scripts': [
             'pyradio = pyradio.main:shell',
-            'pyradio-client = pyradio.main:run_client'
+            'pyradio-client = pyradio.client:client',
+            'pyradio-supervisor = pyradio.supervisor:supervisor'
         ]
     },
     install_requires=[],